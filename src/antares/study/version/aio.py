@@ -0,0 +1,146 @@
+"""
+Asynchronous API for asyncio-based services.
+
+The blocking work of the `UpgradeApp`, `CreateApp` and `ShowApp` applications is offloaded
+to an executor (by default, the default executor of the event loop). The concurrency can be bounded
+by giving an executor with a limited number of workers, for instance one executor per file system.
+
+Usage::
+
+    async for event in aio.upgrade(study_dir, "9.3", executor=executor):
+        print(f"{event.kind}: {event.name} ({event.done}/{event.total})")
+
+The upgrade is cancelled when the task is cancelled, or when the iteration stops early:
+it is interrupted at the next step boundary, and the study files are restored.
+Once the last step is finished, the upgrade can't be cancelled anymore: it is committed.
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import io
+import threading
+import typing as t
+from pathlib import Path
+
+from antares.study.version.create_app import CreateApp
+from antares.study.version.model.study_version import StudyVersion
+from antares.study.version.show_app import ShowApp
+from antares.study.version.upgrade_app import UpgradeApp
+from antares.study.version.upgrade_app.events import BACKUP_FINISHED, STEP_FINISHED, STEP_STARTED, UpgradeEvent
+from antares.study.version.upgrade_app.exceptions import UpgradeCancelledError
+
+_T = t.TypeVar("_T")
+
+_CANCELLATION_POINTS = frozenset({BACKUP_FINISHED, STEP_STARTED, STEP_FINISHED})
+"""Kinds of the events at which a cancelled upgrade is interrupted (see `INTERRUPTIBLE_EVENTS`)."""
+
+
+async def _run(executor: t.Optional[concurrent.futures.Executor], func: t.Callable[..., _T], *args: t.Any) -> _T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+async def upgrade(
+    study_dir: Path,
+    version: str | StudyVersion,
+    *,
+    executor: t.Optional[concurrent.futures.Executor] = None,
+    **options: t.Any,
+) -> t.AsyncIterator[UpgradeEvent]:
+    """
+    Upgrade a study, and yield the progress events of the upgrade (see `UpgradeEvent`).
+
+    If the task is cancelled, or if the iteration stops early, the upgrade is interrupted at the next
+    step boundary and rolled back: the generator waits for the rollback before returning.
+    An upgrade cancelled after its last step is not interrupted: the generator waits for the commit.
+    Use `contextlib.aclosing` to stop the iteration early.
+
+    Args:
+        study_dir: The study directory.
+        version: The target version of the study.
+        executor: The executor used to run the upgrade (by default, the default executor of the event loop).
+        options: The other options of the `UpgradeApp` (for instance `jobs` or `output_dir`).
+
+    Yields:
+        The progress events of the upgrade.
+
+    Raises:
+        ApplicationError: If the study can't be upgraded.
+        UpgradeError: If the upgrade fails.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue[UpgradeEvent] = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def on_event(event: UpgradeEvent) -> None:
+        # The cancellation is checked before the event is queued: a cancellation requested
+        # by the consumer of an event can't interrupt the upgrade at this very event
+        if cancelled.is_set() and event.kind in _CANCELLATION_POINTS:
+            raise UpgradeCancelledError(event.study_dir)
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    app = await _run(executor, functools.partial(UpgradeApp, study_dir, version, on_event=on_event, **options))
+    future = loop.run_in_executor(executor, app)
+    try:
+        while not future.done():
+            getter = asyncio.ensure_future(events.get())
+            try:
+                await asyncio.wait({getter, future}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                getter.cancel()
+            if getter.done() and not getter.cancelled():
+                yield getter.result()
+        # The events are queued before the completion of the upgrade
+        while not events.empty():
+            yield events.get_nowait()
+        future.result()
+    finally:
+        if not future.done():
+            cancelled.set()
+            # The running step can't be interrupted: wait for the rollback
+            await asyncio.wait({future})
+            with contextlib.suppress(Exception):
+                future.result()
+
+
+async def create(
+    study_dir: Path,
+    caption: str,
+    version: str | StudyVersion,
+    author: str,
+    *,
+    editor: str = "",
+    executor: t.Optional[concurrent.futures.Executor] = None,
+) -> None:
+    """
+    Create a new study (see `CreateApp`).
+
+    Args:
+        study_dir: The directory of the new study (must not exist).
+        caption: The caption of the study.
+        version: The version of the study.
+        author: The author of the study.
+        editor: The editor of the study (the author by default).
+        executor: The executor used to create the study (by default, the default executor of the event loop).
+    """
+    app = await _run(executor, functools.partial(CreateApp, study_dir, caption, version, author, editor=editor))
+    await _run(executor, app)
+
+
+async def show(study_dir: Path, *, executor: t.Optional[concurrent.futures.Executor] = None) -> str:
+    """
+    Get the details of a study in human-readable format (see `ShowApp`).
+
+    Args:
+        study_dir: The study directory.
+        executor: The executor used to read the study (by default, the default executor of the event loop).
+
+    Returns:
+        The details of the study.
+    """
+    app = await _run(executor, ShowApp, study_dir)
+    buffer = io.StringIO()
+    await _run(executor, app, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,361 @@
+"""
+Upgrade of many studies in parallel worker processes.
+
+The studies are found in a root directory (the folders which contain a `study.antares` file),
+or read from a list file. Each study is upgraded in a worker process of a process pool:
+the workers import the upgrade modules (and pandas and numpy) once, and upgrade several studies.
+The result of each upgrade (status, duration, size of the upgraded files) is reported
+as soon as the upgrade is done, and can be written to a CSV file.
+
+The cost of each upgrade is estimated from the size of its files before the upgrades start,
+and the biggest studies are upgraded first (see `BatchScheduler`).
+
+The studies which are being upgraded by another process (see `StudyLock`) are skipped,
+and retried after the other studies.
+"""
+
+import concurrent.futures
+import csv
+import dataclasses
+import itertools
+import logging
+import os
+import time
+import typing as t
+from pathlib import Path
+
+from antares.study.version.batch_app.scheduler import BatchScheduler, RateLimiter, StudyTask
+from antares.study.version.model.study_antares import STUDY_ANTARES_PATH, StudyAntares
+from antares.study.version.model.study_version import StudyVersion
+from antares.study.version.upgrade_app import UpgradeApp, filter_out_child_files, is_temporary_upgrade_dir
+from antares.study.version.upgrade_app.events import PLAN_COMPUTED, UpgradeEvent
+from antares.study.version.upgrade_app.exceptions import StudyLockedError
+from antares.study.version.upgrade_app.scenario_mapping import scenarios
+from antares.study.version.upgrade_app.upgrade_report import DEFAULT_THROUGHPUT
+
+STATUS_UPGRADED = "upgraded"
+STATUS_UP_TO_DATE = "up-to-date"
+STATUS_FAILED = "failed"
+STATUS_LOCKED = "locked"
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ("study_dir", "status", "old_version", "new_version", "duration", "size", "error")
+"""Columns of the results table (see `write_results`)."""
+
+
+def find_studies(root_dir: Path) -> list[Path]:
+    """
+    Find the studies of a directory tree: the folders which contain a `study.antares` file.
+
+    The sub-folders of a study are not explored, nor the temporary directories of the upgrades.
+
+    Args:
+        root_dir: The root directory.
+
+    Returns:
+        The study directories, sorted.
+    """
+    study_dirs = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        if STUDY_ANTARES_PATH in filenames:
+            study_dirs.append(Path(dirpath))
+            dirnames.clear()
+        else:
+            dirnames[:] = [name for name in dirnames if not is_temporary_upgrade_dir(Path(dirpath, name))]
+    return sorted(study_dirs)
+
+
+def read_study_list(list_path: Path) -> list[Path]:
+    """
+    Read a list of study directories: one path per line, the empty lines and the comments (`#`) are ignored.
+
+    Args:
+        list_path: The list file. The relative paths are relative to the folder of the list file.
+
+    Returns:
+        The study directories, in the order of the list.
+    """
+    list_path = Path(list_path)
+    lines = (line.strip() for line in list_path.read_text(encoding="utf-8").splitlines())
+    return [list_path.parent / line for line in lines if line and not line.startswith("#")]
+
+
+@dataclasses.dataclass(frozen=True)
+class StudyResult:
+    """
+    Result of the upgrade of a study.
+
+    Attributes:
+        study_dir: The study directory.
+        status: The status of the upgrade: "upgraded", "up-to-date", "failed",
+            or "locked" if the study is being upgraded by another process.
+        old_version: The version of the study before the upgrade (empty if unknown).
+        new_version: The version of the study after the upgrade (empty if the upgrade failed).
+        duration: The duration of the upgrade, in seconds.
+        size: The size of the files concerned by the upgrade, in bytes.
+        error: The error message of a failed upgrade.
+    """
+
+    study_dir: Path
+    status: str
+    old_version: str = ""
+    new_version: str = ""
+    duration: float = 0.0
+    size: int = 0
+    error: str = ""
+
+
+def _get_size(path: Path) -> int:
+    """Get the total size (in bytes) of a file, or of the files of a folder (0 if the path is missing)."""
+    try:
+        with os.scandir(path) as entries:
+            return sum(_get_size(Path(entry.path)) if entry.is_dir() else entry.stat().st_size for entry in entries)
+    except NotADirectoryError:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def estimate_study(
+    study_dir: Path,
+    version: StudyVersion,
+    throughput: float = DEFAULT_THROUGHPUT,
+) -> StudyTask:
+    """
+    Estimate the cost of the upgrade of a study, from the sizes of the files of its upgrade plan.
+
+    The estimate is cheap: only the 'study.antares' file is read, and the files listed in the plan are
+    sized once (the preconditions of the upgrade are checked by the upgrade itself, see `UpgradeApp.plan`).
+    As for `UpgradeApp.plan`, the files are copied once for the backup, then read and written by each step:
+    the more versions to upgrade, the higher the cost.
+
+    Args:
+        study_dir: The study directory.
+        version: The target version of the study.
+        throughput: The disk throughput (in bytes per second) used to estimate the duration of the upgrade.
+
+    Returns:
+        The upgrade task: a zero cost is estimated if the study is up-to-date or can't be upgraded.
+    """
+    try:
+        device = os.stat(study_dir).st_dev
+    except OSError:
+        return StudyTask(study_dir)
+    try:
+        current = StudyAntares.from_ini_file(study_dir).version
+        if current >= version:
+            return StudyTask(study_dir, device=device)
+        plan = scenarios.get_plan(current, version)
+    except Exception:
+        # The error is reported by the upgrade itself
+        return StudyTask(study_dir, device=device)
+
+    sizes: dict[str, int] = {}
+
+    def get_size(relpath: str) -> int:
+        if relpath not in sizes:
+            sizes[relpath] = _get_size(study_dir / relpath)
+        return sizes[relpath]
+
+    backup_size = sum(map(get_size, filter_out_child_files(plan.files)))
+    read_size = sum(get_size(relpath) for step in plan.steps for relpath in step.reads)
+    write_size = sum(get_size(relpath) for step in plan.steps for relpath in step.files)
+    size = backup_size + read_size + write_size
+    io_size = 2 * backup_size + read_size + 2 * write_size
+    return StudyTask(study_dir, size=size, cost=io_size / throughput, device=device)
+
+
+def upgrade_study(study_dir: Path, version: StudyVersion, options: t.Mapping[str, t.Any]) -> StudyResult:
+    """
+    Upgrade a study, and report the result instead of raising an exception.
+
+    The study is skipped if it is locked by another process (see `UpgradeApp.lock`).
+
+    Args:
+        study_dir: The study directory.
+        version: The target version of the study.
+        options: The other options of the `UpgradeApp` (for instance `jobs` or `cache_dir`).
+
+    Returns:
+        The result of the upgrade.
+    """
+    start = time.perf_counter()
+    old_version = ""
+    size = 0
+
+    def on_event(event: UpgradeEvent) -> None:
+        nonlocal size
+        if event.kind == PLAN_COMPUTED:
+            size = event.size
+
+    try:
+        app = UpgradeApp(study_dir, version=version, on_event=on_event, lock_timeout=0, **options)
+        with app.lock():
+            current = app.study_antares.version
+            old_version = f"{current:2d}"
+            if current >= version:
+                duration = time.perf_counter() - start
+                return StudyResult(study_dir, STATUS_UP_TO_DATE, old_version, old_version, duration=duration)
+            app()
+    except StudyLockedError as e:
+        duration = time.perf_counter() - start
+        return StudyResult(study_dir, STATUS_LOCKED, duration=duration, error=str(e))
+    except Exception as e:
+        duration = time.perf_counter() - start
+        error = str(e) or type(e).__name__
+        return StudyResult(study_dir, STATUS_FAILED, old_version, duration=duration, size=size, error=error)
+    duration = time.perf_counter() - start
+    return StudyResult(study_dir, STATUS_UPGRADED, old_version, f"{version:2d}", duration=duration, size=size)
+
+
+def _init_worker() -> None:
+    """Import the upgrade modules (and pandas and numpy) once per worker process."""
+    import antares.study.version.upgrade_app.scenario_mapping  # noqa: F401
+
+
+class _InlineExecutor(concurrent.futures.Executor):
+    """Executor which runs the functions in the current process, when they are submitted."""
+
+    def submit(self, fn: t.Callable[..., t.Any], /, *args: t.Any, **kwargs: t.Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def write_results(results: t.Iterable[StudyResult], csv_path: Path) -> None:
+    """
+    Write the results of the upgrades to a CSV file (see `RESULT_FIELDS`).
+
+    Args:
+        results: The results of the upgrades.
+        csv_path: The path of the CSV file.
+    """
+    with open(csv_path, mode="w", encoding="utf-8", newline="") as fd:
+        writer = csv.DictWriter(fd, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for result in results:
+            row = dataclasses.asdict(result)
+            writer.writerow({**row, "study_dir": str(result.study_dir), "duration": f"{result.duration:.3f}"})
+
+
+@dataclasses.dataclass
+class BatchUpgradeApp:
+    """
+    Upgrade many studies in parallel worker processes.
+
+    Attributes:
+        study_dirs: The study directories (see `find_studies` and `read_study_list`).
+        version: The target version of the studies.
+        workers: The number of worker processes (1 to upgrade the studies in the current process).
+            By default, the number of CPUs.
+        jobs: The maximum number of threads used by each worker to upgrade a study (see `UpgradeApp`).
+            By default, the studies are upgraded sequentially in each worker, since the workers run in parallel.
+        cache_dir: The directory of the cache of the file-level transformations, shared by the workers
+            (see `UpgradeApp`). Many studies share the same matrices: a cache is recommended.
+        on_result: Function called with the result of each upgrade, as soon as the upgrade is done.
+        max_per_device: The maximum number of upgrades running at the same time on the same device
+            (for instance, a shared NAS). By default, no limit.
+        max_bytes_per_second: The cap of the rate of the upgrades, in bytes per second (see `RateLimiter`).
+            By default, no limit.
+        lock_retries: The number of times a study locked by another process is retried,
+            after the other studies, before being reported as "locked".
+        lock_retry_delay: The minimum time between two attempts to upgrade a locked study, in seconds.
+    """
+
+    study_dirs: t.Sequence[Path]
+    version: StudyVersion
+    workers: t.Optional[int] = None
+    jobs: t.Optional[int] = 1
+    cache_dir: t.Optional[Path] = None
+    on_result: t.Optional[t.Callable[[StudyResult], None]] = None
+    max_per_device: t.Optional[int] = None
+    max_bytes_per_second: t.Optional[int] = None
+    lock_retries: int = 3
+    lock_retry_delay: float = 10.0
+
+    def __post_init__(self):
+        """Parse, validate and initialize the fields of the object."""
+        self.study_dirs = list(dict.fromkeys(Path(study_dir) for study_dir in self.study_dirs))
+        self.version = StudyVersion.parse(self.version)
+        self.cache_dir = None if self.cache_dir is None else Path(self.cache_dir)
+        if self.workers is not None and self.workers < 1:
+            raise ValueError(f"Invalid number of workers: {self.workers}")
+        if self.jobs is not None and self.jobs < 1:
+            raise ValueError(f"Invalid number of jobs: {self.jobs}")
+        if self.max_per_device is not None and self.max_per_device < 1:
+            raise ValueError(f"Invalid number of upgrades per device: {self.max_per_device}")
+        if self.max_bytes_per_second is not None and self.max_bytes_per_second <= 0:
+            raise ValueError(f"Invalid rate: {self.max_bytes_per_second}")
+        if self.lock_retries < 0:
+            raise ValueError(f"Invalid number of lock retries: {self.lock_retries}")
+        if self.lock_retry_delay < 0:
+            raise ValueError(f"Invalid lock retry delay: {self.lock_retry_delay}")
+
+    def __call__(self) -> list[StudyResult]:
+        """
+        Upgrade the studies.
+
+        The costs of the upgrades are estimated first, then the upgrades are started
+        in decreasing order of cost, within the limits of the devices and of the rate.
+        The studies locked by another process are retried after the other studies (see `lock_retries`).
+
+        Returns:
+            The results of the upgrades, in the order of the study directories.
+        """
+        options = {"jobs": self.jobs, "cache_dir": self.cache_dir}
+        workers = min(self.workers or os.cpu_count() or 1, max(len(self.study_dirs), 1))
+        executor: concurrent.futures.Executor
+        if workers == 1:
+            executor = _InlineExecutor()
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        results: dict[Path, StudyResult] = {}
+        with executor:
+            versions = itertools.repeat(self.version)
+            tasks = list(executor.map(estimate_study, self.study_dirs, versions))
+            rate_limiter = None if self.max_bytes_per_second is None else RateLimiter(self.max_bytes_per_second)
+            scheduler = BatchScheduler(
+                tasks,
+                max_running=workers,
+                max_per_device=self.max_per_device,
+                rate_limiter=rate_limiter,
+            )
+            running: dict[concurrent.futures.Future, StudyTask] = {}
+            lock_retries: dict[StudyTask, int] = {}
+            while not scheduler.done:
+                task, delay = scheduler.next_task()
+                if task is not None:
+                    scheduler.start(task)
+                    running[executor.submit(upgrade_study, task.study_dir, self.version, options)] = task
+                    continue
+                if not running:
+                    # Only the rate limit or the delay of a retry can prevent an upgrade from starting
+                    time.sleep(delay or 0)
+                    continue
+                done, _ = concurrent.futures.wait(
+                    running, timeout=delay, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker process may have been killed (for instance, out of memory)
+                        result = StudyResult(task.study_dir, STATUS_FAILED, error=str(e) or type(e).__name__)
+                    if result.status == STATUS_LOCKED and lock_retries.get(task, 0) < self.lock_retries:
+                        lock_retries[task] = lock_retries.get(task, 0) + 1
+                        logger.info("%s: locked by another process, retried later", task.study_dir)
+                        scheduler.retry(task, delay=self.lock_retry_delay)
+                        continue
+                    scheduler.finish(task)
+                    self._report(results, result)
+        return [results[study_dir] for study_dir in self.study_dirs]
+
+    def _report(self, results: dict[Path, StudyResult], result: StudyResult) -> None:
+        results[result.study_dir] = result
+        if self.on_result is not None:
+            self.on_result(result)
@@ -0,0 +1,160 @@
+"""
+Scheduling of the upgrades of a batch of studies.
+
+The studies are started in decreasing order of their estimated cost (Longest Processing Time first),
+so that a few huge studies don't trail at the end of a campaign. The number of upgrades running
+on the same device (`st_dev`, for instance a shared NAS) can be limited, and the rate of the upgrades
+can be capped (in bytes per second), so that a campaign doesn't saturate the storage.
+An upgrade can be retried later, for instance when the study is locked by another process.
+"""
+
+import collections
+import dataclasses
+import time
+import typing as t
+from pathlib import Path
+
+
+@dataclasses.dataclass(frozen=True)
+class StudyTask:
+    """
+    Upgrade of a study, with its estimated cost.
+
+    Attributes:
+        study_dir: The study directory.
+        size: The size of the files concerned by the upgrade, in bytes.
+        cost: The estimated duration of the upgrade, in seconds.
+        device: The device of the study directory (`st_dev`), or -1 if unknown.
+    """
+
+    study_dir: Path
+    size: int = 0
+    cost: float = 0.0
+    device: int = -1
+
+
+class RateLimiter:
+    """
+    Cap of the rate of the upgrades, in bytes per second.
+
+    Each upgrade delays the start of the next one by the time needed to process its files at the given rate.
+    The rate is based on the estimated size of the upgrades, so it is an approximation of the real I/O rate.
+    """
+
+    def __init__(self, bytes_per_second: float, clock: t.Callable[[], float] = time.monotonic) -> None:
+        if bytes_per_second <= 0:
+            raise ValueError(f"Invalid rate: {bytes_per_second}")
+        self.bytes_per_second = bytes_per_second
+        self._clock = clock
+        self._next_time = clock()
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(bytes_per_second={self.bytes_per_second!r})"
+
+    def get_delay(self) -> float:
+        """Get the time to wait (in seconds) before starting the next upgrade."""
+        return max(0.0, self._next_time - self._clock())
+
+    def consume(self, size: int) -> None:
+        """Record the start of an upgrade of the given size (in bytes)."""
+        self._next_time = max(self._next_time, self._clock()) + size / self.bytes_per_second
+
+
+class BatchScheduler:
+    """
+    Choose the next upgrade to start, according to the estimated costs and the limits.
+
+    Usage::
+
+        scheduler = BatchScheduler(tasks, max_running=4, max_per_device=2)
+        while not scheduler.done:
+            task, delay = scheduler.next_task()
+            if task is not None:
+                scheduler.start(task)
+                ...  # submit the upgrade
+            else:
+                ...  # wait for a running upgrade to finish (at most `delay` seconds)
+                scheduler.finish(task)
+
+    Args:
+        tasks: The upgrades to run.
+        max_running: The maximum number of upgrades running at the same time.
+        max_per_device: The maximum number of upgrades running at the same time on the same device.
+        rate_limiter: The cap of the rate of the upgrades.
+        clock: The clock used to delay the retried upgrades (see `retry`).
+    """
+
+    def __init__(
+        self,
+        tasks: t.Iterable[StudyTask],
+        *,
+        max_running: int,
+        max_per_device: t.Optional[int] = None,
+        rate_limiter: t.Optional[RateLimiter] = None,
+        clock: t.Callable[[], float] = time.monotonic,
+    ) -> None:
+        # Longest Processing Time first (the sort is stable: equal costs keep their order)
+        self.pending = sorted(tasks, key=lambda task: task.cost, reverse=True)
+        self.running: list[StudyTask] = []
+        self.max_running = max_running
+        self.max_per_device = max_per_device
+        self.rate_limiter = rate_limiter
+        self._device_counts: collections.Counter[int] = collections.Counter()
+        self._clock = clock
+        self._retry_times: dict[StudyTask, float] = {}
+
+    @property
+    def done(self) -> bool:
+        """Whether all the upgrades are finished."""
+        return not self.pending and not self.running
+
+    def next_task(self) -> tuple[t.Optional[StudyTask], t.Optional[float]]:
+        """
+        Choose the next upgrade to start.
+
+        Returns:
+            The upgrade to start now (or `None` if no upgrade can be started now),
+            and the time to wait (in seconds) before an upgrade can be started,
+            or `None` if a running upgrade must finish first.
+        """
+        if len(self.running) >= self.max_running:
+            return None, None
+        available = [task for task in self.pending if self._is_device_available(task.device)]
+        if not available:
+            return None, None
+        now = self._clock()
+        delay = 0.0 if self.rate_limiter is None else self.rate_limiter.get_delay()
+        task = next((task for task in available if self._retry_times.get(task, now) <= now), None)
+        if task is None:
+            retry_delay = min(self._retry_times[task] - now for task in available)
+            return None, max(delay, retry_delay)
+        return (task, 0.0) if delay <= 0 else (None, delay)
+
+    def _is_device_available(self, device: int) -> bool:
+        return self.max_per_device is None or self._device_counts[device] < self.max_per_device
+
+    def start(self, task: StudyTask) -> None:
+        """Record the start of an upgrade."""
+        self.pending.remove(task)
+        self.running.append(task)
+        self._device_counts[task.device] += 1
+        if self.rate_limiter is not None:
+            self.rate_limiter.consume(task.size)
+
+    def finish(self, task: StudyTask) -> None:
+        """Record the end of an upgrade."""
+        self.running.remove(task)
+        self._device_counts[task.device] -= 1
+
+    def retry(self, task: StudyTask, delay: float = 0.0) -> None:
+        """
+        Record the end of an upgrade which must be run again, after the other pending upgrades.
+
+        Args:
+            task: The upgrade to run again.
+            delay: The minimum time to wait (in seconds) before running the upgrade again.
+        """
+        self.finish(task)
+        self.pending.append(task)
+        self._retry_times[task] = self._clock() + delay
@@ -5,21 +5,51 @@ This module defines the following CLI commands:
 
 - antares-study-version show: display the details of a study in human-readable format (name, version, creation date, etc.)
 - antares-study-version create: create a new study.
+- antares-study-version upgrade: upgrade a study to a new version.
+- antares-study-version upgrade-many: upgrade many studies in parallel worker processes.
 """
 
+import collections
+import json
+import sys
+import threading
+import typing as t
+import zipfile
 from pathlib import Path
 
 import click
 
 from antares.study.version import StudyVersion
 from antares.study.version.__about__ import __date__, __version__
+from antares.study.version.batch_app import (
+    STATUS_FAILED,
+    STATUS_LOCKED,
+    BatchUpgradeApp,
+    StudyResult,
+    find_studies,
+    read_study_list,
+    write_results,
+)
 from antares.study.version.create_app import CreateApp, available_versions
 from antares.study.version.exceptions import ApplicationError
 from antares.study.version.show_app import ShowApp
-from antares.study.version.upgrade_app import UpgradeApp
+from antares.study.version.upgrade_app import MultiVersionUpgradeApp, UpgradeApp, ZipUpgradeApp
+from antares.study.version.upgrade_app.events import (
+    ENTITY_PROGRESS,
+    STEP_FINISHED,
+    TERMINAL_EVENTS,
+    UPGRADE_STARTED,
+    EventCallback,
+    UpgradeEvent,
+)
+from antares.study.version.upgrade_app.exceptions import UpgradeError
+from antares.study.version.upgrade_app.matrix_resolver import DirectoryMatrixStore
 
 INTERRUPTED_BY_THE_USER = "Operation interrupted by the user."
 
+# The progress events can be reported by several threads
+_ECHO_LOCK = threading.Lock()
+
 
 @click.group(context_settings={"max_content_width": 120})
 @click.version_option(__version__, message=f"v{__version__} ({__date__})")
@@ -123,33 +153,387 @@ def create(study_dir: str, caption: str, version: str, author: str) -> None:
 @cli.command()
 @click.argument(
     "study_dir",
-    type=click.Path(exists=True, file_okay=False, dir_okay=True, resolve_path=True),
+    type=click.Path(exists=True, file_okay=True, dir_okay=True, resolve_path=True),
 )
 @click.option(
     "-v",
     "--version",
-    default=available_versions()[-1],
-    help="Version of the study to create",
+    "versions",
+    default=[available_versions()[-1]],
+    multiple=True,
+    help="Target version of the study (can be repeated to upgrade the study to several versions, see --output-dir)",
     show_default=True,
     type=click.Choice(available_versions()),
 )
-def upgrade(study_dir: str, version: str) -> None:
+@click.option(
+    "--output",
+    default=None,
+    help=(
+        "Directory (or zip archive, for an archived study) where the upgraded study is written"
+        " (the study is left unchanged)."
+        " The files which are not changed by the upgrade are hardlinked, when possible."
+    ),
+    type=click.Path(exists=False, file_okay=True, dir_okay=True, resolve_path=True),
+)
+@click.option(
+    "-o",
+    "--output-dir",
+    default=None,
+    help=(
+        "Directory where a copy of the study is written at each target version (the study is left unchanged)."
+        " The unchanged files are shared between the copies with hardlinks, when possible."
+    ),
+    type=click.Path(file_okay=False, dir_okay=True, resolve_path=True),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=None,
+    help="Maximum number of threads used to upgrade the study files (by default, depends on the number of CPUs)",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--cache-dir",
+    default=None,
+    help=(
+        "Directory of a cache of the upgraded matrices, shared by several studies:"
+        " the matrices already upgraded for another study are copied instead of being recomputed."
+    ),
+    type=click.Path(file_okay=False, dir_okay=True, resolve_path=True),
+)
+@click.option(
+    "--matrix-store",
+    default=None,
+    help=(
+        "Directory of the matrix store of a normalized study (one '<matrix-id>.tsv' file per matrix):"
+        " the matrix links of the matrices changed by the upgrade are replaced by their matrices,"
+        " the other links are left unchanged."
+    ),
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, resolve_path=True),
+)
+@click.option(
+    "--keep-matrix-links",
+    is_flag=True,
+    default=False,
+    help=(
+        "Keep the matrix links of the study (requires --matrix-store): the matrices are upgraded in the matrix store,"
+        " once per distinct matrix, and the study gets links to the new matrices."
+    ),
+)
+@click.option(
+    "--progress",
+    default="none",
+    help=(
+        "Display the progress of the upgrade: as a progress bar (on the standard error),"
+        " or as JSON events, one per line (on the standard output)."
+    ),
+    show_default=True,
+    type=click.Choice(["none", "bar", "json"]),
+)
+@click.option(
+    "--lock-timeout",
+    default=None,
+    help=(
+        "Maximum time (in seconds) to wait for the study (or the archive) if it is being upgraded by another process"
+        " (0 to fail immediately). By default, wait until the study is unlocked."
+    ),
+    type=click.FloatRange(min=0),
+)
+@click.option(
+    "--plan",
+    "dry_run",
+    is_flag=True,
+    default=False,
+    help="Display the upgrade plan (steps, files, backup size and free space) without changing anything.",
+)
+def upgrade(
+    study_dir: str,
+    versions: t.Sequence[str],
+    output: t.Optional[str],
+    output_dir: t.Optional[str],
+    jobs: t.Optional[int],
+    cache_dir: t.Optional[str],
+    matrix_store: t.Optional[str],
+    keep_matrix_links: bool,
+    progress: str,
+    lock_timeout: t.Optional[float],
+    dry_run: bool,
+) -> None:
     """
     Upgrade a study to a new version.
 
-    STUDY_DIR: The directory containing the study to upgrade.
+    STUDY_DIR: The directory containing the study to upgrade, or the zip archive of the study.
     """
+    cache_path = None if cache_dir is None else Path(cache_dir)
+    resolver = None if matrix_store is None else DirectoryMatrixStore(Path(matrix_store))
+    if keep_matrix_links and resolver is None:
+        click.echo("Error: the --keep-matrix-links option requires the --matrix-store option", err=True)
+        raise click.Abort()
+    options: dict[str, t.Any] = {
+        "jobs": jobs,
+        "cache_dir": cache_path,
+        "matrix_resolver": resolver,
+        "keep_matrix_links": keep_matrix_links,
+        "on_event": _get_event_callback(progress),
+    }
+    if Path(study_dir).is_file():
+        if len(versions) > 1:
+            click.echo("Error: the upgrade of an archive to several versions is not supported", err=True)
+            raise click.Abort()
+        elif output_dir is not None or dry_run:
+            click.echo("Error: the --output-dir and --plan options are not supported for archives", err=True)
+            raise click.Abort()
+        output_path = None if output is None else Path(output)
+        _upgrade_archive(Path(study_dir), versions[0], output_path, {**options, "lock_timeout": lock_timeout})
+        return
+    elif output is not None and output_dir is not None:
+        click.echo("Error: the --output and --output-dir options can't be used together", err=True)
+        raise click.Abort()
+    elif output_dir is not None:
+        if dry_run:
+            click.echo("Error: the --plan and --output-dir options can't be used together", err=True)
+            raise click.Abort()
+        _upgrade_to_versions(Path(study_dir), versions, Path(output_dir), {**options, "lock_timeout": lock_timeout})
+        return
+    elif len(versions) > 1:
+        click.echo("Error: the --output-dir option is required to upgrade a study to several versions", err=True)
+        raise click.Abort()
+
     try:
-        app = UpgradeApp(Path(study_dir), version=StudyVersion.parse(version))
+        app = UpgradeApp(
+            Path(study_dir),
+            version=StudyVersion.parse(versions[0]),
+            output_dir=None if output is None else Path(output),
+            lock_timeout=lock_timeout,
+            **options,
+        )
+    except (ValueError, FileNotFoundError) as e:
+        click.echo(f"Error: {e}", err=True)
+        raise click.Abort()
+
+    try:
+        if dry_run:
+            report = app.plan()
+            click.echo(str(report))
+            if not report.has_enough_space:
+                click.echo("Error: not enough free space to back up the study files", err=True)
+                raise click.Abort()
+        else:
+            app()
+    except (ApplicationError, UpgradeError, FileExistsError) as e:
+        click.echo(f"Error: {e}", err=True)
+        raise click.Abort()
+    except KeyboardInterrupt:
+        click.echo(INTERRUPTED_BY_THE_USER, err=True)
+        raise click.Abort()
+
+
+class _ProgressBar:
+    """Display the progress events of the upgrades as a progress bar (one bar per upgrade)."""
+
+    def __init__(self) -> None:
+        self._bar: t.Any = None
+
+    def __call__(self, event: UpgradeEvent) -> None:
+        with _ECHO_LOCK:
+            if event.kind == UPGRADE_STARTED:
+                self._bar = click.progressbar(
+                    length=event.total, label=event.name, item_show_func=lambda item: item, file=sys.stderr
+                )
+                self._bar.__enter__()
+            elif self._bar is None:
+                return
+            elif event.kind == STEP_FINISHED:
+                self._bar.update(1, current_item=event.name)
+            elif event.kind == ENTITY_PROGRESS:
+                self._bar.update(0, current_item=f"{event.name} {event.done}/{event.total}")
+            elif event.kind in TERMINAL_EVENTS:
+                self._bar.__exit__(None, None, None)
+                self._bar = None
+
+
+def _echo_json_event(event: UpgradeEvent) -> None:
+    """Display a progress event as a JSON object, on a single line (NDJSON)."""
+    line = json.dumps(event.to_dict())
+    with _ECHO_LOCK:
+        click.echo(line)
+
+
+def _get_event_callback(progress: str) -> t.Optional[EventCallback]:
+    if progress == "bar":
+        return _ProgressBar()
+    elif progress == "json":
+        return _echo_json_event
+    return None
+
+
+def _upgrade_to_versions(
+    study_dir: Path, versions: t.Sequence[str], output_dir: Path, options: t.Mapping[str, t.Any]
+) -> None:
+    target_versions = [StudyVersion.parse(v) for v in versions]
+    try:
+        app = MultiVersionUpgradeApp(study_dir, target_versions, output_dir, **options)
+    except (ValueError, FileNotFoundError) as e:
+        click.echo(f"Error: {e}", err=True)
+        raise click.Abort()
+
+    try:
+        snapshot_dirs = app()
+        if options["on_event"] is not _echo_json_event:
+            for snapshot_dir in snapshot_dirs:
+                click.echo(f"Study written to '{snapshot_dir}'")
+    except (ApplicationError, UpgradeError, FileExistsError) as e:
+        click.echo(f"Error: {e}", err=True)
+        raise click.Abort()
+    except KeyboardInterrupt:
+        click.echo(INTERRUPTED_BY_THE_USER, err=True)
+        raise click.Abort()
+
+
+def _upgrade_archive(zip_path: Path, version: str, output: t.Optional[Path], options: t.Mapping[str, t.Any]) -> None:
+    try:
+        app = ZipUpgradeApp(zip_path, StudyVersion.parse(version), output_path=output, **options)
     except (ValueError, FileNotFoundError) as e:
         click.echo(f"Error: {e}", err=True)
         raise click.Abort()
 
     try:
         app()
-    except ApplicationError as e:
+    except (ApplicationError, UpgradeError, FileExistsError, zipfile.BadZipFile) as e:
         click.echo(f"Error: {e}", err=True)
         raise click.Abort()
     except KeyboardInterrupt:
         click.echo(INTERRUPTED_BY_THE_USER, err=True)
         raise click.Abort()
+
+
+@cli.command(name="upgrade-many")
+@click.argument(
+    "root_or_list",
+    type=click.Path(exists=True, file_okay=True, dir_okay=True, resolve_path=True),
+)
+@click.option(
+    "-v",
+    "--version",
+    default=available_versions()[-1],
+    help="Target version of the studies",
+    show_default=True,
+    type=click.Choice(available_versions()),
+)
+@click.option(
+    "-w",
+    "--workers",
+    default=None,
+    help="Number of worker processes (by default, the number of CPUs)",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    help="Maximum number of threads used by each worker to upgrade a study",
+    show_default=True,
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--cache-dir",
+    default=None,
+    help="Directory of a cache of the upgraded matrices, shared by the workers (see the upgrade command).",
+    type=click.Path(file_okay=False, dir_okay=True, resolve_path=True),
+)
+@click.option(
+    "--max-per-device",
+    default=None,
+    help="Maximum number of upgrades running at the same time on the same device (for instance, a shared NAS)",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--max-bytes-per-second",
+    default=None,
+    help="Cap of the rate of the upgrades, in bytes per second (estimated from the files of the upgrades)",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--lock-retries",
+    default=3,
+    help="Number of times a study being upgraded by another process is retried, after the other studies",
+    show_default=True,
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--lock-retry-delay",
+    default=10.0,
+    help="Minimum time (in seconds) between two attempts to upgrade a locked study",
+    show_default=True,
+    type=click.FloatRange(min=0),
+)
+@click.option(
+    "--results",
+    "results_path",
+    default=None,
+    help="CSV file where the result of each upgrade (status, duration, size) is written.",
+    type=click.Path(file_okay=True, dir_okay=False, resolve_path=True),
+)
+def upgrade_many(
+    root_or_list: str,
+    version: str,
+    workers: t.Optional[int],
+    jobs: int,
+    cache_dir: t.Optional[str],
+    max_per_device: t.Optional[int],
+    max_bytes_per_second: t.Optional[int],
+    lock_retries: int,
+    lock_retry_delay: float,
+    results_path: t.Optional[str],
+) -> None:
+    """
+    Upgrade many studies in parallel worker processes.
+
+    The biggest studies are upgraded first, so that a few huge studies don't trail at the end.
+    The studies being upgraded by another process are skipped, and retried after the other studies.
+
+    ROOT_OR_LIST: The directory where the studies are searched (the folders containing a 'study.antares' file),
+    or a file listing the study directories (one per line).
+    """
+    path = Path(root_or_list)
+    study_dirs = read_study_list(path) if path.is_file() else find_studies(path)
+    if not study_dirs:
+        click.echo(f"No study found in '{path}'")
+        return
+
+    try:
+        app = BatchUpgradeApp(
+            study_dirs,
+            StudyVersion.parse(version),
+            workers=workers,
+            jobs=jobs,
+            cache_dir=None if cache_dir is None else Path(cache_dir),
+            on_result=_echo_result,
+            max_per_device=max_per_device,
+            max_bytes_per_second=max_bytes_per_second,
+            lock_retries=lock_retries,
+            lock_retry_delay=lock_retry_delay,
+        )
+        results = app()
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        raise click.Abort()
+    except KeyboardInterrupt:
+        click.echo(INTERRUPTED_BY_THE_USER, err=True)
+        raise click.Abort()
+
+    if results_path is not None:
+        write_results(results, Path(results_path))
+    counts = collections.Counter(result.status for result in results)
+    click.echo(", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    if counts[STATUS_FAILED]:
+        click.echo(f"Error: the upgrade of {counts[STATUS_FAILED]} studies failed", err=True)
+    if counts[STATUS_LOCKED]:
+        click.echo(f"Error: {counts[STATUS_LOCKED]} studies are locked by another process", err=True)
+    if counts[STATUS_FAILED] or counts[STATUS_LOCKED]:
+        raise click.Abort()
+
+
+def _echo_result(result: StudyResult) -> None:
+    line = f"{result.status:<10} {result.duration:8.1f} s {result.size:>14} B  {result.study_dir}"
+    click.echo(f"{line}: {result.error}" if result.error else line)
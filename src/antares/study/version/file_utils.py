@@ -0,0 +1,313 @@
+"""
+File system utilities: atomic writes, hardlink snapshots and zip archives.
+
+The files of a study may be shared with a snapshot of the study (hardlinks).
+To keep the snapshots unchanged, the study files are never rewritten in place:
+the new content is written to a temporary file which replaces the original file.
+"""
+
+import contextlib
+import copy
+import os
+import shutil
+import struct
+import typing as t
+import uuid
+import zipfile
+from pathlib import Path, PurePath
+
+_ZIP64_EXTRA_ID = 0x0001
+_CHUNK_SIZE = 1024 * 1024
+
+# Records of the zip format (see the APPNOTE.TXT specification of PKWARE)
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s2B5H3L5H2L")
+_END_OF_CENTRAL_DIR = struct.Struct("<4s4H2LH")
+_ZIP64_END_OF_CENTRAL_DIR = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_LOCATOR = struct.Struct("<4sLQL")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+_END_OF_CENTRAL_DIR_SIGNATURE = b"PK\x05\x06"
+_ZIP64_END_OF_CENTRAL_DIR_SIGNATURE = b"PK\x06\x06"
+_ZIP64_END_LOCATOR_SIGNATURE = b"PK\x06\x07"
+_ENCRYPTED_FLAG = 0x01
+_DATA_DESCRIPTOR_FLAG = 0x08
+_UTF8_FLAG = 0x800
+_ZIP64_VERSION = 45
+
+
+@contextlib.contextmanager
+def atomic_write(path: Path, mode: str = "w", encoding: t.Optional[str] = None) -> t.Iterator[t.IO[t.Any]]:
+    """
+    Open a file for writing, and replace the original file atomically when the file is closed.
+
+    A reader never sees a partially written file, and the other hardlinks of the original file
+    (for instance, a snapshot of the study) are not changed.
+    The permissions of the original file are kept. If an error occurs, the original file is left unchanged.
+
+    Usage::
+
+        with atomic_write(study_dir / "settings/generaldata.ini") as fp:
+            fp.write(content)
+
+    Args:
+        path: The path of the file to write.
+        mode: The opening mode ("w" or "wb").
+        encoding: The text encoding (by default, the locale encoding is used, like `open`).
+
+    Yields:
+        The file object of the temporary file.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"~{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    # The temporary file is created with the default permissions (like `open`)
+    with open(tmp_path, mode=mode.replace("w", "x"), encoding=encoding) as fp:
+        try:
+            yield fp
+        except BaseException:
+            fp.close()
+            tmp_path.unlink()
+            raise
+    try:
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink()
+        raise
+
+
+def link_or_copy(src: Path, dst: Path) -> bool:
+    """
+    Create a hardlink of a file, or copy it if hardlinks are not supported (for instance, across devices).
+
+    Args:
+        src: The source file.
+        dst: The destination file (must not exist).
+
+    Returns:
+        Whether a hardlink was created.
+    """
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        shutil.copy2(src, dst)
+        return False
+
+
+def is_under(relpath: str, prefixes: t.Collection[str]) -> bool:
+    """Check if a relative path (in POSIX format) is equal to, or a child of, one of the given paths."""
+    return any(relpath == prefix or relpath.startswith(f"{prefix}/") for prefix in prefixes)
+
+
+def snapshot_tree(src_dir: Path, dst_dir: Path, *, copies: t.Collection[str] = ()) -> None:
+    """
+    Make a snapshot of a directory: the directory tree is recreated, and the files are hardlinked (or copied).
+
+    The snapshot costs only the metadata of the files. It stays unchanged as long as the files
+    of both trees are only replaced (see `atomic_write`), and never rewritten in place.
+
+    Args:
+        src_dir: The directory to snapshot.
+        dst_dir: The destination directory (must not exist).
+        copies: The files and folders (relative to the source directory, in POSIX format)
+            which are copied instead of being hardlinked, because they will be changed.
+    """
+    src_dir, dst_dir = Path(src_dir), Path(dst_dir)
+    prefixes = [PurePath(relpath).as_posix() for relpath in copies]
+    dst_dir.mkdir(parents=True)
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        reldir = Path(dirpath).relative_to(src_dir)
+        for name in dirnames:
+            dst_dir.joinpath(reldir, name).mkdir()
+        for name in filenames:
+            src_path, dst_path = Path(dirpath, name), dst_dir.joinpath(reldir, name)
+            if is_under(reldir.joinpath(name).as_posix(), prefixes):
+                shutil.copy2(src_path, dst_path)
+            else:
+                link_or_copy(src_path, dst_path)
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """Remove the ZIP64 extra fields (they are rebuilt when the header is written)."""
+    fields, pos = [], 0
+    while pos + 4 <= len(extra):
+        field_id, size = struct.unpack("<HH", extra[pos : pos + 4])
+        if field_id != _ZIP64_EXTRA_ID:
+            fields.append(extra[pos : pos + 4 + size])
+        pos += 4 + size
+    return b"".join(fields)
+
+
+def copy_zip_member(src: zipfile.ZipFile, info: zipfile.ZipInfo, dst: zipfile.ZipFile) -> None:
+    """
+    Copy a member of a zip archive into another archive, by decompressing and compressing it again.
+
+    The member keeps its name, compression method, timestamp and attributes.
+    The member is copied chunk by chunk, so that large members are never loaded in memory.
+    This is the fallback of `copy_zip_members`, for the members which can't be copied as raw bytes.
+
+    Args:
+        src: The source archive (opened for reading).
+        info: The member to copy.
+        dst: The destination archive (opened for writing).
+    """
+    zinfo = copy.copy(info)
+    zinfo.extra = _strip_zip64_extra(info.extra)
+    if info.is_dir():
+        dst.writestr(zinfo, b"")
+        return
+    force_zip64 = info.file_size > zipfile.ZIP64_LIMIT
+    with src.open(info) as src_fp, dst.open(zinfo, mode="w", force_zip64=force_zip64) as dst_fp:
+        shutil.copyfileobj(src_fp, dst_fp, _CHUNK_SIZE)
+
+
+def _encode_dos_date_time(date_time: tuple[int, int, int, int, int, int]) -> tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+def _encode_filename(info: zipfile.ZipInfo) -> bytes:
+    # The names without the UTF-8 flag are decoded as CP437 by `zipfile`: the original bytes are restored
+    return info.filename.encode("utf-8" if info.flag_bits & _UTF8_FLAG else "cp437")
+
+
+def _copy_raw_data(src_fp: t.BinaryIO, info: zipfile.ZipInfo, dst_fp: t.BinaryIO) -> None:
+    """Copy the compressed data of a member, which follows its local header in the source archive."""
+    src_fp.seek(info.header_offset)
+    header = src_fp.read(_LOCAL_HEADER.size)
+    if len(header) != _LOCAL_HEADER.size or header[:4] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local file header for member '{info.filename}'")
+    *_, name_size, extra_size = _LOCAL_HEADER.unpack(header)
+    src_fp.seek(name_size + extra_size, os.SEEK_CUR)
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = src_fp.read(min(_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for member '{info.filename}'")
+        dst_fp.write(chunk)
+        remaining -= len(chunk)
+
+
+def _write_central_directory(fp: t.BinaryIO, entries: t.Sequence[tuple[zipfile.ZipInfo, int]]) -> None:
+    """Write the central directory of an archive, and its end records, at the current position."""
+    start = fp.tell()
+    for info, offset in entries:
+        values = [info.file_size, info.compress_size, offset]
+        zip64_values = [value for value in values if value > zipfile.ZIP64_LIMIT]
+        extra = _strip_zip64_extra(info.extra)
+        if zip64_values:
+            extra = struct.pack(f"<HH{len(zip64_values)}Q", _ZIP64_EXTRA_ID, 8 * len(zip64_values), *zip64_values)
+            extra += _strip_zip64_extra(info.extra)
+        file_size, compress_size, offset = (0xFFFFFFFF if value > zipfile.ZIP64_LIMIT else value for value in values)
+        extract_version = max(info.extract_version, _ZIP64_VERSION) if zip64_values else info.extract_version
+        dos_date, dos_time = _encode_dos_date_time(info.date_time)
+        filename = _encode_filename(info)
+        header = _CENTRAL_HEADER.pack(
+            _CENTRAL_HEADER_SIGNATURE,
+            info.create_version,
+            info.create_system,
+            extract_version,
+            info.flag_bits & ~_DATA_DESCRIPTOR_FLAG,
+            info.compress_type,
+            dos_time,
+            dos_date,
+            info.CRC,
+            compress_size,
+            file_size,
+            len(filename),
+            len(extra),
+            len(info.comment),
+            0,
+            info.internal_attr,
+            info.external_attr,
+            offset,
+        )
+        fp.write(header + filename + extra + info.comment)
+    end = fp.tell()
+
+    count, size = len(entries), end - start
+    if count > zipfile.ZIP_FILECOUNT_LIMIT or max(start, size) > zipfile.ZIP64_LIMIT:
+        fp.write(
+            _ZIP64_END_OF_CENTRAL_DIR.pack(
+                _ZIP64_END_OF_CENTRAL_DIR_SIGNATURE,
+                _ZIP64_END_OF_CENTRAL_DIR.size - 12,
+                _ZIP64_VERSION,
+                _ZIP64_VERSION,
+                0,
+                0,
+                count,
+                count,
+                size,
+                start,
+            )
+        )
+        fp.write(_ZIP64_END_LOCATOR.pack(_ZIP64_END_LOCATOR_SIGNATURE, 0, end, 1))
+        count, size, start = min(count, 0xFFFF), min(size, 0xFFFFFFFF), min(start, 0xFFFFFFFF)
+    fp.write(_END_OF_CENTRAL_DIR.pack(_END_OF_CENTRAL_DIR_SIGNATURE, 0, 0, count, count, size, start, 0))
+
+
+def copy_zip_members(src: zipfile.ZipFile, infos: t.Iterable[zipfile.ZipInfo], dst_path: Path) -> list[zipfile.ZipInfo]:
+    """
+    Write a new zip archive with the given members of an archive, without decompressing and recompressing them.
+
+    The compressed bytes of the members are copied as-is, with the same compression method,
+    CRC, timestamp and attributes: this is much cheaper than extracting and compressing them again.
+    The `zipfile` module has no API to add raw members to an archive, so the archive is written
+    following the zip format. It can then be completed with `zipfile.ZipFile(dst_path, mode="a")`.
+
+    The encrypted members (the password check of some of them depends on their original header),
+    and the members of an archive which is not a file on disk, are not copied:
+    they can be copied with `copy_zip_member`.
+
+    Args:
+        src: The source archive (opened for reading).
+        infos: The members to copy.
+        dst_path: The path of the new archive (it is overwritten).
+
+    Returns:
+        The members which were not copied.
+    """
+    src_path = src.filename
+    copied: list[zipfile.ZipInfo] = []
+    skipped: list[zipfile.ZipInfo] = []
+    if src_path is None:
+        skipped.extend(infos)
+    else:
+        for info in infos:
+            (skipped if info.flag_bits & _ENCRYPTED_FLAG else copied).append(info)
+
+    entries: list[tuple[zipfile.ZipInfo, int]] = []
+    with open(dst_path, mode="wb") as dst_fp, contextlib.ExitStack() as stack:
+        src_fp = stack.enter_context(open(src_path, mode="rb")) if copied and src_path is not None else None
+        for info in copied:
+            offset = dst_fp.tell()
+            filename = _encode_filename(info)
+            extra = _strip_zip64_extra(info.extra)
+            file_size, compress_size = info.file_size, info.compress_size
+            extract_version = info.extract_version
+            if max(file_size, compress_size) > zipfile.ZIP64_LIMIT:
+                extra = struct.pack("<HH2Q", _ZIP64_EXTRA_ID, 16, file_size, compress_size) + extra
+                file_size = compress_size = 0xFFFFFFFF
+                extract_version = max(extract_version, _ZIP64_VERSION)
+            dos_date, dos_time = _encode_dos_date_time(info.date_time)
+            # The sizes and CRC are known: no data descriptor is written after the data
+            header = _LOCAL_HEADER.pack(
+                _LOCAL_HEADER_SIGNATURE,
+                extract_version,
+                info.flag_bits & ~_DATA_DESCRIPTOR_FLAG,
+                info.compress_type,
+                dos_time,
+                dos_date,
+                info.CRC,
+                compress_size,
+                file_size,
+                len(filename),
+                len(extra),
+            )
+            dst_fp.write(header + filename + extra)
+            _copy_raw_data(t.cast(t.BinaryIO, src_fp), info, dst_fp)
+            entries.append((info, offset))
+        _write_central_directory(dst_fp, entries)
+    return skipped
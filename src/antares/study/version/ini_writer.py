@@ -3,6 +3,8 @@ import configparser
 import typing as t
 from pathlib import Path
 
+from antares.study.version.file_utils import atomic_write
+
 JSON = dict[str, t.Any]
 
 
@@ -68,7 +70,7 @@ class IniWriter:
         """
         config_parser = IniConfigParser(special_keys=self.special_keys)
         config_parser.read_dict(data)
-        with path.open("w") as fp:
+        with atomic_write(path) as fp:
             config_parser.write(fp)
 
 
@@ -85,7 +87,7 @@ class SimpleKeyValueWriter(IniWriter):
             data: JSON content.
             path: path to `.ini` file.
         """
-        with path.open("w") as fp:
+        with atomic_write(path) as fp:
             for key, value in data.items():
                 if value is not None:
                     fp.write(f"{key}={value}\n")
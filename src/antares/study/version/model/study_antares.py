@@ -5,6 +5,7 @@ import textwrap
 import typing as t
 from pathlib import Path
 
+from ..file_utils import atomic_write
 from .exceptions import ValidationError
 from .study_version import StudyVersion
 
@@ -151,7 +152,9 @@ class StudyAntares:
         parser = configparser.ConfigParser()
         parser["antares"] = section_dict
         ini_path = Path(study_dir) / STUDY_ANTARES_PATH
-        with ini_path.open(mode="w", encoding="utf-8") as file:
+
+        # The file is replaced atomically: a reader never sees a partially written file
+        with atomic_write(ini_path, encoding="utf-8") as file:
             parser.write(file)
 
     # Human-readable representation
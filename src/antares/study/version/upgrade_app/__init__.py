@@ -1,17 +1,48 @@
+import contextlib
 import dataclasses
 import functools
 import logging
+import os
 import shutil
 import tempfile
 import typing as t
-from pathlib import Path, PurePath
+import zipfile
+from pathlib import Path, PurePath, PurePosixPath
 
 from ..exceptions import ApplicationError
+from ..file_utils import copy_zip_member, copy_zip_members, is_under, snapshot_tree
 from ..model.exceptions import ValidationError
-from ..model.study_antares import StudyAntares
+from ..model.general_data import GENERAL_DATA_PATH
+from ..model.study_antares import STUDY_ANTARES_PATH, StudyAntares
 from ..model.study_version import StudyVersion
+from .events import (
+    BACKUP_FINISHED,
+    BACKUP_STARTED,
+    COMMITTED,
+    ENTITY_PROGRESS,
+    INTERRUPTIBLE_EVENTS,
+    PLAN_COMPUTED,
+    ROLLED_BACK,
+    STEP_FINISHED,
+    STEP_STARTED,
+    UPGRADE_FAILED,
+    UPGRADE_FINISHED,
+    UPGRADE_STARTED,
+    EventCallback,
+    UpgradeEvent,
+)
+from .exceptions import InsufficientSpaceError
+from .in_memory import upgrade_documents  # noqa: F401
+from .matrix_resolver import MatrixResolver, MatrixStore
 from .scenario_mapping import scenarios
+from .scheduler import UpgradeStep, run_steps
+from .study_lock import StudyLock
+from .study_session import StudySession
+from .study_tree import StudyTree
+from .transform_cache import TransformCache
 from .upgrade_method import UpgradeMethod
+from .upgrade_plan import UpgradePlan
+from .upgrade_report import DEFAULT_THROUGHPUT, StepReport, UpgradeReport, get_files_size, iter_tree_files
 
 logger = logging.getLogger(__name__)
 
@@ -63,21 +94,76 @@ def filter_out_child_files(files: t.Collection[str]) -> list[str]:
     return [str(p) for p in filtered_paths]
 
 
+def _check_options(
+    jobs: t.Optional[int],
+    matrix_resolver: t.Optional[MatrixResolver],
+    keep_matrix_links: bool,
+    lock_timeout: t.Optional[float] = None,
+) -> None:
+    """
+    Validate the options shared by the upgrade applications (see `UpgradeApp`).
+
+    Raises:
+        ValueError: If an option is invalid.
+    """
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"Invalid number of jobs: {jobs}")
+    if keep_matrix_links and not isinstance(matrix_resolver, MatrixStore):
+        raise ValueError("A matrix store is required to keep the matrix links")
+    if lock_timeout is not None and lock_timeout < 0:
+        raise ValueError(f"Invalid lock timeout: {lock_timeout}")
+
+
 @dataclasses.dataclass
 class UpgradeApp:
     """
     Create a new study.
+
+    Attributes:
+        study_dir: The study directory.
+        version: The target version of the study.
+        jobs: The maximum number of threads used to upgrade the study files (1 to disable concurrency).
+            By default, the number of threads depends on the number of CPUs and on the kind of work.
+        cache_dir: The directory of the cache of the file-level transformations (see `TransformCache`),
+            which can be shared by several studies. By default, no cache is used.
+        output_dir: The directory where the upgraded study is written (it must not exist).
+            The study itself is left unchanged: the files which are not changed by the upgrade
+            are hardlinked (when possible), and the other ones are copied before being upgraded.
+            By default, the study is upgraded in place.
+        matrix_resolver: The resolver of the matrix links (see `MatrixResolver`): the links of the matrices
+            transformed by the upgrade are replaced by their matrices, the other links are left unchanged.
+            By default, the upgrade fails if such links are found.
+        keep_matrix_links: Whether the links are kept instead of being resolved: the matrices are upgraded
+            in the matrix store, which must be a `MatrixStore`, and the study gets links to the new matrices.
+        on_event: Function called for each progress event of the upgrade (see `UpgradeEvent`),
+            in the thread which runs the upgrade. If it raises an exception for an interruptible event
+            (see `INTERRUPTIBLE_EVENTS`), the upgrade is interrupted at the next step boundary and rolled back.
+            The exceptions raised for the other events are logged and ignored.
+        lock_timeout: The maximum time to wait for the lock of the study (see `StudyLock`), in seconds:
+            0 to fail immediately if the study is being upgraded by another process.
+            By default, the upgrade waits until the study is unlocked.
     """
 
     study_dir: Path
     version: StudyVersion
+    jobs: t.Optional[int] = None
+    cache_dir: t.Optional[Path] = None
+    output_dir: t.Optional[Path] = None
+    matrix_resolver: t.Optional[MatrixResolver] = None
+    keep_matrix_links: bool = False
+    on_event: t.Optional[EventCallback] = None
+    lock_timeout: t.Optional[float] = None
+    _study_lock: t.Optional[StudyLock] = dataclasses.field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         """Parse, validate and initialize the fields of the object."""
         self.study_dir = Path(self.study_dir)
         self.version = StudyVersion.parse(self.version)
+        self.cache_dir = None if self.cache_dir is None else Path(self.cache_dir)
+        self.output_dir = None if self.output_dir is None else Path(self.output_dir)
         if not self.study_dir.exists():
             raise FileNotFoundError(f"Study directory not found: {self.study_dir}")
+        _check_options(self.jobs, self.matrix_resolver, self.keep_matrix_links, self.lock_timeout)
 
     @functools.cached_property
     def study_antares(self) -> StudyAntares:
@@ -87,52 +173,314 @@ class UpgradeApp:
         except ValidationError as e:
             raise ApplicationError(e.args[0]) from e
 
-    @property
-    def upgrade_methods(self) -> list[UpgradeMethod]:
-        """Get the list of upgrade methods to apply to the study."""
+    @functools.cached_property
+    def upgrade_plan(self) -> UpgradePlan:
+        """Get the compiled upgrade plan to apply to the study."""
         start = self.study_antares.version
         end = self.version
         try:
-            return scenarios[start:end]  # type: ignore
+            return scenarios.get_plan(start, end)
         except KeyError as e:
             raise ApplicationError(e.args[0]) from e
 
+    @property
+    def upgrade_methods(self) -> t.Sequence[UpgradeMethod]:
+        """Get the list of upgrade methods to apply to the study."""
+        return self.upgrade_plan.methods
+
     @property
     def should_denormalize(self) -> bool:
         """Check if the study should be denormalized before the upgrade."""
-        return any(meth.should_denormalize for meth in self.upgrade_methods)
+        return self.upgrade_plan.should_denormalize
+
+    @contextlib.contextmanager
+    def lock(self, study_lock: t.Optional[StudyLock] = None) -> t.Iterator[None]:
+        """
+        Lock the study directory against the upgrades of other processes (see `StudyLock`).
+
+        The lock is held by `__call__`, but it can be acquired beforehand, for instance to check
+        the version of the study before upgrading it. The 'study.antares' file is read again
+        once the lock is acquired, since the study may have been upgraded by another process.
+
+        Args:
+            study_lock: A lock already held by the caller, which protects the study
+                (for instance, the lock of the original study of a `MultiVersionUpgradeApp`):
+                the study is not locked again.
+
+        Raises:
+            StudyLockedError: If the study is still locked after `lock_timeout`.
+        """
+        if self._study_lock is not None:
+            yield
+            return
+        with contextlib.ExitStack() as stack:
+            if study_lock is None:
+                study_lock = stack.enter_context(StudyLock(self.study_dir, timeout=self.lock_timeout))
+            elif not study_lock.locked:
+                raise RuntimeError(f"The lock is not held: {study_lock!r}")
+            self.__dict__.pop("study_antares", None)
+            self.__dict__.pop("upgrade_plan", None)
+            self._study_lock = study_lock
+            try:
+                yield
+            finally:
+                self._study_lock = None
 
     def __call__(self) -> None:
+        with self.lock(), self.reporting():
+            if self.output_dir is None:
+                self._upgrade_in_place()
+            else:
+                self._upgrade_to_output_dir(self.output_dir)
+
+    @contextlib.contextmanager
+    def reporting(self) -> t.Iterator[None]:
+        """
+        Report the start of the upgrade, and its end or its failure (see `on_event`).
+
+        The upgrade is reported by `__call__`. The applications which upgrade a copy of the study
+        (see `upgrade_copy`) use this context manager around their own work, so that
+        the "upgrade_finished" event is only reported once their work is done.
+        """
+        plan = self.upgrade_plan
+        total = len(plan.steps)
+        self._emit(UPGRADE_STARTED, name=str(plan), total=total)
+        try:
+            yield
+        except Exception as e:
+            self._emit(UPGRADE_FAILED, name=str(e), total=total)
+            raise
+        self._emit(UPGRADE_FINISHED, name=str(plan), done=total, total=total)
+
+    def _emit(self, kind: str, name: str = "", done: int = 0, total: int = 0, size: int = 0) -> None:
+        """Log a progress event of the upgrade, and report it (see `on_event`)."""
+        event = UpgradeEvent(kind, self.study_dir, name=name, done=done, total=total, size=size)
+        level = logging.DEBUG if kind in {STEP_STARTED, STEP_FINISHED, ENTITY_PROGRESS} else logging.INFO
+        logger.log(level, "%s: %s", self.study_dir, event)
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event)
+        except Exception:
+            if kind in INTERRUPTIBLE_EVENTS:
+                raise
+            # The upgrade can't be interrupted: the worker threads are running a step, or the outcome is known
+            logger.exception("%s: error in the event callback (%s event ignored)", self.study_dir, kind)
+
+    def _on_progress(self, label: str, done: int, total: int) -> None:
+        """Report the progress of a loop of an upgrade step (called by the worker threads of the session)."""
+        self._emit(ENTITY_PROGRESS, name=label, done=done, total=total)
+
+    def _run_steps(self, session: StudySession) -> None:
+        """Run the upgrade steps (independent steps are run concurrently), and report their progress."""
+        plan = self.upgrade_plan
+        total = len(plan.steps)
+        done = 0
+
+        def on_step(step: UpgradeStep, completed: bool) -> None:
+            nonlocal done
+            done += completed
+            self._emit(STEP_FINISHED if completed else STEP_STARTED, name=step.name, done=done, total=total)
+
+        run_steps(plan.steps, session, dependencies=plan.dependencies, max_workers=self.jobs, on_step=on_step)
+
+    def _upgrade_in_place(self) -> None:
+        """Upgrade the study in place: the files concerned by the upgrade are restored if an error occurs."""
+        if self.upgrade_plan.is_version_bump_only:
+            # No backup is needed: the 'study.antares' file is replaced atomically
+            self._update_study_antares(self.study_dir)
+            self._emit(COMMITTED, name=str(self.study_dir))
+            return
+
+        plan = self.upgrade_plan
+        session = self._prepare_session(self.study_dir)
+        backup_size = self._check_free_space(session.tree)
+        self._emit(PLAN_COMPUTED, name=str(plan), total=len(plan.steps), size=backup_size)
+
         with tempfile.TemporaryDirectory(
             suffix=UPGRADE_TEMPORARY_DIR_SUFFIX, prefix=UPGRADE_TEMPORARY_DIR_PREFIX, dir=self.study_dir.parent
         ) as path:
             tmp_path = Path(path)
-
-            # Prepare the upgrade
-            files_to_upgrade = {f for meth in self.upgrade_methods for f in meth.files} | {"study.antares"}
-            files_to_retrieve = self._copies_only_necessary_files(files_to_upgrade, tmp_path)
+            files_to_remove = [f for f in filter_out_child_files(plan.files) if not session.tree.exists(f)]
+            self._emit(BACKUP_STARTED, name=path, size=backup_size)
+            files_to_retrieve = self._copies_only_necessary_files(plan.files, tmp_path, session.tree)
+            self._emit(BACKUP_FINISHED, name=path, size=backup_size)
 
             try:
-                # Perform the upgrade
-                for meth in self.upgrade_methods:
-                    meth.upgrade(self.study_dir)
+                # Perform the upgrade: independent steps are run concurrently
+                plan.resolve_matrix_links(session)
+                self._run_steps(session)
+                session.flush()
 
-                # Update the 'study.antares' file
-                self.study_antares.version = self.version
-                self.study_antares.to_ini_file(self.study_dir)
+                self._update_study_antares(self.study_dir)
 
             except Exception:
-                # If an error occurs, restore the original files
+                # If an error occurs, restore the original files and remove the created ones
                 self._safely_replace_original_files(files_to_retrieve, tmp_path)
+                self._remove_created_files(files_to_remove)
+                self._emit(ROLLED_BACK, name=str(self.study_dir))
                 raise
 
-    def _copies_only_necessary_files(self, files_to_upgrade: t.Collection[str], tmp_path: Path) -> list[str]:
+        self._emit(COMMITTED, name=str(self.study_dir))
+
+    def plan(self, throughput: float = DEFAULT_THROUGHPUT) -> UpgradeReport:
+        """
+        Report what the upgrade would do, without changing anything (dry-run).
+
+        The preconditions of the upgrade are checked, as for a real upgrade.
+
+        Args:
+            throughput: The disk throughput (in bytes per second) used to estimate the duration of the upgrade.
+
+        Returns:
+            The report of the upgrade: the steps and their files, the backup size and the free space.
+
+        Raises:
+            UpgradeError: If the study can't be upgraded.
+        """
+        plan = self.upgrade_plan
+        session = self._prepare_session(self.study_dir)
+        tree = session.tree
+        steps = []
+        if plan.general_data_ops:
+            steps.append(StepReport.from_tree(GENERAL_DATA_PATH, tree, [GENERAL_DATA_PATH], []))
+        steps.extend(StepReport.from_tree(step.name, tree, step.files, step.reads) for step in plan.steps)
+        steps.append(StepReport.from_tree(STUDY_ANTARES_PATH, tree, [STUDY_ANTARES_PATH], []))
+
+        # No backup is made when only the version number changes
+        backup_files = () if plan.is_version_bump_only else tuple(self._get_backup_files(tree))
+        backup_size = get_files_size(tree, iter_tree_files(tree, backup_files))
+        # The backup is copied once, then the files are read and written by the steps
+        io_size = 2 * backup_size + sum(step.read_size + 2 * step.write_size for step in steps)
+        return UpgradeReport(
+            study_dir=self.study_dir,
+            title=str(plan),
+            steps=tuple(steps),
+            backup_files=backup_files,
+            backup_size=backup_size,
+            free_space=self._get_free_space(),
+            estimated_duration=io_size / throughput,
+        )
+
+    def _upgrade_to_output_dir(self, output_dir: Path) -> None:
+        """
+        Upgrade a copy of the study, built in a temporary directory and renamed to the output directory.
+
+        Only the files and folders concerned by the upgrade are copied: the other files are hardlinked.
+        No backup is needed, since the study itself is never changed.
+        """
+        if output_dir.exists():
+            raise FileExistsError(f"Study directory already exists: {output_dir}")
+        # The study is checked before anything is written
+        plan = self.upgrade_plan
+        session = self._prepare_session(self.study_dir)
+        backup_size = self._check_free_space(session.tree)
+        self._emit(PLAN_COMPUTED, name=str(plan), total=len(plan.steps), size=backup_size)
+
+        output_dir.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(
+            suffix=UPGRADE_TEMPORARY_DIR_SUFFIX, prefix=UPGRADE_TEMPORARY_DIR_PREFIX, dir=output_dir.parent
+        ) as path:
+            work_dir = Path(path) / output_dir.name
+            self._emit(BACKUP_STARTED, name=str(work_dir), size=backup_size)
+            snapshot_tree(self.study_dir, work_dir, copies=self._get_backup_files(session.tree))
+            self._emit(BACKUP_FINISHED, name=str(work_dir), size=backup_size)
+            self.upgrade_copy(work_dir)
+            # The upgraded study appears at once
+            work_dir.rename(output_dir)
+        self._emit(COMMITTED, name=str(output_dir))
+
+    def upgrade_copy(self, work_dir: Path) -> None:
+        """
+        Upgrade a copy of the study (no backup is made), for instance the files extracted from an archive.
+
+        The copy can be partial: only the files and folders concerned by the upgrade
+        (see `UpgradePlan.files` and `UpgradePlan.reads`) and the 'study.antares' file are needed.
+        The progress is reported, but not the start and the end of the upgrade (see `reporting`).
+
+        Args:
+            work_dir: The directory of the copy: it must contain the files and folders concerned by the upgrade.
+        """
+        plan = self.upgrade_plan
+        if not plan.is_version_bump_only:
+            session = self._prepare_session(work_dir)
+            plan.resolve_matrix_links(session)
+            self._run_steps(session)
+            session.flush()
+        self._update_study_antares(work_dir)
+
+    def _get_work_parent(self) -> Path:
+        """Get the directory where the files concerned by the upgrade are copied."""
+        return self.study_dir.parent if self.output_dir is None else self.output_dir.parent
+
+    def _get_free_space(self) -> int:
+        """Get the free space (in bytes) of the file system where the files concerned by the upgrade are copied."""
+        work_parent = self._get_work_parent()
+        # The parent of the output directory may not exist yet
+        existing_parent = next(p for p in [work_parent, *work_parent.parents] if p.exists())
+        return shutil.disk_usage(existing_parent).free
+
+    def _check_free_space(self, tree: StudyTree) -> int:
+        """
+        Check that there is enough free space to copy the files concerned by the upgrade.
+
+        Returns:
+            The size of the files concerned by the upgrade, in bytes.
+        """
+        backup_files = self._get_backup_files(tree)
+        backup_size = get_files_size(tree, iter_tree_files(tree, backup_files))
+        free_space = self._get_free_space()
+        if backup_size > free_space:
+            raise InsufficientSpaceError(self._get_work_parent(), backup_size, free_space)
+        return backup_size
+
+    def _prepare_session(self, study_dir: Path) -> StudySession:
+        """
+        Index the study files and check the preconditions of the upgrade (preflight).
+
+        The preconditions are checked before any backup copy is made, so that an invalid study
+        fails fast, without touching the disk. The `settings/generaldata.ini` document is upgraded
+        in memory: it is shared by all the steps and only written when the session is flushed.
+
+        Args:
+            study_dir: The directory of the study to upgrade (the study itself, or its copy).
+        """
+        plan = self.upgrade_plan
+        cache = None if self.cache_dir is None else TransformCache(self.cache_dir)
+        session = StudySession(
+            study_dir,
+            jobs=self.jobs,
+            cache=cache,
+            matrix_resolver=self.matrix_resolver,
+            keep_matrix_links=self.keep_matrix_links,
+            on_progress=self._on_progress,
+        )
+        # The files concerned by the upgrade are indexed in a single walk
+        session.tree.scan(*plan.files, *plan.reads)
+        plan.upgrade_general_data(session)
+        plan.check(session)
+        return session
+
+    def _get_backup_files(self, tree: StudyTree) -> list[str]:
+        """Get the existing files and folders which are copied in the backup directory before the upgrade."""
+        files = (PurePath(relpath).as_posix() for relpath in filter_out_child_files(self.upgrade_plan.files))
+        return [relpath for relpath in files if tree.exists(relpath)]
+
+    def _update_study_antares(self, study_dir: Path) -> None:
+        """Update the version number in the 'study.antares' file of the study (or of its copy)."""
+        self.study_antares.version = self.version
+        self.study_antares.to_ini_file(study_dir)
+
+    def _copies_only_necessary_files(
+        self, files_to_upgrade: t.Collection[str], tmp_path: Path, tree: StudyTree
+    ) -> list[str]:
         """
         Copies files concerned by the version upgrader into a temporary directory.
 
         Args:
             files_to_upgrade: List of the files and folders concerned by the upgrade.
             tmp_path: Path to the temporary directory where the file modification will be performed.
+            tree: The index of the study file tree.
 
         Returns:
             The list of files and folders that were really copied. It's the same as files_to_upgrade but
@@ -141,12 +489,13 @@ class UpgradeApp:
         files_to_copy = filter_out_child_files(files_to_upgrade)
         files_to_retrieve = []
         for relpath in files_to_copy:
-            src_path = self.study_dir / relpath
-            if not src_path.exists():
+            entry = tree.get(relpath)
+            if entry is None:
                 # This can happen when upgrading a study to v8.8.
                 continue
+            src_path = self.study_dir / relpath
             dst_path = tmp_path / relpath
-            if src_path.is_dir():
+            if entry.is_dir:
                 if not dst_path.exists():
                     shutil.copytree(src_path, dst_path, dirs_exist_ok=True)
                     files_to_retrieve.append(relpath)
@@ -183,3 +532,264 @@ class UpgradeApp:
                 shutil.rmtree(backup_dir)
             else:
                 backup_dir.unlink()
+
+    def _remove_created_files(self, files_to_remove: t.Collection[str]) -> None:
+        """
+        Remove the files/folders created by the upgrade, which didn't exist before (and therefore were not copied).
+
+        Args:
+            files_to_remove: List of files and folders that were missing before the upgrade.
+        """
+        for relpath in files_to_remove:
+            path = self.study_dir / relpath
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+
+
+@dataclasses.dataclass
+class MultiVersionUpgradeApp:
+    """
+    Upgrade a study to several versions in one pass, and write a snapshot of the study at each version.
+
+    The upgrade chain is run only once: each snapshot is upgraded from the previous one (or from the study)
+    into a new directory (see `UpgradeApp.output_dir`), and the study itself is left unchanged.
+    The files which are not changed by the upgrade are shared with hardlinks (when possible).
+
+    The snapshots are written in the output directory, and named after the study directory and the version,
+    for instance `my-study-v8.8` and `my-study-v9.3`.
+
+    Attributes:
+        study_dir: The study directory.
+        versions: The target versions of the study.
+        output_dir: The directory where the snapshots are written.
+        jobs: The maximum number of threads used to upgrade the study files (see `UpgradeApp`).
+        cache_dir: The directory of the cache of the file-level transformations (see `UpgradeApp`).
+        matrix_resolver: The resolver of the matrix links (see `UpgradeApp`).
+        keep_matrix_links: Whether the matrix links are kept (see `UpgradeApp`).
+        on_event: Function called for each progress event of the upgrades (see `UpgradeApp`).
+        lock_timeout: The maximum time to wait for the lock of the study (see `UpgradeApp`).
+    """
+
+    study_dir: Path
+    versions: t.Sequence[StudyVersion]
+    output_dir: Path
+    jobs: t.Optional[int] = None
+    cache_dir: t.Optional[Path] = None
+    matrix_resolver: t.Optional[MatrixResolver] = None
+    keep_matrix_links: bool = False
+    on_event: t.Optional[EventCallback] = None
+    lock_timeout: t.Optional[float] = None
+
+    def __post_init__(self):
+        """Parse, validate and initialize the fields of the object."""
+        self.study_dir = Path(self.study_dir)
+        self.output_dir = Path(self.output_dir)
+        self.versions = sorted({StudyVersion.parse(v) for v in self.versions})
+        if not self.study_dir.exists():
+            raise FileNotFoundError(f"Study directory not found: {self.study_dir}")
+        if not self.versions:
+            raise ValueError("At least one target version is required")
+        _check_options(self.jobs, self.matrix_resolver, self.keep_matrix_links, self.lock_timeout)
+
+    @functools.cached_property
+    def study_antares(self) -> StudyAntares:
+        """Load the 'study.antares' file of the study."""
+        try:
+            return StudyAntares.from_ini_file(self.study_dir)
+        except ValidationError as e:
+            raise ApplicationError(e.args[0]) from e
+
+    def get_snapshot_dir(self, version: StudyVersion) -> Path:
+        """Get the directory of the snapshot of the study at the given version."""
+        return self.output_dir / f"{self.study_dir.name}-v{version:2d}"
+
+    def __call__(self) -> list[Path]:
+        """
+        Upgrade the study and write the snapshots.
+
+        The study is locked during the whole upgrade chain (see `UpgradeApp.lock`).
+
+        Returns:
+            The directories of the snapshots, in the order of the versions.
+        """
+        with StudyLock(self.study_dir, timeout=self.lock_timeout) as study_lock:
+            # The study may have been upgraded by another process before the lock was acquired
+            self.__dict__.pop("study_antares", None)
+            return self._upgrade_snapshots(study_lock)
+
+    def _upgrade_snapshots(self, study_lock: StudyLock) -> list[Path]:
+        # Check that all the versions can be reached before doing anything
+        start = self.study_antares.version
+        for version in self.versions:
+            try:
+                scenarios.get_plan(start, version)
+            except KeyError as e:
+                raise ApplicationError(e.args[0]) from e
+            snapshot_dir = self.get_snapshot_dir(version)
+            if snapshot_dir.exists():
+                raise FileExistsError(f"Study directory already exists: {snapshot_dir}")
+
+        # Each snapshot is upgraded from the previous one: the upgrade chain is run only once.
+        # The snapshots are not locked: they are written by this upgrade only, under the lock of the study.
+        snapshot_dirs: list[Path] = []
+        source_dir = self.study_dir
+        try:
+            for version in self.versions:
+                snapshot_dir = self.get_snapshot_dir(version)
+                app = UpgradeApp(
+                    source_dir,
+                    version=version,
+                    jobs=self.jobs,
+                    cache_dir=self.cache_dir,
+                    output_dir=snapshot_dir,
+                    matrix_resolver=self.matrix_resolver,
+                    keep_matrix_links=self.keep_matrix_links,
+                    on_event=self.on_event,
+                    lock_timeout=self.lock_timeout,
+                )
+                with app.lock(study_lock):
+                    app()
+                snapshot_dirs.append(snapshot_dir)
+                source_dir = snapshot_dir
+        except Exception:
+            # If an error occurs, the snapshots already written are removed
+            for snapshot_dir in snapshot_dirs:
+                shutil.rmtree(snapshot_dir, ignore_errors=True)
+            raise
+        return snapshot_dirs
+
+
+@dataclasses.dataclass
+class ZipUpgradeApp:
+    """
+    Upgrade a study stored in a zip archive, without extracting the whole archive.
+
+    Only the files and folders concerned by the upgrade (see `UpgradePlan.files` and `UpgradePlan.reads`)
+    are extracted in a temporary directory and upgraded. The new archive is then written:
+    the compressed bytes of the members which are not changed by the upgrade are copied as-is,
+    without recompressing them (see `copy_zip_members`), and the upgraded files are compressed.
+
+    The study can be at the root of the archive or in a top-level folder.
+    The new archive replaces the original archive atomically, unless an output path is given.
+    The archive is locked during the upgrade, like a study directory (see `UpgradeApp.lock`).
+
+    Attributes:
+        zip_path: The path of the zip archive of the study.
+        version: The target version of the study.
+        output_path: The path of the new archive (it must not exist). By default, the archive is replaced.
+        jobs: The maximum number of threads used to upgrade the study files (see `UpgradeApp`).
+        cache_dir: The directory of the cache of the file-level transformations (see `UpgradeApp`).
+        matrix_resolver: The resolver of the matrix links (see `UpgradeApp`).
+        keep_matrix_links: Whether the matrix links are kept (see `UpgradeApp`).
+        on_event: Function called for each progress event of the upgrades (see `UpgradeApp`).
+        lock_timeout: The maximum time to wait for the lock of the archive (see `UpgradeApp`).
+    """
+
+    zip_path: Path
+    version: StudyVersion
+    output_path: t.Optional[Path] = None
+    jobs: t.Optional[int] = None
+    cache_dir: t.Optional[Path] = None
+    matrix_resolver: t.Optional[MatrixResolver] = None
+    keep_matrix_links: bool = False
+    on_event: t.Optional[EventCallback] = None
+    lock_timeout: t.Optional[float] = None
+
+    def __post_init__(self):
+        """Parse, validate and initialize the fields of the object."""
+        self.zip_path = Path(self.zip_path)
+        self.version = StudyVersion.parse(self.version)
+        self.output_path = None if self.output_path is None else Path(self.output_path)
+        self.cache_dir = None if self.cache_dir is None else Path(self.cache_dir)
+        if not self.zip_path.is_file():
+            raise FileNotFoundError(f"Study archive not found: {self.zip_path}")
+        _check_options(self.jobs, self.matrix_resolver, self.keep_matrix_links, self.lock_timeout)
+
+    @staticmethod
+    def _get_study_root(archive: zipfile.ZipFile) -> str:
+        """Get the folder of the study in the archive ("" for the root of the archive, or "name/")."""
+        names = [name for name in archive.namelist() if PurePosixPath(name).name == STUDY_ANTARES_PATH]
+        roots = sorted((name[: -len(STUDY_ANTARES_PATH)] for name in names if name.count("/") <= 1), key=len)
+        if not roots:
+            raise ApplicationError(f"File '{STUDY_ANTARES_PATH}' not found in the archive '{archive.filename}'")
+        return roots[0]
+
+    def __call__(self) -> None:
+        output_path = self.output_path or self.zip_path
+        if self.output_path is not None and self.output_path.exists():
+            raise FileExistsError(f"Study archive already exists: {self.output_path}")
+
+        with (
+            StudyLock(self.zip_path, timeout=self.lock_timeout),
+            tempfile.TemporaryDirectory(
+                suffix=UPGRADE_TEMPORARY_DIR_SUFFIX, prefix=UPGRADE_TEMPORARY_DIR_PREFIX, dir=output_path.parent
+            ) as path,
+        ):
+            # The new archive is written next to the output archive, then renamed
+            tmp_path = Path(path) / output_path.name
+            with zipfile.ZipFile(self.zip_path) as archive:
+                self._upgrade_archive(archive, Path(path) / "study", tmp_path)
+            os.replace(tmp_path, output_path)
+
+    def _upgrade_archive(self, archive: zipfile.ZipFile, work_dir: Path, tmp_path: Path) -> None:
+        """
+        Upgrade the study of an archive, and write the new archive.
+
+        Args:
+            archive: The archive of the study.
+            work_dir: The directory where the files concerned by the upgrade are extracted.
+            tmp_path: The path of the new archive.
+        """
+        root = self._get_study_root(archive)
+        study_dir = work_dir / root
+        members = {info.filename[len(root) :]: info for info in archive.infolist() if info.filename.startswith(root)}
+
+        # Only the files concerned by the upgrade are extracted
+        archive.extract(members[STUDY_ANTARES_PATH], work_dir)
+        app = UpgradeApp(
+            study_dir,
+            version=self.version,
+            jobs=self.jobs,
+            cache_dir=self.cache_dir,
+            matrix_resolver=self.matrix_resolver,
+            keep_matrix_links=self.keep_matrix_links,
+            on_event=self.on_event,
+        )
+        with app.reporting():
+            plan = app.upgrade_plan
+            extracted = [PurePath(p).as_posix() for p in filter_out_child_files([*plan.files, *plan.reads])]
+            for relpath, info in members.items():
+                if is_under(relpath.rstrip("/"), extracted):
+                    archive.extract(info, work_dir)
+            app.upgrade_copy(study_dir)
+
+            upgraded = [PurePath(p).as_posix() for p in filter_out_child_files(plan.files)]
+            # The members which are not concerned by the upgrade are copied as they are,
+            # then the upgraded files are added to the new archive
+            unchanged = [
+                info
+                for info in archive.infolist()
+                if not info.filename.startswith(root) or not is_under(info.filename[len(root) :].rstrip("/"), upgraded)
+            ]
+            skipped = copy_zip_members(archive, unchanged, tmp_path)
+            with zipfile.ZipFile(tmp_path, mode="a", compression=zipfile.ZIP_DEFLATED) as new_archive:
+                for info in skipped:
+                    copy_zip_member(archive, info, new_archive)
+                for relpath in upgraded:
+                    _write_to_archive(new_archive, study_dir, relpath, root)
+
+
+def _write_to_archive(archive: zipfile.ZipFile, study_dir: Path, relpath: str, root: str) -> None:
+    """Write a file or a folder (recursively) of a study into an archive, if it exists."""
+    path = study_dir / relpath
+    if path.is_file():
+        archive.write(path, f"{root}{relpath}")
+    elif path.is_dir():
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            reldir = Path(dirpath).relative_to(study_dir).as_posix()
+            archive.write(dirpath, f"{root}{reldir}/")
+            for name in sorted(filenames):
+                archive.write(Path(dirpath, name), f"{root}{reldir}/{name}")
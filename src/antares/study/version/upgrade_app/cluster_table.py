@@ -0,0 +1,108 @@
+"""
+Columnar table of the clusters of a study.
+
+The cluster upgrades (new properties, renamed groups...) are applied to all the clusters
+of a study at once, as column operations on a `pandas.DataFrame`, instead of editing
+the sections of each `list.ini` file one by one.
+"""
+
+import typing as t
+
+import pandas as pd
+
+from .study_entities import ClusterKind
+from .study_session import StudySession
+
+AREA_LEVEL = "area"
+CLUSTER_LEVEL = "cluster"
+
+
+class ClusterTable:
+    """
+    Table of the clusters of a given kind: one row per cluster, one column per property.
+
+    The rows are indexed by area ID and cluster name (the section name in the `list.ini` file).
+    Properties missing in a section are `NaN` in the table. The values keep their Python type
+    (the columns have the `object` dtype), so that they are written back unchanged.
+
+    When the table is saved, the properties of each section keep their original order,
+    and the columns added with `assign` are appended in the order of their assignment.
+
+    Usage::
+
+        table = ClusterTable.load(session, "st-storage")
+        table.assign("enabled", True)
+        table.frame.loc[table.frame["group"] == "Other", "group"] = "other 1"
+        table.save(session)
+    """
+
+    def __init__(
+        self, kind: ClusterKind, frame: pd.DataFrame, areas: t.Sequence[str], keys: t.Sequence[t.Sequence[str]]
+    ):
+        self.kind = kind
+        self.frame = frame
+        self.areas = list(areas)
+        # Original property names of each row, used to keep the order of the properties
+        self._keys = list(keys)
+        self._assigned: list[str] = []
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(kind={self.kind!r}, areas={len(self.areas)}, clusters={len(self.frame)})"
+
+    @classmethod
+    def load(cls, session: StudySession, kind: ClusterKind) -> "ClusterTable":
+        """
+        Load all the clusters of a given kind, for all the areas which have a `list.ini` file.
+
+        Args:
+            session: The session used to read the study files.
+            kind: The kind of clusters.
+
+        Returns:
+            The table of the clusters.
+        """
+        entities = session.entities
+        areas = entities.get_cluster_areas(kind)
+        documents = session.map(lambda area_id: session.read_ini(entities.get_clusters_ini(kind, area_id)), areas)
+        index, records, keys = [], [], []
+        for area_id, sections in zip(areas, documents):
+            for name, section in sections.items():
+                index.append((area_id, name))
+                records.append(section)
+                keys.append(list(section))
+        multi_index = pd.MultiIndex.from_tuples(index, names=[AREA_LEVEL, CLUSTER_LEVEL])
+        frame = pd.DataFrame(records, index=multi_index, dtype=object)
+        return cls(kind, frame, areas, keys)
+
+    def assign(self, column: str, value: t.Any) -> None:
+        """
+        Set the value of a property for all the clusters (the property is added if missing).
+
+        Args:
+            column: The property name.
+            value: The new value (a scalar, or a sequence of values aligned with the rows).
+        """
+        self.frame[column] = value
+        if column not in self._assigned:
+            self._assigned.append(column)
+
+    def save(self, session: StudySession) -> None:
+        """
+        Write back the `list.ini` files of all the loaded areas (using the session).
+
+        Args:
+            session: The session used to write the study files.
+        """
+        frame = self.frame.astype(object)
+        positions = {column: pos for pos, column in enumerate(frame.columns)}
+        documents: dict[str, dict[str, t.Any]] = {area_id: {} for area_id in self.areas}
+        for (area_id, name), keys, row in zip(frame.index, self._keys, frame.to_numpy()):
+            section = {key: row[positions[key]] for key in keys}
+            for column in self._assigned:
+                value = row[positions[column]]
+                if column not in section and pd.notna(value):
+                    section[column] = value
+            documents[area_id][name] = section
+        for area_id, sections in documents.items():
+            session.write_ini(session.entities.get_clusters_ini(self.kind, area_id), sections)
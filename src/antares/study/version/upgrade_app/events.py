@@ -0,0 +1,87 @@
+"""
+Progress events of a study upgrade.
+
+The `UpgradeApp` reports its progress to an optional callback (see `UpgradeApp.on_event`),
+for instance to display a progress bar, or to forward the events to an asyncio event loop
+(see `antares.study.version.aio`). The callback is called in the thread which runs the upgrade,
+except for the "entity_progress" events, which are reported by the worker threads of the steps:
+the callback must be thread-safe.
+
+The events of an upgrade are, in order:
+
+- "upgrade_started": the upgrade plan is computed (`name` is the title of the plan, `total` the number of steps);
+- "plan_computed": the study is checked (`size` is the size of the files copied before the upgrade);
+- "backup_started" and "backup_finished": the files concerned by the upgrade are copied (`size` in bytes);
+- "step_started" and "step_finished": for each upgrade step (`done` is the number of completed steps);
+- "entity_progress": progress of the loops over the links or binding constraints of a step;
+- "committed": the upgraded study is complete, or "rolled_back": the study files are restored;
+- "upgrade_finished" or "upgrade_failed" (`name` is the error message).
+
+The callback can interrupt the upgrade by raising an exception, but only for the events reported
+at a safe point of the upgrade, before any study file is changed or between two steps
+(see `INTERRUPTIBLE_EVENTS`): the upgrade is then rolled back. The exceptions raised for the other events
+(the "entity_progress" events and the events reported once the upgrade is committed or rolled back)
+are logged and ignored, so that a failing callback can't break a step or the commit.
+"""
+
+import dataclasses
+import time
+import typing as t
+from pathlib import Path
+
+UPGRADE_STARTED = "upgrade_started"
+PLAN_COMPUTED = "plan_computed"
+BACKUP_STARTED = "backup_started"
+BACKUP_FINISHED = "backup_finished"
+STEP_STARTED = "step_started"
+STEP_FINISHED = "step_finished"
+ENTITY_PROGRESS = "entity_progress"
+COMMITTED = "committed"
+ROLLED_BACK = "rolled_back"
+UPGRADE_FINISHED = "upgrade_finished"
+UPGRADE_FAILED = "upgrade_failed"
+
+TERMINAL_EVENTS = frozenset({UPGRADE_FINISHED, UPGRADE_FAILED})
+"""Kinds of the last event of an upgrade."""
+
+INTERRUPTIBLE_EVENTS = frozenset(
+    {UPGRADE_STARTED, PLAN_COMPUTED, BACKUP_STARTED, BACKUP_FINISHED, STEP_STARTED, STEP_FINISHED}
+)
+"""Kinds of the events for which the callback can interrupt the upgrade by raising an exception."""
+
+
+@dataclasses.dataclass(frozen=True)
+class UpgradeEvent:
+    """
+    Progress event of a study upgrade.
+
+    Attributes:
+        kind: The kind of event (for instance "step_started", see the constants of this module).
+        study_dir: The directory of the upgraded study.
+        name: The name of the step or of the loop (or the error message of a failed upgrade).
+        done: The number of completed steps (or entities, for the "entity_progress" events).
+        total: The total number of steps (or entities).
+        size: The size of the copied files, in bytes (for the "plan_computed" and "backup_*" events).
+        timestamp: The time of the event, in seconds since the Epoch.
+    """
+
+    kind: str
+    study_dir: Path
+    name: str = ""
+    done: int = 0
+    total: int = 0
+    size: int = 0
+    timestamp: float = dataclasses.field(default_factory=time.time)
+
+    def __str__(self) -> str:
+        progress = f" ({self.done}/{self.total})" if self.total else ""
+        size = f" [{self.size} bytes]" if self.size else ""
+        return f"{self.kind}: {self.name}{progress}{size}"
+
+    def to_dict(self) -> dict[str, t.Any]:
+        """Convert the event to a JSON-serializable dictionary (the study directory is converted to a string)."""
+        return {**dataclasses.asdict(self), "study_dir": str(self.study_dir)}
+
+
+EventCallback = t.Callable[[UpgradeEvent], None]
+"""Function called for each progress event of an upgrade."""
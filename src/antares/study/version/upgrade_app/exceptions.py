@@ -1,3 +1,6 @@
+from pathlib import Path
+
+
 class UpgradeError(Exception):
     """
     Base class for exceptions in this module.
@@ -22,3 +25,86 @@ class UnexpectedMatrixLinksError(UpgradeError):
             f" that allows to replace the matrix links by valid TSV matrices."
         )
         super().__init__(message)
+
+
+class MatrixNotFoundError(UpgradeError):
+    """
+    Exception raised when the matrix referenced by a matrix link can't be found by the matrix resolver.
+    """
+
+    def __init__(self, link_path: str, link: str):
+        """
+        Initialize the exception.
+
+        Args:
+            link_path: The relative path to the matrix link.
+            link: The content of the matrix link.
+        """
+        super().__init__(f"Cannot resolve the matrix link '{link_path}': matrix '{link}' not found")
+
+
+class UpgradePreconditionError(UpgradeError):
+    """
+    Exception raised when a study file doesn't fulfil the preconditions of the upgrade.
+    """
+
+    def __init__(self, relpath: str, reason: str):
+        """
+        Initialize the exception.
+
+        Args:
+            relpath: The relative path to the invalid file.
+            reason: The reason why the file can't be upgraded.
+        """
+        super().__init__(f"Cannot upgrade '{relpath}': {reason}")
+
+
+class InsufficientSpaceError(UpgradeError):
+    """
+    Exception raised when there is not enough free space to back up the study files before the upgrade.
+    """
+
+    def __init__(self, backup_dir: Path, required: int, available: int):
+        """
+        Initialize the exception.
+
+        Args:
+            backup_dir: The directory where the backup is made.
+            required: The size of the backup, in bytes.
+            available: The free space of the file system, in bytes.
+        """
+        super().__init__(
+            f"Not enough free space in '{backup_dir}' to back up the study files:"
+            f" {required} bytes required, {available} bytes available"
+        )
+
+
+class UpgradeCancelledError(UpgradeError):
+    """
+    Exception raised when an upgrade is cancelled (the study files are restored).
+    """
+
+    def __init__(self, study_dir: Path):
+        """
+        Initialize the exception.
+
+        Args:
+            study_dir: The directory of the study.
+        """
+        super().__init__(f"Upgrade of the study '{study_dir}' cancelled")
+
+
+class StudyLockedError(UpgradeError):
+    """
+    Exception raised when a study is locked by another upgrade (see `StudyLock`).
+    """
+
+    def __init__(self, study_dir: Path, lock_path: Path):
+        """
+        Initialize the exception.
+
+        Args:
+            study_dir: The directory of the study.
+            lock_path: The path of the lock file.
+        """
+        super().__init__(f"The study '{study_dir}' is locked by another upgrade (lock file: '{lock_path}')")
@@ -0,0 +1,103 @@
+"""
+Upgrade of the study configuration in memory.
+
+Services which store the study configuration (`generaldata.ini`, cluster lists, `hydro.ini`...)
+in a database or in a cache can upgrade it without writing the study on disk.
+"""
+
+import dataclasses
+import typing as t
+from pathlib import PurePosixPath
+
+from ..exceptions import ApplicationError
+from ..model.general_data import GENERAL_DATA_PATH
+from ..model.study_version import StudyVersion
+from .scenario_mapping import scenarios
+from .scheduler import UpgradeStep, build_dependencies, run_steps
+from .study_session import StudySession
+
+JSON = dict[str, t.Any]
+
+TEXT_DOCUMENTS = frozenset({"input/areas/list.txt"})
+"""Text files accepted as documents (they are never changed by the upgrades)."""
+
+
+def _check_documents(documents: t.Mapping[str, JSON | str]) -> None:
+    for relpath, content in documents.items():
+        posix_path = PurePosixPath(relpath).as_posix()
+        if isinstance(content, str) and posix_path not in TEXT_DOCUMENTS:
+            raise ValueError(f"Unsupported text document: '{relpath}'")
+        elif not isinstance(content, str) and posix_path.endswith(".txt"):
+            # Matrices can't be upgraded in memory
+            raise ValueError(f"Unsupported matrix document: '{relpath}'")
+
+
+def _skip_if_absent(step: UpgradeStep) -> UpgradeStep:
+    """Wrap a step, so that it is skipped if none of the documents it reads or writes exists (when it is run)."""
+
+    def func(session: StudySession) -> None:
+        if any(session.tree.exists(relpath) for relpath in (*step.files, *step.reads)):
+            step.func(session)
+
+    return dataclasses.replace(step, func=func)
+
+
+def upgrade_documents(
+    documents: t.Mapping[str, JSON | str],
+    src_version: StudyVersion | str,
+    dst_version: StudyVersion | str,
+) -> dict[str, JSON | str]:
+    """
+    Upgrade the configuration documents of a study, without reading or writing the disk.
+
+    The documents are the parsed INI files of the study (as read by `IniReader`),
+    indexed by their path relative to the study directory, for instance
+    `settings/generaldata.ini` or `input/thermal/clusters/fr/list.ini`.
+    The list of areas can also be given as text, with the `input/areas/list.txt` key.
+
+    The same transformations as `UpgradeApp` are applied, except for the matrices
+    (which are not part of the documents) and for the version in the `study.antares` file.
+    The upgrades only see the given documents: the steps which concern none of them are skipped,
+    and the `input/areas/list.txt` document is optional (without it, the study has no area).
+    For instance, the short-term storage clusters are only created for the areas of `input/areas/list.txt`.
+
+    Usage::
+
+        documents = {"settings/generaldata.ini": general_data, "input/areas/list.txt": "FR\\nDE\\n"}
+        upgraded = upgrade_documents(documents, "8.6", "9.3")
+
+    Args:
+        documents: The documents to upgrade, indexed by relative path (they are not modified).
+        src_version: The version of the documents.
+        dst_version: The target version.
+
+    Returns:
+        The upgraded documents: the given documents, and the INI documents created by the upgrades
+        (the documents which are upgraded but weren't given, like `input/hydro/hydro.ini`, are not returned).
+
+    Raises:
+        ValueError: If a document is not supported (a matrix, for instance).
+        ApplicationError: If the target version can't be reached.
+        UpgradeError: If the documents don't fulfil the preconditions of the upgrade.
+    """
+    _check_documents(documents)
+    try:
+        plan = scenarios.get_plan(StudyVersion.parse(src_version), StudyVersion.parse(dst_version))
+    except KeyError as e:
+        raise ApplicationError(e.args[0]) from e
+
+    session = StudySession.from_documents(documents)
+    if session.tree.exists(GENERAL_DATA_PATH):
+        plan.upgrade_general_data(session)
+    plan.check(session)
+    steps = [_skip_if_absent(step) for step in plan.steps]
+    run_steps(steps, session, dependencies=build_dependencies(steps), max_workers=1)
+    session.flush()
+
+    upgraded: dict[str, JSON | str] = {}
+    for relpath in session.tree.iter_files():
+        if relpath in TEXT_DOCUMENTS:
+            upgraded[relpath] = session.read_text(relpath)
+        elif relpath in documents or (relpath.endswith(".ini") and relpath not in session.missing_documents):
+            upgraded[relpath] = dict(session.read_ini(relpath))
+    return upgraded
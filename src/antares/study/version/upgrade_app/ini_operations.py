@@ -0,0 +1,202 @@
+"""
+Declarative operations on INI documents (like `settings/generaldata.ini`).
+
+The upgrade methods describe their changes as a sequence of simple operations
+(set, pop or rename an option, replace a section, or apply a custom transformation).
+Those operations can be chained across several versions and simplified with
+`simplify_operations`, so that a long upgrade chain only applies the net operations.
+
+For instance, the option `include-split-exported-mps` is added in v8.3 and removed in v8.4:
+an upgrade from v8.2 to v9.3 only has to remove it.
+"""
+
+import dataclasses
+import typing as t
+
+JSON = dict[str, t.Any]
+
+
+class IniOperation:
+    """
+    Base class of the operations applied to an INI document.
+    """
+
+    def apply(self, data: JSON) -> None:
+        """
+        Apply the operation to the INI document (in place).
+
+        Args:
+            data: The INI document (dictionary of sections).
+        """
+        raise NotImplementedError
+
+    def touches(self, section: str, key: t.Optional[str] = None) -> bool:
+        """
+        Check if the operation reads or writes the given option (or any option of the section if `key` is `None`).
+
+        Args:
+            section: The section name.
+            key: The option name, or `None` for the whole section.
+        """
+        raise NotImplementedError
+
+
+@dataclasses.dataclass(frozen=True)
+class SetOption(IniOperation):
+    """Set the value of an option in an existing section."""
+
+    section: str
+    key: str
+    value: t.Any
+
+    def apply(self, data: JSON) -> None:
+        data[self.section][self.key] = self.value
+
+    def touches(self, section: str, key: t.Optional[str] = None) -> bool:
+        return section == self.section and key in {None, self.key}
+
+
+@dataclasses.dataclass(frozen=True)
+class PopOption(IniOperation):
+    """Remove an option (if present) from an existing section."""
+
+    section: str
+    key: str
+
+    def apply(self, data: JSON) -> None:
+        data[self.section].pop(self.key, None)
+
+    def touches(self, section: str, key: t.Optional[str] = None) -> bool:
+        return section == self.section and key in {None, self.key}
+
+
+@dataclasses.dataclass(frozen=True)
+class RenameOption(IniOperation):
+    """Rename an option of an existing section (the option must exist)."""
+
+    section: str
+    old_key: str
+    new_key: str
+
+    def apply(self, data: JSON) -> None:
+        data[self.section][self.new_key] = data[self.section].pop(self.old_key)
+
+    def touches(self, section: str, key: t.Optional[str] = None) -> bool:
+        return section == self.section and key in {None, self.old_key, self.new_key}
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplaceSection(IniOperation):
+    """Replace (or create) a whole section."""
+
+    section: str
+    options: tuple[tuple[str, t.Any], ...]
+
+    def apply(self, data: JSON) -> None:
+        data[self.section] = dict(self.options)
+
+    def touches(self, section: str, key: t.Optional[str] = None) -> bool:
+        return section == self.section
+
+
+@dataclasses.dataclass(frozen=True)
+class Transform(IniOperation):
+    """
+    Apply a custom transformation to the INI document.
+
+    The transformation is opaque: it can't be simplified, and the operations on the sections
+    and options it declares can't be moved across it.
+
+    Attributes:
+        func: A module-level function (to keep the operation picklable) which changes the document in place.
+        sections: The sections read or written by the function.
+        options: The `(section, key)` options read or written by the function.
+    """
+
+    func: t.Callable[[t.Any], None]
+    sections: tuple[str, ...] = ()
+    options: tuple[tuple[str, str], ...] = ()
+
+    def apply(self, data: JSON) -> None:
+        self.func(data)
+
+    def touches(self, section: str, key: t.Optional[str] = None) -> bool:
+        if section in self.sections:
+            return True
+        return any(sec == section and (key is None or key == opt) for sec, opt in self.options)
+
+
+def _find_last(operations: list[IniOperation], section: str, key: t.Optional[str]) -> int:
+    """Find the index of the last operation which touches the given option, or -1."""
+    for index in range(len(operations) - 1, -1, -1):
+        if operations[index].touches(section, key):
+            return index
+    return -1
+
+
+def simplify_operations(operations: t.Iterable[IniOperation]) -> tuple[IniOperation, ...]:
+    """
+    Simplify a chain of operations into an equivalent (and shorter) chain of operations.
+
+    The resulting document is the same, including the order of the sections and options:
+
+    - an option set several times is only set once, at the position of the first setting;
+    - an option set and then removed is only removed;
+    - an option set or removed in a section that is replaced by a later operation is dropped;
+    - an option set or removed after a section replacement is merged in the new section.
+
+    Custom transformations (and renaming) are barriers: the operations on the options
+    they touch are never merged across them.
+
+    Args:
+        operations: The ordered operations.
+
+    Returns:
+        The simplified operations.
+    """
+    result: list[IniOperation] = []
+    for op in operations:
+        if isinstance(op, SetOption):
+            index = _find_last(result, op.section, op.key)
+            prev = result[index] if index >= 0 else None
+            if isinstance(prev, SetOption):
+                result[index] = op
+                continue
+            elif isinstance(prev, ReplaceSection):
+                options = dict(prev.options)
+                options[op.key] = op.value
+                result[index] = ReplaceSection(prev.section, tuple(options.items()))
+                continue
+
+        elif isinstance(op, PopOption):
+            index = _find_last(result, op.section, op.key)
+            prev = result[index] if index >= 0 else None
+            if isinstance(prev, SetOption):
+                # The option may exist before the setting: it must still be removed.
+                del result[index]
+            elif isinstance(prev, ReplaceSection):
+                options = dict(prev.options)
+                options.pop(op.key, None)
+                result[index] = ReplaceSection(prev.section, tuple(options.items()))
+                continue
+
+        elif isinstance(op, ReplaceSection):
+            # Drop the previous simple operations on this section, up to the last barrier.
+            # A previous replacement is kept in place to preserve the order of the sections.
+            merged = False
+            for index in range(len(result) - 1, -1, -1):
+                prev = result[index]
+                if isinstance(prev, ReplaceSection) and prev.section == op.section:
+                    result[index] = op
+                    merged = True
+                    break
+                elif isinstance(prev, (SetOption, PopOption)) and prev.section == op.section:
+                    del result[index]
+                elif prev.touches(op.section):
+                    break
+            if merged:
+                continue
+
+        result.append(op)
+
+    return tuple(result)
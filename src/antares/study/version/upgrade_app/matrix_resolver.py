@@ -0,0 +1,179 @@
+"""
+Resolution of the matrix links of a study.
+
+In a normalized study, some matrices are replaced by links (`.txt.link` files)
+to the matrices of a matrix store. The upgrade methods which transform matrices
+(see `UpgradeMethod.should_denormalize`) need the matrices themselves: the links
+of the files they transform are resolved using a `MatrixResolver`, and the other
+links of the study are left unchanged.
+
+The matrices can also be upgraded in the matrix store itself (see `MatrixStore`):
+the new matrices are written in the store, and the study only gets new links.
+"""
+
+import abc
+import hashlib
+import json
+import typing as t
+from pathlib import Path
+
+from antares.study.version.file_utils import atomic_write
+
+MATRIX_LINK_SUFFIX = ".link"
+"""Suffix of the matrix link files (for instance, `input/links/fr/de.txt.link`)."""
+
+
+class MatrixResolver(abc.ABC):
+    """
+    Resolver of the matrix links: gives the content of the matrix referenced by a link.
+
+    The link is the content of the `.txt.link` file (without the surrounding whitespaces),
+    for instance "matrix://e9cd7a2b".
+    """
+
+    @abc.abstractmethod
+    def exists(self, link: str) -> bool:
+        """Check if the matrix referenced by a link exists."""
+
+    @abc.abstractmethod
+    def read_matrix(self, link: str) -> bytes:
+        """
+        Read the matrix referenced by a link.
+
+        Args:
+            link: The content of the link file.
+
+        Returns:
+            The content of the matrix file (tab-separated values).
+
+        Raises:
+            KeyError: If the matrix doesn't exist.
+        """
+
+
+class MatrixStore(MatrixResolver):
+    """
+    Content-addressed matrix store: the matrices are identified by the hash of their content.
+
+    The file-level transformations of the upgrade (see `StudySession.transform_file`) can be applied
+    to the matrices of the store: each distinct matrix is transformed once, and the outputs
+    are written back in the store. The transformations are recorded in the store, so that
+    the studies sharing the same matrices don't transform them again.
+    """
+
+    @abc.abstractmethod
+    def write_matrix(self, content: bytes) -> str:
+        """
+        Write a matrix in the store (nothing is written if the matrix already exists).
+
+        Args:
+            content: The content of the matrix file (tab-separated values).
+
+        Returns:
+            The link to the matrix.
+        """
+
+    @abc.abstractmethod
+    def get_transform(self, name: str, link: str) -> t.Optional[t.Mapping[str, str]]:
+        """
+        Get the outputs of a transformation already applied to a matrix of the store.
+
+        Args:
+            name: The name of the transformation.
+            link: The link to the input matrix.
+
+        Returns:
+            The links to the output matrices, indexed by role, or `None` if the transformation is unknown.
+        """
+
+    @abc.abstractmethod
+    def set_transform(self, name: str, link: str, outputs: t.Mapping[str, str]) -> None:
+        """
+        Record the outputs of a transformation applied to a matrix of the store.
+
+        Args:
+            name: The name of the transformation.
+            link: The link to the input matrix.
+            outputs: The links to the output matrices, indexed by role.
+        """
+
+
+class DirectoryMatrixStore(MatrixStore):
+    """
+    Matrix store where each matrix is a file of a local directory, named after the matrix ID.
+
+    The link contains the matrix ID, optionally preceded by a scheme (like "matrix://").
+    The matrices written in the store are named after the SHA-256 hash of their content,
+    and the transformations are recorded in the `transforms` folder of the store.
+
+    Usage::
+
+        store = DirectoryMatrixStore(Path("/data/matrices"))
+        content = store.read_matrix("matrix://e9cd7a2b")  # reads "/data/matrices/e9cd7a2b.tsv"
+    """
+
+    scheme = "matrix://"
+
+    def __init__(self, store_dir: Path, suffix: str = ".tsv") -> None:
+        self.store_dir = Path(store_dir)
+        self.suffix = suffix
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(store_dir={self.store_dir!r}, suffix={self.suffix!r})"
+
+    @staticmethod
+    def _get_matrix_id(link: str) -> str:
+        matrix_id = link.strip().rpartition("://")[2]
+        if not matrix_id or matrix_id in {".", ".."} or any(sep in matrix_id for sep in "/\\"):
+            raise KeyError(f"Invalid matrix link: '{link}'")
+        return matrix_id
+
+    def get_matrix_path(self, link: str) -> Path:
+        """
+        Get the path of the matrix file referenced by a link.
+
+        Raises:
+            KeyError: If the link doesn't contain a valid matrix ID.
+        """
+        return self.store_dir / f"{self._get_matrix_id(link)}{self.suffix}"
+
+    def exists(self, link: str) -> bool:
+        try:
+            return self.get_matrix_path(link).is_file()
+        except KeyError:
+            return False
+
+    def read_matrix(self, link: str) -> bytes:
+        matrix_path = self.get_matrix_path(link)
+        try:
+            return matrix_path.read_bytes()
+        except FileNotFoundError:
+            raise KeyError(f"Matrix not found: '{link}'") from None
+
+    def write_matrix(self, content: bytes) -> str:
+        link = f"{self.scheme}{hashlib.sha256(content).hexdigest()}"
+        matrix_path = self.get_matrix_path(link)
+        if not matrix_path.exists():
+            # Several studies may write the same matrix concurrently: the last replace wins
+            matrix_path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(matrix_path, mode="wb") as fp:
+                fp.write(content)
+        return link
+
+    def _get_transform_path(self, name: str, link: str) -> Path:
+        return self.store_dir / "transforms" / name / f"{self._get_matrix_id(link)}.json"
+
+    def get_transform(self, name: str, link: str) -> t.Optional[t.Mapping[str, str]]:
+        try:
+            outputs = json.loads(self._get_transform_path(name, link).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        # The output matrices may have been removed from the store
+        return outputs if all(map(self.exists, outputs.values())) else None
+
+    def set_transform(self, name: str, link: str, outputs: t.Mapping[str, str]) -> None:
+        transform_path = self._get_transform_path(name, link)
+        transform_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(transform_path, encoding="utf-8") as fp:
+            json.dump(dict(outputs), fp, sort_keys=True)
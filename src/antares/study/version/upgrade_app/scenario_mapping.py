@@ -1,9 +1,11 @@
+import bisect
 import collections.abc
 import typing as t
 
 from antares.study.version.model.study_version import StudyVersion
 
 from .upgrade_method import UpgradeMethod
+from .upgrade_plan import UpgradePlan
 from .upgrader_0701 import UpgradeTo0701
 from .upgrader_0702 import UpgradeTo0702
 from .upgrader_0800 import UpgradeTo0800
@@ -62,6 +64,31 @@ class ScenarioMapping(collections.abc.Mapping):
             if prev_version != next_version:
                 raise ValueError(f"Upgrade methods are not in the right order: {prev_version} != {next_version}")
 
+        self._old_versions = [meth.old for meth in self._methods]
+
+        # Precompute the upgrade plans of all the (start, end) pairs of the scenario
+        self._plans: dict[tuple[StudyVersion, StudyVersion], UpgradePlan] = {}
+        for start, first in enumerate(self._methods):
+            for stop in range(start + 1, len(self._methods) + 1):
+                plan = UpgradePlan.from_methods(self._methods[start:stop])
+                self._plans[(first.old, plan.new)] = plan
+
+    def _get_index(self, study_version: StudyVersion) -> int:
+        """
+        Find the index of the upgrade method which can upgrade from the given version.
+
+        Args:
+            study_version: The current version.
+
+        Returns:
+            The index of the upgrade method in the scenario.
+        """
+        # The methods are sorted and contiguous, so a binary search on the old versions is enough
+        index = bisect.bisect_right(self._old_versions, study_version) - 1
+        if index >= 0 and self._methods[index].can_upgrade(study_version):
+            return index
+        raise KeyError(f"Cannot upgrade from version '{study_version}'")
+
     def _get_upgrade_method(self, study_version: StudyVersion) -> UpgradeMethod:
         """
         Find the next study version from the given version.
@@ -72,45 +99,40 @@ class ScenarioMapping(collections.abc.Mapping):
         Returns:
             The next version as a string.
         """
-        for meth in self._methods:
-            if meth.can_upgrade(study_version):
-                return meth
-        raise KeyError(f"Cannot upgrade from version '{study_version}'")
+        return self._methods[self._get_index(study_version)]
 
-    def _iter_upgrade_methods(
-        self, start: StudyVersion, end: t.Optional[StudyVersion]
-    ) -> t.Generator[UpgradeMethod, None, None]:
+    def get_plan(self, from_version: StudyVersion, to_version: t.Optional[StudyVersion] = None) -> UpgradePlan:
         """
-        Get the upgrade scenario from the start version to the end version.
+        Get the compiled upgrade plan from the start version to the end version.
+
+        The plans are precomputed when the scenario is created, so this is a simple lookup.
 
         Args:
-            start: The start version.
-            end: The end version.
+            from_version: The start version.
+            to_version: The end version (by default, the latest version).
 
         Returns:
-            The list of upgrade methods.
+            The upgrade plan.
+
+        Raises:
+            KeyError: If the end version is already reached or can't be reached from the start version.
         """
+        if to_version is not None:
+            if from_version == to_version:
+                raise KeyError(f"Your study is already in version '{to_version}'")
+            elif from_version > to_version:
+                raise KeyError(f"Cannot downgrade from version '{from_version}' to '{to_version}'")
 
-        iter_methods = iter(self._methods)
+        try:
+            first = self._methods[self._get_index(from_version)]
+        except KeyError:
+            raise KeyError(f"Cannot upgrade from version '{from_version}': unknown version") from None
 
-        # First, find the first upgrade method that can upgrade from the start version
-        for meth in iter_methods:
-            if meth.can_upgrade(start) and (end is None or meth.new <= end):  # type: ignore
-                yield meth
-                break
-        else:
-            # No upgrade method found
-            return
-
-        # Then, find the next upgrade methods until the end version
-        curr = meth.new
-        for meth in iter_methods:
-            if meth.can_upgrade(curr) and (end is None or meth.new <= end):
-                yield meth
-                curr = meth.new
-            else:
-                # We reached the end version or we passed it
-                return
+        end_version = self._methods[-1].new if to_version is None else to_version
+        try:
+            return self._plans[(first.old, end_version)]
+        except KeyError:
+            raise KeyError(f"Cannot upgrade to version '{to_version}': version unreachable") from None
 
     def _get_upgrade_methods(
         self, from_version: StudyVersion, to_version: t.Optional[StudyVersion]
@@ -125,25 +147,7 @@ class ScenarioMapping(collections.abc.Mapping):
         Returns:
             The list of upgrade methods.
         """
-        if to_version is None:
-            methods = tuple(self._iter_upgrade_methods(from_version, to_version))
-            if not methods:
-                raise KeyError(f"Cannot upgrade from version '{from_version}': unknown version")
-            return methods
-        else:
-            if from_version == to_version:
-                raise KeyError(f"Your study is already in version '{to_version}'")
-            elif from_version > to_version:
-                raise KeyError(f"Cannot downgrade from version '{from_version}' to '{to_version}'")
-
-            methods = tuple(self._iter_upgrade_methods(from_version, to_version))
-
-            if not methods:
-                raise KeyError(f"Cannot upgrade from version '{from_version}': unknown version")
-            elif methods[-1].new != to_version:
-                raise KeyError(f"Cannot upgrade to version '{to_version}': version unreachable")
-
-            return methods
+        return self.get_plan(from_version, to_version).methods
 
     def __getitem__(self, index: int | StudyVersion | slice) -> UpgradeMethod | t.Sequence[UpgradeMethod]:
         """
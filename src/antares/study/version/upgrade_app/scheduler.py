@@ -0,0 +1,137 @@
+"""
+Dependency-aware execution of the upgrade steps.
+
+Each upgrade step declares the files and folders it writes (`files`) and reads (`reads`).
+Two steps conflict if one of them writes a path which is equal to, a parent of, or a child of
+a path read or written by the other one. Conflicting steps are run in their original order,
+while the other steps can be run concurrently in a thread pool: the result is the same as
+the sequential execution.
+"""
+
+import concurrent.futures
+import dataclasses
+import typing as t
+from pathlib import PurePosixPath
+
+from .study_session import StudySession
+
+
+@dataclasses.dataclass(frozen=True)
+class UpgradeStep:
+    """
+    Unit of work of an upgrade method.
+
+    Attributes:
+        name: The name of the step (used in error messages and progress reports).
+        func: The function which upgrades the study files, using the session.
+        files: The files and folders written by the step (relative to the study directory).
+        reads: The files and folders read (but not written) by the step.
+    """
+
+    name: str
+    func: t.Callable[[StudySession], None]
+    files: tuple[str, ...] = ()
+    reads: tuple[str, ...] = ()
+
+    def __str__(self) -> str:
+        return self.name
+
+
+def _overlaps(paths1: t.Iterable[str], paths2: t.Iterable[str]) -> bool:
+    """Check if a path of the first list is equal to, a parent of, or a child of a path of the second list."""
+    pure_paths2 = [PurePosixPath(p) for p in paths2]
+    for path1 in map(PurePosixPath, paths1):
+        for path2 in pure_paths2:
+            if path1 == path2 or path1 in path2.parents or path2 in path1.parents:
+                return True
+    return False
+
+
+def conflicts(step1: UpgradeStep, step2: UpgradeStep) -> bool:
+    """
+    Check if two steps must be run in order (one of them writes something read or written by the other).
+    """
+    return _overlaps(step1.files, step2.files + step2.reads) or _overlaps(step1.reads, step2.files)
+
+
+def build_dependencies(steps: t.Sequence[UpgradeStep]) -> tuple[frozenset[int], ...]:
+    """
+    Build the dependency graph of an ordered list of steps.
+
+    Args:
+        steps: The ordered steps.
+
+    Returns:
+        For each step, the indices of the previous steps that must be completed before running it.
+    """
+    return tuple(
+        frozenset(prev for prev in range(index) if conflicts(steps[prev], step)) for index, step in enumerate(steps)
+    )
+
+
+def run_steps(
+    steps: t.Sequence[UpgradeStep],
+    session: StudySession,
+    *,
+    dependencies: t.Optional[t.Sequence[t.AbstractSet[int]]] = None,
+    max_workers: t.Optional[int] = None,
+    on_step: t.Optional[t.Callable[[UpgradeStep, bool], None]] = None,
+) -> None:
+    """
+    Run the upgrade steps, concurrently when they don't conflict.
+
+    If a step fails, no new step is started, the running steps are awaited,
+    and the exception of the first failing step (in the original order) is raised.
+
+    Args:
+        steps: The ordered steps.
+        session: The session shared by all the steps.
+        dependencies: The dependency graph of the steps (computed if missing, see `build_dependencies`).
+        max_workers: The maximum number of threads (1 to run the steps sequentially).
+        on_step: Function called (in the calling thread) when a step is started, with `False`,
+            and when it is completed, with `True`. If it raises an exception, no new step is started.
+    """
+    if dependencies is None:
+        dependencies = build_dependencies(steps)
+    notify = on_step or (lambda _step, _completed: None)
+
+    if max_workers == 1 or len(steps) <= 1:
+        for step in steps:
+            notify(step, False)
+            step.func(session)
+            notify(step, True)
+        return
+
+    pending = set(range(len(steps)))
+    done: set[int] = set()
+    errors: dict[int, BaseException] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upgrade") as executor:
+        running: dict[concurrent.futures.Future[None], int] = {}
+        while pending or running:
+            if not errors:
+                ready = sorted(index for index in pending if dependencies[index] <= done)
+                for index in ready:
+                    pending.remove(index)
+                    try:
+                        notify(steps[index], False)
+                    except Exception as e:
+                        errors[index] = e
+                        break
+                    running[executor.submit(steps[index].func, session)] = index
+            if not running:
+                break
+            completed, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in completed:
+                index = running.pop(future)
+                exception = future.exception()
+                if exception is None:
+                    done.add(index)
+                    try:
+                        notify(steps[index], True)
+                    except Exception as e:
+                        errors[index] = e
+                else:
+                    errors[index] = exception
+
+    if errors:
+        raise errors[min(errors)]
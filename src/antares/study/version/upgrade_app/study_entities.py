@@ -0,0 +1,131 @@
+"""
+Registry of the study entities (areas, links, clusters).
+
+The upgrade methods query the registry instead of listing the study folders
+and normalizing the names themselves.
+"""
+
+import dataclasses
+import threading
+import typing as t
+
+from .helpers import transform_name_to_id
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from .study_session import StudySession
+
+ClusterKind = t.Literal["thermal", "renewables", "st-storage"]
+"""Kind of clusters (the name of the folder of the clusters in the `input` folder)."""
+
+
+@dataclasses.dataclass(frozen=True)
+class Area:
+    """
+    Area of the study.
+
+    Attributes:
+        id: The area ID (the name of the area folders).
+        name: The area name, as written in the `input/areas/list.txt` file.
+    """
+
+    id: str
+    name: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Cluster:
+    """
+    Cluster (thermal, renewable or short-term storage) of an area.
+
+    Attributes:
+        area_id: The ID of the area of the cluster.
+        id: The cluster ID.
+        name: The cluster name (the section name in the `list.ini` file).
+    """
+
+    area_id: str
+    id: str
+    name: str
+
+
+class StudyEntities:
+    """
+    Registry of the study entities, shared by all the upgrade methods of an upgrade chain.
+
+    The areas are loaded once from the `input/areas/list.txt` file (which is never changed by the upgrades).
+    The links and clusters are served from the study tree index and from the INI documents of the session,
+    so that they reflect the folders and files created by the previous upgrade steps.
+
+    Usage::
+
+        entities = session.entities
+        for area in entities.areas.values():
+            ...
+        for area_id in entities.get_cluster_areas("st-storage"):
+            ini_path = entities.get_clusters_ini("st-storage", area_id)
+            ...
+    """
+
+    def __init__(self, session: "StudySession") -> None:
+        self.session = session
+        self._areas: t.Optional[dict[str, Area]] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(study_dir={self.session.study_dir!r})"
+
+    @property
+    def areas(self) -> t.Mapping[str, Area]:
+        """The areas of the study, indexed by ID (in the order of the `input/areas/list.txt` file)."""
+        with self._lock:
+            if self._areas is None:
+                try:
+                    text = self.session.read_text("input/areas/list.txt")
+                except FileNotFoundError:
+                    # The list of areas is optional for the in-memory upgrades (see `upgrade_documents`)
+                    if not self.session.in_memory:
+                        raise
+                    text = ""
+                area_names = text.splitlines(keepends=False)
+                areas = (Area(transform_name_to_id(name), name) for name in area_names)
+                self._areas = {area.id: area for area in areas}
+            return self._areas
+
+    def get_area_dirs(self) -> list[str]:
+        """
+        Get the IDs of the areas which have a folder in `input/areas` (the folders may differ from `list.txt`).
+
+        The in-memory sessions have no area folders (see `upgrade_documents`): the areas of `list.txt` are used.
+        """
+        if self.session.in_memory:
+            return list(self.areas)
+        return [entry.name for entry in self.session.tree.listdir("input/areas") if entry.is_dir]
+
+    def get_link_areas(self) -> list[str]:
+        """Get the IDs of the areas which have a links folder (the origin areas of the links)."""
+        return [entry.name for entry in self.session.tree.listdir("input/links") if entry.is_dir]
+
+    @staticmethod
+    def get_clusters_ini(kind: ClusterKind, area_id: str) -> str:
+        """Get the relative path of the `list.ini` file of the clusters of an area."""
+        return f"input/{kind}/clusters/{area_id}/list.ini"
+
+    def get_cluster_areas(self, kind: ClusterKind) -> list[str]:
+        """Get the IDs of the areas which have a `list.ini` file for the given kind of clusters."""
+        return [relpath.split("/")[3] for relpath in self.session.tree.glob(f"input/{kind}/clusters/*/list.ini")]
+
+    def get_clusters(self, kind: ClusterKind, area_id: str) -> dict[str, Cluster]:
+        """
+        Get the clusters of an area.
+
+        Args:
+            kind: The kind of clusters.
+            area_id: The area ID.
+
+        Returns:
+            The clusters of the area, indexed by cluster ID.
+        """
+        sections = self.session.read_ini(self.get_clusters_ini(kind, area_id))
+        clusters = (Cluster(area_id, transform_name_to_id(name), name) for name in sections)
+        return {cluster.id: cluster for cluster in clusters}
@@ -0,0 +1,160 @@
+"""
+Advisory lock of a study directory, held during an upgrade.
+
+Two processes upgrading the same study at the same time (for instance, a user of the CLI
+and a worker of a batch upgrade) would corrupt the study, since the upgrade swaps the study files.
+The lock is a lock file next to the study directory (`~<name>.upgrade.lock`), locked with `fcntl.flock`
+(or `msvcrt.locking` on Windows): the lock is released by the OS if the process dies.
+
+The lock file is not created in the study directory, since the study files are copied and swapped
+during the upgrade. It is removed when the lock is released.
+"""
+
+import contextlib
+import logging
+import os
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+from .exceptions import StudyLockedError
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE_PREFIX = "~"
+LOCK_FILE_SUFFIX = ".upgrade.lock"
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(fd: int) -> None:
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+else:
+    import fcntl
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _unlock(fd: int) -> None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+def get_lock_path(study_dir: Path) -> Path:
+    """Get the path of the lock file of a study directory."""
+    study_dir = Path(study_dir).resolve()
+    return study_dir.parent / f"{LOCK_FILE_PREFIX}{study_dir.name}{LOCK_FILE_SUFFIX}"
+
+
+def _is_same_file(fd: int, path: Path) -> bool:
+    """Check if an open file is still the file at the given path (it may have been removed and recreated)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    fd_stat = os.fstat(fd)
+    return (fd_stat.st_dev, fd_stat.st_ino) == (stat.st_dev, stat.st_ino)
+
+
+class StudyLock:
+    """
+    Advisory lock of a study directory, used as a context manager.
+
+    Usage::
+
+        with StudyLock(study_dir, timeout=60):
+            ...  # upgrade the study
+
+    Args:
+        study_dir: The study directory.
+        timeout: The maximum time to wait for the lock, in seconds: 0 to fail immediately if the study
+            is locked (try-lock), and `None` (the default) to wait until the study is unlocked.
+        poll_interval: The time between two attempts to acquire the lock, in seconds.
+    """
+
+    def __init__(self, study_dir: Path, timeout: t.Optional[float] = None, poll_interval: float = 0.1) -> None:
+        if timeout is not None and timeout < 0:
+            raise ValueError(f"Invalid lock timeout: {timeout}")
+        self.study_dir = Path(study_dir)
+        self.lock_path = get_lock_path(self.study_dir)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: t.Optional[int] = None
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(study_dir={self.study_dir!r}, timeout={self.timeout!r})"
+
+    @property
+    def locked(self) -> bool:
+        """Whether the lock is held by this object."""
+        return self._fd is not None
+
+    def acquire(self) -> None:
+        """
+        Acquire the lock.
+
+        Raises:
+            StudyLockedError: If the lock can't be acquired before the timeout.
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"The study is already locked: {self.study_dir}")
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            if _try_lock(fd):
+                # The lock file may have been removed by the previous owner, after we opened it
+                if _is_same_file(fd, self.lock_path):
+                    self._fd = fd
+                    return
+                _unlock(fd)
+                continue
+            os.close(fd)
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise StudyLockedError(self.study_dir, self.lock_path)
+            logger.debug("Waiting for the lock of the study '%s'...", self.study_dir)
+            time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+
+    def release(self) -> None:
+        """Release the lock, and remove the lock file."""
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        if sys.platform == "win32":
+            _unlock(fd)
+            # The file can't be removed while another process has it open: it is left in place
+            with contextlib.suppress(OSError):
+                os.unlink(self.lock_path)
+        else:
+            # The file is removed while the lock is held: the waiting processes
+            # detect that their lock file was removed (see `acquire`)
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.lock_path)
+            _unlock(fd)
+
+    def __enter__(self) -> "StudyLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: t.Any) -> None:
+        self.release()
@@ -0,0 +1,447 @@
+import concurrent.futures
+import copy
+import dataclasses
+import os
+import tempfile
+import threading
+import typing as t
+from pathlib import Path, PurePosixPath
+
+from antares.study.version.file_utils import atomic_write
+from antares.study.version.ini_reader import IniReader
+from antares.study.version.ini_writer import IniWriter
+from antares.study.version.model.general_data import DUPLICATE_KEYS, GENERAL_DATA_PATH, GeneralData
+
+from .exceptions import MatrixNotFoundError, UnexpectedMatrixLinksError
+from .matrix_resolver import MATRIX_LINK_SUFFIX, MatrixResolver, MatrixStore
+from .study_entities import StudyEntities
+from .study_tree import StudyTree
+from .transform_cache import TransformCache
+
+JSON = dict[str, t.Any]
+
+_T = t.TypeVar("_T")
+_R = t.TypeVar("_R")
+
+
+@dataclasses.dataclass
+class _Document:
+    """INI document loaded in the session cache."""
+
+    data: JSON
+    special_keys: t.Sequence[str] = ()
+    dirty: bool = False
+
+
+class StudySession:
+    """
+    Unit of work shared by all the upgrade methods of an upgrade chain.
+
+    The session caches the parsed INI documents of the study by relative path,
+    so that a document modified by several upgrade methods is read only once.
+    The documents modified by the upgrade methods are marked as "dirty"
+    and are written only once, when the session is flushed after the last step.
+
+    Usage::
+
+        session = StudySession(study_dir)
+        sections = session.read_ini("input/thermal/clusters/fr/list.ini")
+        sections["gas"]["enabled"] = True
+        session.write_ini("input/thermal/clusters/fr/list.ini", sections)
+        session.flush()
+
+    The upgrade methods can also use the session to spread their per-entity loops
+    (areas, links, clusters...) over a pool of threads, see `map`.
+
+    The session also holds an index of the study file tree (see `StudyTree`):
+    the upgrade methods should use it to find the study files, and to create or remove files.
+    The areas, links and clusters of the study are available in the `entities` registry.
+
+    The file-level transformations (see `transform_file`) can use a cache shared by several studies.
+    The matrix links of the study can be resolved using a matrix resolver (see `resolve_matrix_link`),
+    or kept: the matrices are then transformed in the matrix store (see `transform_file`).
+
+    The progress of the loops run with `map` can be reported to an `on_progress` function,
+    called (from the worker threads) with the name of the loop, the number of processed items and their total.
+    """
+
+    def __init__(
+        self,
+        study_dir: Path,
+        *,
+        jobs: t.Optional[int] = None,
+        cache: t.Optional[TransformCache] = None,
+        matrix_resolver: t.Optional[MatrixResolver] = None,
+        keep_matrix_links: bool = False,
+        on_progress: t.Optional[t.Callable[[str, int, int], None]] = None,
+    ) -> None:
+        if keep_matrix_links and not isinstance(matrix_resolver, MatrixStore):
+            raise ValueError("A matrix store is required to keep the matrix links")
+        self.study_dir = Path(study_dir)
+        self.jobs = jobs
+        self.cache = cache
+        self.matrix_resolver = matrix_resolver
+        self.keep_matrix_links = keep_matrix_links
+        self.on_progress = on_progress
+        self.tree = StudyTree(self.study_dir)
+        self.entities = StudyEntities(self)
+        self._documents: dict[str, _Document] = {}
+        self._texts: dict[str, str] = {}
+        # INI documents read while missing from an in-memory session (see `read_ini`)
+        self.missing_documents: set[str] = set()
+        # The session is shared by the steps run concurrently (see `run_steps`)
+        self._lock = threading.RLock()
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(study_dir={self.study_dir!r}, jobs={self.jobs!r})"
+
+    @classmethod
+    def from_documents(cls, documents: t.Mapping[str, JSON | str]) -> "StudySession":
+        """
+        Create an in-memory session, which never reads or writes the file system.
+
+        The study tree only contains the given documents (see `StudyTree.from_paths`),
+        missing INI documents are empty (they are recorded in `missing_documents`),
+        and flushing the session only records the new documents in the tree.
+
+        Args:
+            documents: The INI documents (parsed) and the text files, indexed by relative path.
+                The documents are copied.
+
+        Returns:
+            The in-memory session.
+        """
+        session = cls(Path(), jobs=1)
+        session.tree = StudyTree.from_paths(session.study_dir, documents)
+        for relpath, content in documents.items():
+            key = session._normalize(relpath)
+            if isinstance(content, str):
+                session._texts[key] = content
+            else:
+                session._documents[key] = _Document(copy.deepcopy(content))
+        return session
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the session is an in-memory session (see `from_documents`)."""
+        return self.tree.virtual
+
+    def read_text(self, relpath: str | PurePosixPath) -> str:
+        """
+        Read a text file of the study (like `input/areas/list.txt`).
+
+        Args:
+            relpath: Path of the text file, relative to the study directory.
+
+        Returns:
+            The content of the text file.
+
+        Raises:
+            FileNotFoundError: If the file is missing.
+        """
+        key = self._normalize(relpath)
+        if not self.in_memory:
+            return (self.study_dir / key).read_text(encoding="utf-8")
+        try:
+            return self._texts[key]
+        except KeyError:
+            raise FileNotFoundError(f"Missing document: '{key}'") from None
+
+    @staticmethod
+    def _normalize(relpath: str | PurePosixPath) -> str:
+        return PurePosixPath(relpath).as_posix()
+
+    def read_ini(self, relpath: str | PurePosixPath, special_keys: t.Sequence[str] = ()) -> JSON:
+        """
+        Read an INI document of the study, using the cache if the document is already loaded.
+
+        The returned document is the cached object: any change must be notified
+        to the session using `write_ini` (or `mark_dirty`) to be saved.
+
+        Args:
+            relpath: Path of the INI file, relative to the study directory.
+            special_keys: Duplicate keys which should be parsed as list (see `IniReader`).
+
+        Returns:
+            The parsed INI document (empty if the file is missing).
+        """
+        key = self._normalize(relpath)
+        with self._lock:
+            document = self._documents.get(key)
+        if document is None:
+            # A new reader is used for each file, because the reader reuses its internal dictionary.
+            data = {} if self.in_memory else IniReader(special_keys=special_keys).read(self.study_dir / key)
+            with self._lock:
+                if self.in_memory and not self.tree.is_file(key):
+                    self.missing_documents.add(key)
+                document = self._documents.setdefault(key, _Document(data, special_keys=special_keys))
+        return document.data
+
+    def write_ini(self, relpath: str | PurePosixPath, data: JSON, special_keys: t.Sequence[str] = ()) -> None:
+        """
+        Replace the content of an INI document and mark it as dirty.
+
+        Args:
+            relpath: Path of the INI file, relative to the study directory.
+            data: The new content of the INI document.
+            special_keys: Duplicate keys which should be written as multiple lines (see `IniWriter`).
+        """
+        key = self._normalize(relpath)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                self._documents[key] = _Document(data, special_keys=special_keys, dirty=True)
+            else:
+                document.data = data
+                document.special_keys = special_keys or document.special_keys
+                document.dirty = True
+
+    def mark_dirty(self, relpath: str | PurePosixPath) -> None:
+        """
+        Mark a cached INI document as modified.
+
+        Args:
+            relpath: Path of the INI file, relative to the study directory.
+        """
+        with self._lock:
+            self._documents[self._normalize(relpath)].dirty = True
+
+    def get_max_workers(self, cpu_bound: bool = False) -> int:
+        """
+        Get the number of workers used to run concurrent tasks.
+
+        Args:
+            cpu_bound: Whether the tasks are CPU-bound (like matrix parsing) or I/O-bound (like INI files updates).
+
+        Returns:
+            The number of jobs of the session, or if not specified, the number of CPUs for CPU-bound tasks,
+            and a larger number of threads for I/O-bound tasks (which mostly wait for the file system).
+        """
+        if self.jobs is not None:
+            return self.jobs
+        cpu_count = os.cpu_count() or 1
+        return cpu_count if cpu_bound else min(32, cpu_count + 4)
+
+    def map(
+        self,
+        func: t.Callable[[_T], _R],
+        items: t.Iterable[_T],
+        *,
+        cpu_bound: bool = False,
+        label: str = "",
+    ) -> list[_R]:
+        """
+        Apply a function to each item, using a pool of threads.
+
+        The items must be independent: the function must not write a file read or written for another item.
+        If a call fails, the pending calls are cancelled and the exception of the first failing item is raised.
+
+        Args:
+            func: The function to apply to each item (an area, a link, a cluster...).
+            items: The items to process.
+            cpu_bound: Whether the function is CPU-bound or I/O-bound (see `get_max_workers`).
+            label: The name of the loop: if given, the progress is reported to the `on_progress` function.
+
+        Returns:
+            The results of the function, in the order of the items.
+        """
+        items = list(items)
+        if label and self.on_progress is not None:
+            func = self._with_progress(func, label, len(items), self.on_progress)
+        max_workers = min(self.get_max_workers(cpu_bound=cpu_bound), len(items))
+        if max_workers <= 1:
+            return [func(item) for item in items]
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upgrade-map")
+        try:
+            return list(executor.map(func, items))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def glob_matrices(self, pattern: str) -> list[str]:
+        """
+        Find the matrices of the study matching a pattern, including the matrices replaced by a link.
+
+        Args:
+            pattern: The pattern of the matrix files (for instance, `input/bindingconstraints/*.txt`).
+
+        Returns:
+            The relative paths of the matrices (without the `.link` suffix), sorted.
+        """
+        matrices = self.tree.glob(pattern)
+        links = self.tree.glob(f"{pattern}{MATRIX_LINK_SUFFIX}")
+        return sorted({*matrices, *(relpath[: -len(MATRIX_LINK_SUFFIX)] for relpath in links)})
+
+    def remove_matrix(self, relpath: str) -> None:
+        """
+        Remove a matrix of the study, or its link.
+
+        Args:
+            relpath: The matrix file (without the `.link` suffix), relative to the study directory.
+        """
+        link_relpath = f"{relpath}{MATRIX_LINK_SUFFIX}"
+        self.tree.unlink(link_relpath if self.tree.is_file(link_relpath) else relpath)
+
+    @staticmethod
+    def _with_progress(
+        func: t.Callable[[_T], _R], label: str, total: int, on_progress: t.Callable[[str, int, int], None]
+    ) -> t.Callable[[_T], _R]:
+        """Wrap a function to report the number of processed items after each call."""
+        lock = threading.Lock()
+        done = 0
+
+        def wrapper(item: _T) -> _R:
+            nonlocal done
+            result = func(item)
+            with lock:
+                done += 1
+                count = done
+            on_progress(label, count, total)
+            return result
+
+        return wrapper
+
+    def transform_file(
+        self,
+        name: str,
+        src: str,
+        outputs: t.Mapping[str, str],
+        func: t.Callable[[Path, t.Mapping[str, Path]], None],
+    ) -> None:
+        """
+        Apply a file-level transformation, whose outputs only depend on the content of the input file.
+
+        If the session has a cache, the outputs are copied from the cache when the same input file
+        has already been transformed, otherwise they are computed and stored in the cache.
+        The outputs are recorded in the study tree (their parent folders must exist).
+
+        If the input file is a matrix replaced by a link, and the links are kept (see `keep_matrix_links`),
+        the matrix is transformed in the matrix store, and the outputs are links to the new matrices.
+
+        Args:
+            name: The name of the transformation (used in the cache keys).
+            src: The input file, relative to the study directory.
+            outputs: The output files, relative to the study directory, indexed by role.
+            func: The transformation, called with the path of the input file and the paths of the outputs.
+        """
+        if self.keep_matrix_links and self.tree.is_file(f"{src}{MATRIX_LINK_SUFFIX}"):
+            self._transform_matrix_link(name, src, outputs, func)
+            return
+        src_path = self.study_dir / src
+        output_paths = {role: self.study_dir / relpath for role, relpath in outputs.items()}
+        if self.cache is None:
+            func(src_path, output_paths)
+        else:
+            key = self.cache.get_key(name, src_path)
+            if not self.cache.restore(key, output_paths):
+                func(src_path, output_paths)
+                self.cache.store(key, output_paths)
+        for relpath in outputs.values():
+            self.tree.record(relpath)
+
+    def _transform_matrix_link(
+        self,
+        name: str,
+        src: str,
+        outputs: t.Mapping[str, str],
+        func: t.Callable[[Path, t.Mapping[str, Path]], None],
+    ) -> None:
+        """Apply a file-level transformation to a matrix of the matrix store, and write the links to the outputs."""
+        store = t.cast(MatrixStore, self.matrix_resolver)
+        link_relpath = f"{src}{MATRIX_LINK_SUFFIX}"
+        link = self.read_text(link_relpath).strip()
+        output_links = store.get_transform(name, link)
+        if output_links is None or set(output_links) != set(outputs):
+            try:
+                content = store.read_matrix(link)
+            except KeyError:
+                raise MatrixNotFoundError(link_relpath, link) from None
+            with tempfile.TemporaryDirectory(prefix="~matrix.", suffix=".tmp") as tmp_dir:
+                src_path = Path(tmp_dir, "src")
+                src_path.write_bytes(content)
+                output_paths = {role: Path(tmp_dir, role) for role in outputs}
+                func(src_path, output_paths)
+                output_links = {role: store.write_matrix(path.read_bytes()) for role, path in output_paths.items()}
+            store.set_transform(name, link, output_links)
+        for role, relpath in outputs.items():
+            with atomic_write(self.study_dir / f"{relpath}{MATRIX_LINK_SUFFIX}", encoding="utf-8") as fp:
+                fp.write(output_links[role])
+            self.tree.record(f"{relpath}{MATRIX_LINK_SUFFIX}")
+
+    def check_matrix_link(self, relpath: str) -> None:
+        """
+        Check that a matrix link of the study can be resolved, without changing anything.
+
+        Args:
+            relpath: The matrix link (`.txt.link` file), relative to the study directory.
+
+        Raises:
+            UnexpectedMatrixLinksError: If the session has no matrix resolver.
+            MatrixNotFoundError: If the matrix referenced by the link can't be found.
+        """
+        if self.matrix_resolver is None:
+            raise UnexpectedMatrixLinksError(relpath)
+        link = self.read_text(relpath).strip()
+        if not self.matrix_resolver.exists(link):
+            raise MatrixNotFoundError(relpath, link)
+
+    def resolve_matrix_link(self, relpath: str) -> None:
+        """
+        Replace a matrix link of the study by the matrix it references (denormalization).
+
+        The matrix is written next to the link (for instance, `input/links/fr/de.txt`
+        for the `input/links/fr/de.txt.link` link), and the link is removed.
+
+        Args:
+            relpath: The matrix link (`.txt.link` file), relative to the study directory.
+
+        Raises:
+            UnexpectedMatrixLinksError: If the session has no matrix resolver.
+            MatrixNotFoundError: If the matrix referenced by the link can't be found.
+        """
+        if self.matrix_resolver is None:
+            raise UnexpectedMatrixLinksError(relpath)
+        link = self.read_text(relpath).strip()
+        try:
+            content = self.matrix_resolver.read_matrix(link)
+        except KeyError:
+            raise MatrixNotFoundError(relpath, link) from None
+        matrix_relpath = relpath[: -len(MATRIX_LINK_SUFFIX)]
+        with atomic_write(self.study_dir / matrix_relpath, mode="wb") as fp:
+            fp.write(content)
+        self.tree.record(matrix_relpath)
+        self.tree.unlink(relpath)
+
+    @property
+    def general_data(self) -> GeneralData:
+        """The content of the `settings/generaldata.ini` file (loaded once)."""
+        with self._lock:
+            document = self._documents.get(GENERAL_DATA_PATH)
+            if document is None or not isinstance(document.data, GeneralData):
+                data = GeneralData(**self.read_ini(GENERAL_DATA_PATH, special_keys=DUPLICATE_KEYS))
+                self._documents[GENERAL_DATA_PATH].data = data
+                return data
+            return document.data
+
+    @property
+    def dirty_files(self) -> list[str]:
+        """List of the relative paths of the modified INI documents."""
+        return [relpath for relpath, document in self._documents.items() if document.dirty]
+
+    def flush(self) -> None:
+        """
+        Write all the dirty INI documents to disk.
+
+        The documents of an in-memory session are only recorded in the study tree.
+        """
+        for relpath, document in self._documents.items():
+            if document.dirty and self.in_memory:
+                self.tree.mkdir(PurePosixPath(relpath).parent)
+                self.tree.record(relpath)
+                document.dirty = False
+            elif document.dirty:
+                self.tree.mkdir(PurePosixPath(relpath).parent)
+                ini_path = self.study_dir / relpath
+                IniWriter(special_keys=list(document.special_keys) or None).write(document.data, ini_path)
+                self.tree.record(relpath)
+                document.dirty = False
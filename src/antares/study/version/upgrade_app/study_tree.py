@@ -0,0 +1,332 @@
+"""
+In-memory index of the study file tree.
+
+The upgrade methods look for the study files (areas, links, clusters...) using glob patterns
+and existence checks. On a network file system, each of those metadata calls is expensive.
+The `StudyTree` lists each directory only once (with `os.scandir`), and serves all the
+following globs and existence checks from memory.
+
+The files and folders created or removed during the upgrade must be recorded in the index
+(see `mkdir`, `touch`, `unlink` and `record`) to keep it consistent with the file system.
+
+A virtual tree (see `StudyTree.from_paths`) is never synchronized with the file system:
+it is used to upgrade study documents in memory.
+"""
+
+import fnmatch
+import os
+import threading
+import typing as t
+from pathlib import Path, PurePath, PurePosixPath
+
+
+class TreeEntry:
+    """
+    File or directory of the study tree index.
+
+    The size and modification time are read lazily (and only once) when they are needed.
+    """
+
+    __slots__ = ("path", "is_dir", "_stat")
+
+    def __init__(self, path: Path, is_dir: bool, stat: t.Optional[os.stat_result] = None) -> None:
+        self.path = path
+        self.is_dir = is_dir
+        self._stat = stat
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(path={self.path!r}, is_dir={self.is_dir!r})"
+
+    @property
+    def name(self) -> str:
+        """The name of the file or directory."""
+        return self.path.name
+
+    def stat(self) -> os.stat_result:
+        """Get the status of the file or directory (cached)."""
+        if self._stat is None:
+            self._stat = self.path.stat()
+        return self._stat
+
+    @property
+    def size(self) -> int:
+        """The size of the file, in bytes."""
+        return self.stat().st_size
+
+    @property
+    def mtime(self) -> float:
+        """The last modification time of the file, in seconds since the epoch."""
+        return self.stat().st_mtime
+
+
+class StudyTree:
+    """
+    In-memory index of the study file tree.
+
+    Each directory is listed at most once: either by an explicit `scan` of a subtree
+    (done once at the start of the upgrade), or lazily on the first access.
+
+    All the paths are relative to the study directory, in POSIX format.
+
+    Usage::
+
+        tree = StudyTree(study_dir)
+        tree.scan("input/links", "input/thermal/clusters")
+        for relpath in tree.glob("input/thermal/clusters/*/list.ini"):
+            ...
+        tree.touch("input/st-storage/clusters/fr/list.ini")
+    """
+
+    def __init__(self, study_dir: Path) -> None:
+        self.study_dir = Path(study_dir)
+        self.virtual = False
+        # Listings of the scanned directories: relative path => {name => entry}
+        self._listings: dict[str, dict[str, TreeEntry]] = {}
+        # The directory listings are shared by the steps run concurrently.
+        # Directories are scanned while holding the lock, so that a concurrent change can't be missed.
+        self._lock = threading.RLock()
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(study_dir={self.study_dir!r})"
+
+    @classmethod
+    def from_paths(cls, study_dir: Path, relpaths: t.Iterable[str | PurePath]) -> "StudyTree":
+        """
+        Create a virtual tree containing only the given files (and their parent directories).
+
+        A virtual tree never reads or writes the file system: the files and directories
+        created or removed with `mkdir`, `touch` and `unlink` are only recorded in the index.
+
+        Args:
+            study_dir: The (virtual) study directory.
+            relpaths: Paths of the files, relative to the study directory.
+
+        Returns:
+            The virtual tree.
+        """
+        tree = cls(study_dir)
+        tree.virtual = True
+        tree._listings[""] = {}
+        for relpath in relpaths:
+            parent, name = tree._split(tree._normalize(relpath))
+            tree.mkdir(parent)
+            tree._listings[parent][name] = TreeEntry(tree.study_dir / relpath, is_dir=False)
+        return tree
+
+    @staticmethod
+    def _normalize(relpath: str | PurePath) -> str:
+        posix_path = PurePath(relpath).as_posix()
+        return "" if posix_path == "." else posix_path
+
+    @staticmethod
+    def _split(relpath: str) -> tuple[str, str]:
+        """Split a normalized relative path into its parent directory and its name."""
+        parent, _, name = relpath.rpartition("/")
+        return parent, name
+
+    def _scandir(self, reldir: str) -> dict[str, TreeEntry]:
+        """List a directory (must be called with the lock held)."""
+        listing = self._listings.get(reldir)
+        if listing is None and self.virtual:
+            # All the directories of a virtual tree are indexed
+            listing = self._listings[reldir] = {}
+        elif listing is None:
+            with os.scandir(self.study_dir / reldir) as it:
+                listing = {e.name: TreeEntry(Path(e.path), e.is_dir()) for e in it}
+            self._listings[reldir] = listing
+        return listing
+
+    def _get_listing(self, reldir: str) -> t.Optional[dict[str, TreeEntry]]:
+        """Get the listing of a directory, or `None` if the directory doesn't exist (lock held)."""
+        listing = self._listings.get(reldir)
+        if listing is not None:
+            return listing
+        if reldir:
+            entry = self._get_entry(reldir)
+            if entry is None or not entry.is_dir:
+                return None
+        return self._scandir(reldir)
+
+    def _get_entry(self, relpath: str) -> t.Optional[TreeEntry]:
+        """Get an entry of the index (lock held)."""
+        parent, name = self._split(relpath)
+        listing = self._get_listing(parent)
+        return None if listing is None else listing.get(name)
+
+    def scan(self, *relpaths: str | PurePath) -> None:
+        """
+        Index the given subtrees, with one `os.scandir` call per directory.
+
+        The missing paths are ignored, and the directories already indexed are not listed again.
+
+        Args:
+            relpaths: The files and folders to index, relative to the study directory.
+        """
+        with self._lock:
+            stack = [self._normalize(p) for p in relpaths]
+            while stack:
+                reldir = stack.pop()
+                if self._get_listing(reldir) is None:
+                    continue
+                listing = self._scandir(reldir)
+                prefix = f"{reldir}/" if reldir else ""
+                stack.extend(f"{prefix}{name}" for name, entry in listing.items() if entry.is_dir)
+
+    def get(self, relpath: str | PurePath) -> t.Optional[TreeEntry]:
+        """
+        Get the entry of a file or directory.
+
+        Args:
+            relpath: Path of the file or directory, relative to the study directory.
+
+        Returns:
+            The entry, or `None` if the file or directory doesn't exist.
+        """
+        key = self._normalize(relpath)
+        if not key:
+            return TreeEntry(self.study_dir, is_dir=True)
+        with self._lock:
+            return self._get_entry(key)
+
+    def exists(self, relpath: str | PurePath) -> bool:
+        """Check if a file or directory exists."""
+        return self.get(relpath) is not None
+
+    def is_dir(self, relpath: str | PurePath) -> bool:
+        """Check if a path is an existing directory."""
+        entry = self.get(relpath)
+        return entry is not None and entry.is_dir
+
+    def is_file(self, relpath: str | PurePath) -> bool:
+        """Check if a path is an existing file."""
+        entry = self.get(relpath)
+        return entry is not None and not entry.is_dir
+
+    def listdir(self, relpath: str | PurePath) -> list[TreeEntry]:
+        """
+        List the content of a directory.
+
+        Args:
+            relpath: Path of the directory, relative to the study directory.
+
+        Returns:
+            The entries of the directory, sorted by name (empty if the directory doesn't exist).
+        """
+        with self._lock:
+            listing = self._get_listing(self._normalize(relpath))
+            return [] if listing is None else [listing[name] for name in sorted(listing)]
+
+    def iter_files(self, relpath: str | PurePath = "") -> t.Iterator[str]:
+        """
+        Iterate over the files of a directory and its subdirectories.
+
+        Args:
+            relpath: Path of the directory, relative to the study directory.
+
+        Yields:
+            The relative paths of the files, sorted by name in each directory.
+        """
+        reldir = self._normalize(relpath)
+        prefix = f"{reldir}/" if reldir else ""
+        for entry in self.listdir(reldir):
+            if entry.is_dir:
+                yield from self.iter_files(f"{prefix}{entry.name}")
+            else:
+                yield f"{prefix}{entry.name}"
+
+    def glob(self, pattern: str) -> list[str]:
+        """
+        Find the files and directories matching a pattern (like `Path.glob`, without the `**` wildcard).
+
+        Args:
+            pattern: The pattern, relative to the study directory (for instance "input/links/*").
+
+        Returns:
+            The sorted relative paths of the matching files and directories.
+        """
+        parts = PurePosixPath(pattern).parts
+        if "**" in parts:
+            raise ValueError(f"Recursive patterns are not supported: '{pattern}'")
+        matches = [""]
+        for index, part in enumerate(parts):
+            is_last = index == len(parts) - 1
+            next_matches = []
+            for reldir in matches:
+                prefix = f"{reldir}/" if reldir else ""
+                for entry in self.listdir(reldir):
+                    if (is_last or entry.is_dir) and fnmatch.fnmatch(entry.name, part):
+                        next_matches.append(f"{prefix}{entry.name}")
+            matches = next_matches
+        return matches
+
+    def record(self, relpath: str | PurePath, is_dir: bool = False) -> None:
+        """
+        Record a file or directory created (or replaced) outside the index.
+
+        The parent directory must already be known: use `mkdir` to create directories.
+
+        Args:
+            relpath: Path of the file or directory, relative to the study directory.
+            is_dir: Whether the path is a directory.
+        """
+        key = self._normalize(relpath)
+        parent, name = self._split(key)
+        with self._lock:
+            listing = self._listings.get(parent)
+            if listing is not None:
+                listing[name] = TreeEntry(self.study_dir / key, is_dir)
+            if is_dir:
+                # The content of a replaced directory is listed again on the next access
+                self._drop_listings(key)
+
+    def forget(self, relpath: str | PurePath) -> None:
+        """
+        Record a file or directory removed outside the index.
+
+        Args:
+            relpath: Path of the file or directory, relative to the study directory.
+        """
+        key = self._normalize(relpath)
+        parent, name = self._split(key)
+        with self._lock:
+            listing = self._listings.get(parent)
+            entry = None if listing is None else listing.pop(name, None)
+            if entry is None or entry.is_dir:
+                self._drop_listings(key)
+
+    def _drop_listings(self, reldir: str) -> None:
+        """Drop the listings of a directory and its subdirectories (lock held)."""
+        for key in [d for d in self._listings if d == reldir or d.startswith(f"{reldir}/")]:
+            del self._listings[key]
+
+    def mkdir(self, relpath: str | PurePath) -> None:
+        """Create a directory (and its missing parents), and record it in the index."""
+        key = self._normalize(relpath)
+        with self._lock:
+            missing = []
+            while key and self._get_entry(key) is None:
+                missing.append(key)
+                key = self._split(key)[0]
+            if not missing:
+                return
+            if not self.virtual:
+                (self.study_dir / relpath).mkdir(parents=True, exist_ok=True)
+            # The new directories are empty, except for the next level
+            for reldir in reversed(missing):
+                parent, name = self._split(reldir)
+                self._listings[parent][name] = TreeEntry(self.study_dir / reldir, is_dir=True)
+                self._listings[reldir] = {}
+
+    def touch(self, relpath: str | PurePath) -> None:
+        """Create an empty file (or update its modification time), and record it in the index."""
+        if not self.virtual:
+            (self.study_dir / relpath).touch()
+        self.record(relpath)
+
+    def unlink(self, relpath: str | PurePath) -> None:
+        """Remove a file, and record the removal in the index."""
+        if not self.virtual:
+            (self.study_dir / relpath).unlink()
+        self.forget(relpath)
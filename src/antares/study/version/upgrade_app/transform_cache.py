@@ -0,0 +1,110 @@
+"""
+On-disk cache of the file-level transformations of the upgrade methods.
+
+Many studies are variants of a few base studies: most of their matrices are byte-identical.
+The outputs of the file-level transformations (for instance, the split of the link matrices
+in version 8.2, or of the binding constraints matrices in version 8.7) only depend on the
+content of the input file: they are stored in the cache, indexed by the name of the
+transformation and by the hash of the input file, and copied instead of being recomputed.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import typing as t
+from pathlib import Path
+
+CACHE_FORMAT = "1"
+"""Version of the cache layout, part of the cache keys (change it to invalidate the cache)."""
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class TransformCache:
+    """
+    On-disk cache of the outputs of file-level transformations.
+
+    Each entry is a directory named after the cache key, which contains the output files
+    named after their role (for instance "direct" and "indirect"). The entries are written
+    in a temporary directory and renamed, so that a partially written entry is never used.
+    The cache can be shared by several processes.
+
+    The cached files are copied (never hardlinked) in the study, so that a change made to a study
+    file can't alter the cache.
+
+    Usage::
+
+        cache = TransformCache(cache_dir)
+        key = cache.get_key("UpgradeTo0807.split_binding_constraint", src_path)
+        if not cache.restore(key, outputs):
+            transform(src_path, outputs)
+            cache.store(key, outputs)
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = Path(cache_dir)
+
+    def __repr__(self) -> str:
+        cls = self.__class__.__name__
+        return f"{cls}(cache_dir={self.cache_dir!r})"
+
+    @staticmethod
+    def get_key(name: str, src_path: Path) -> str:
+        """
+        Compute the cache key of a transformation.
+
+        Args:
+            name: The name of the transformation (must change when the transformation changes).
+            src_path: The input file of the transformation.
+
+        Returns:
+            The cache key: the hash of the transformation name and of the input file content.
+        """
+        digest = hashlib.sha256(f"{CACHE_FORMAT}:{name}:".encode("utf-8"))
+        with open(src_path, mode="rb") as fp:
+            for chunk in iter(lambda: fp.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _get_entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def restore(self, key: str, outputs: t.Mapping[str, Path]) -> bool:
+        """
+        Copy the cached outputs of a transformation.
+
+        Args:
+            key: The cache key.
+            outputs: The destination paths of the outputs, indexed by role.
+
+        Returns:
+            Whether the outputs were found in the cache.
+        """
+        entry_dir = self._get_entry_dir(key)
+        if not all(entry_dir.joinpath(role).is_file() for role in outputs):
+            return False
+        for role, dst_path in outputs.items():
+            shutil.copyfile(entry_dir / role, dst_path)
+        return True
+
+    def store(self, key: str, outputs: t.Mapping[str, Path]) -> None:
+        """
+        Store the outputs of a transformation in the cache.
+
+        Args:
+            key: The cache key.
+            outputs: The paths of the outputs, indexed by role.
+        """
+        entry_dir = self._get_entry_dir(key)
+        if entry_dir.exists():
+            return
+        entry_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f"~{key}.", suffix=".tmp", dir=entry_dir.parent))
+        try:
+            for role, src_path in outputs.items():
+                shutil.copyfile(src_path, tmp_dir / role)
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # The entry may have been stored concurrently: the cache is only an optimization
+            shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -1,8 +1,47 @@
 import typing as t
 from pathlib import Path
 
+from antares.study.version.model.general_data import GENERAL_DATA_PATH, GeneralData
+from antares.study.version.model.study_antares import STUDY_ANTARES_PATH
 from antares.study.version.model.study_version import StudyVersion
 
+from .ini_operations import IniOperation
+from .scheduler import UpgradeStep
+from .study_session import StudySession
+
+_STEP_ATTRIBUTE = "__upgrade_step__"
+
+_StepFunc = t.TypeVar("_StepFunc", bound=t.Callable[[StudySession], None])
+
+
+def upgrade_step(files: t.Sequence[str] = (), reads: t.Sequence[str] = ()) -> t.Callable[[_StepFunc], _StepFunc]:
+    """
+    Decorator used to register a sub-step of an upgrade method, with its file dependencies.
+
+    The decorated function must be a static method of the upgrade method.
+    The sub-steps are run in their definition order by `upgrade_files`,
+    or concurrently by the `UpgradeApp` when they don't conflict.
+
+    Usage::
+
+        class UpgradeToXXXX(UpgradeMethod):
+            files = ["input/st-storage", "input/hydro/hydro.ini"]
+
+            @staticmethod
+            @upgrade_step(files=["input/hydro/hydro.ini"], reads=["input/areas"])
+            def _upgrade_hydro(session: StudySession) -> None: ...
+
+    Args:
+        files: The files and folders written by the sub-step (they must be declared in the upgrade method `files`).
+        reads: The files and folders read (but not written) by the sub-step.
+    """
+
+    def decorator(func: _StepFunc) -> _StepFunc:
+        setattr(func, _STEP_ATTRIBUTE, (tuple(files), tuple(reads)))
+        return func
+
+    return decorator
+
 
 class UpgradeMethod:
     """Raw study upgrade method (old version, new version, upgrade function)."""
@@ -10,7 +49,11 @@ class UpgradeMethod:
     old: StudyVersion = StudyVersion(0, 0)
     new: StudyVersion = StudyVersion(0, 0)
     files: t.Sequence[str] = ()
+    reads: t.Sequence[str] = ()
     should_denormalize: bool = False
+    # Glob patterns of the matrix links resolved before the upgrade (see `get_matrix_links`)
+    matrix_links: t.Sequence[str] = ()
+    general_data_ops: t.Sequence[IniOperation] = ()
 
     def __repr__(self) -> str:
         cls = self.__class__.__name__
@@ -25,6 +68,15 @@ class UpgradeMethod:
     def __str__(self) -> str:
         return f"Upgrade Study v{self.old:2d} -> v{self.new:2d}"
 
+    def __eq__(self, other: object) -> bool:
+        # Upgrade methods are stateless: two instances of the same class are equivalent (useful after unpickling)
+        if isinstance(other, UpgradeMethod):
+            return type(self) is type(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((type(self).__qualname__, self.old, self.new))
+
     def __post_init__(self):
         self.old = StudyVersion.parse(self.old)
         self.new = StudyVersion.parse(self.new)
@@ -40,4 +92,137 @@ class UpgradeMethod:
         Args:
             study_dir: The study directory.
         """
-        raise NotImplementedError
+        session = StudySession(study_dir)
+        cls.apply(session)
+        session.flush()
+
+    @classmethod
+    def apply(cls, session: StudySession) -> None:
+        """
+        Upgrades the study to the new version, using a session shared by all the steps of the upgrade chain.
+
+        The `settings/generaldata.ini` file is upgraded only if the upgrade method declares it in its `files`.
+        The session is not flushed: this is the responsibility of the caller.
+
+        Args:
+            session: The session used to read and write the study files.
+        """
+        cls.check(session)
+        cls.resolve_matrix_links(session)
+        if GENERAL_DATA_PATH in cls.files:
+            cls.upgrade_general_data(session.general_data)
+            session.mark_dirty(GENERAL_DATA_PATH)
+        for step in cls.get_steps():
+            step.func(session)
+
+    @classmethod
+    def check(cls, session: StudySession) -> None:
+        """
+        Check the preconditions of the upgrade, without changing anything.
+
+        The checks of all the upgrade methods of a chain are run before the upgrade (and before
+        the backup of the study files), so they must be cheap and only read the initial study.
+
+        Args:
+            session: The session used to read the study files.
+
+        By default, the matrix links of the files transformed by the upgrade method (see `matrix_links`)
+        must be resolvable by the matrix resolver of the session.
+
+        Raises:
+            UpgradeError: If the study can't be upgraded.
+        """
+        for relpath in cls.get_matrix_links(session):
+            session.check_matrix_link(relpath)
+
+    @classmethod
+    def get_matrix_links(cls, session: StudySession) -> list[str]:
+        """
+        Get the matrix links (`.txt.link` files) which must be resolved before the upgrade.
+
+        Only the links matching the `matrix_links` patterns are concerned: the upgrade methods
+        which transform matrices (see `should_denormalize`) declare the patterns of the matrices
+        they read, the other links of the study are left unchanged.
+
+        Args:
+            session: The session used to read the study files.
+
+        Returns:
+            The relative paths of the matrix links.
+        """
+        return [relpath for pattern in cls.matrix_links for relpath in session.tree.glob(pattern)]
+
+    @classmethod
+    def resolve_matrix_links(cls, session: StudySession) -> None:
+        """
+        Replace the matrix links of the files transformed by the upgrade method by their matrices.
+
+        Nothing is done if the links are kept: the matrices are then transformed in the matrix store.
+
+        Args:
+            session: The session used to read and write the study files.
+
+        Raises:
+            UpgradeError: If a matrix link can't be resolved.
+        """
+        if session.keep_matrix_links:
+            return
+        session.map(session.resolve_matrix_link, cls.get_matrix_links(session))
+
+    @classmethod
+    def get_steps(cls) -> tuple[UpgradeStep, ...]:
+        """
+        Get the steps used to upgrade the study files (see `upgrade_files`).
+
+        The steps declare the files they read and write, so that the independent steps
+        of an upgrade chain can be run concurrently.
+        The `settings/generaldata.ini` and `study.antares` files are not part of the steps:
+        they are upgraded in memory by the `UpgradeApp`.
+
+        Returns:
+            The sub-steps registered with `upgrade_step`, or a single step which calls `upgrade_files`,
+            or no step at all if the upgrade method doesn't declare any other file.
+        """
+        sub_steps = cls._get_sub_steps()
+        if sub_steps:
+            return sub_steps
+        files = tuple(f for f in cls.files if f not in {GENERAL_DATA_PATH, STUDY_ANTARES_PATH})
+        if not files:
+            # Nothing to upgrade, except the `settings/generaldata.ini` file (and the version number)
+            return ()
+        return (UpgradeStep(cls.__name__, cls.upgrade_files, files=files, reads=tuple(cls.reads)),)
+
+    @classmethod
+    def _get_sub_steps(cls) -> tuple[UpgradeStep, ...]:
+        """Get the sub-steps registered with `upgrade_step` in this class, in their definition order."""
+        sub_steps = []
+        for name, value in vars(cls).items():
+            func = value.__func__ if isinstance(value, staticmethod) else None
+            if func is not None and hasattr(func, _STEP_ATTRIBUTE):
+                files, reads = getattr(func, _STEP_ATTRIBUTE)
+                sub_steps.append(UpgradeStep(f"{cls.__name__}.{name}", func, files=files, reads=reads))
+        return tuple(sub_steps)
+
+    @classmethod
+    def upgrade_general_data(cls, data: GeneralData) -> None:
+        """
+        Upgrades the `settings/generaldata.ini` content (in memory) by applying the `general_data_ops`.
+
+        Args:
+            data: The content of the `settings/generaldata.ini` file.
+        """
+        for op in cls.general_data_ops:
+            op.apply(data)
+
+    @classmethod
+    def upgrade_files(cls, session: StudySession) -> None:
+        """
+        Upgrades the study files, except the `settings/generaldata.ini` file.
+
+        By default, the sub-steps registered with `upgrade_step` are run in their definition order.
+
+        Args:
+            session: The session used to read and write the study files.
+        """
+        for step in cls._get_sub_steps():
+            step.func(session)
@@ -0,0 +1,133 @@
+import dataclasses
+import typing as t
+
+from antares.study.version.model.general_data import GENERAL_DATA_PATH
+from antares.study.version.model.study_antares import STUDY_ANTARES_PATH
+from antares.study.version.model.study_version import StudyVersion
+
+from .exceptions import UpgradePreconditionError
+from .ini_operations import IniOperation, simplify_operations
+from .scheduler import UpgradeStep, build_dependencies
+from .study_session import StudySession
+from .upgrade_method import UpgradeMethod
+
+
+@dataclasses.dataclass(frozen=True)
+class UpgradePlan:
+    """
+    Compiled upgrade scenario from one study version to another.
+
+    An upgrade plan is immutable, hashable and picklable: it can be computed once
+    (for instance by a batch coordinator) and shared with several workers.
+
+    Attributes:
+        methods: The ordered upgrade methods to apply.
+        files: The merged file manifest of the upgrade methods (including the `study.antares` file).
+        reads: The files and folders read (but not written) by the upgrade steps.
+        should_denormalize: Whether the study should be denormalized before the upgrade.
+        general_data_ops: The net operations to apply to the `settings/generaldata.ini` file
+            (the operations of all the methods, simplified).
+        steps: The ordered steps used to upgrade the other study files.
+        dependencies: For each step, the indices of the previous steps that must be completed before running it.
+    """
+
+    methods: tuple[UpgradeMethod, ...]
+    files: tuple[str, ...]
+    should_denormalize: bool
+    reads: tuple[str, ...] = ()
+    general_data_ops: tuple[IniOperation, ...] = ()
+    steps: tuple[UpgradeStep, ...] = ()
+    dependencies: tuple[frozenset[int], ...] = ()
+
+    @classmethod
+    def from_methods(cls, methods: t.Sequence[UpgradeMethod]) -> "UpgradePlan":
+        """
+        Compile an upgrade plan from an ordered list of upgrade methods.
+
+        Args:
+            methods: The ordered upgrade methods (must not be empty).
+
+        Returns:
+            The upgrade plan.
+        """
+        if not methods:
+            raise ValueError("An upgrade plan requires at least one upgrade method")
+        files = {f for meth in methods for f in meth.files} | {STUDY_ANTARES_PATH}
+        steps = tuple(step for meth in methods for step in meth.get_steps())
+        return cls(
+            methods=tuple(methods),
+            files=tuple(sorted(files)),
+            should_denormalize=any(meth.should_denormalize for meth in methods),
+            reads=tuple(sorted({r for step in steps for r in step.reads})),
+            general_data_ops=simplify_operations(op for meth in methods for op in meth.general_data_ops),
+            steps=steps,
+            dependencies=build_dependencies(steps),
+        )
+
+    @property
+    def old(self) -> StudyVersion:
+        """The study version before the upgrade."""
+        return self.methods[0].old
+
+    @property
+    def new(self) -> StudyVersion:
+        """The study version after the upgrade."""
+        return self.methods[-1].new
+
+    def check(self, session: StudySession) -> None:
+        """
+        Run the read-only precondition checks of all the upgrade methods (see `UpgradeMethod.check`).
+
+        Args:
+            session: The session used to read the study files.
+
+        Raises:
+            UpgradeError: If the study can't be upgraded.
+        """
+        for method in self.methods:
+            method.check(session)
+
+    def resolve_matrix_links(self, session: StudySession) -> None:
+        """
+        Replace the matrix links of the files transformed by the upgrade methods by their matrices.
+
+        The links are resolved before running the steps, after the backup of the study files.
+
+        Args:
+            session: The session used to read and write the study files.
+
+        Raises:
+            UpgradeError: If a matrix link can't be resolved.
+        """
+        for method in self.methods:
+            method.resolve_matrix_links(session)
+
+    def upgrade_general_data(self, session: StudySession) -> None:
+        """
+        Upgrade the `settings/generaldata.ini` document in memory (it is written when the session is flushed).
+
+        Args:
+            session: The session used to read and write the study files.
+
+        Raises:
+            UpgradePreconditionError: If a section or an option of the document is missing or invalid.
+        """
+        if not self.general_data_ops:
+            return
+        general_data = session.general_data
+        try:
+            for op in self.general_data_ops:
+                op.apply(general_data)
+        except KeyError as e:
+            raise UpgradePreconditionError(GENERAL_DATA_PATH, f"missing section or option {e}") from e
+        except ValueError as e:
+            raise UpgradePreconditionError(GENERAL_DATA_PATH, str(e)) from e
+        session.mark_dirty(GENERAL_DATA_PATH)
+
+    @property
+    def is_version_bump_only(self) -> bool:
+        """Whether the only effect of the upgrade is the new version number in the `study.antares` file."""
+        return not self.steps and not self.general_data_ops
+
+    def __str__(self) -> str:
+        return f"Upgrade Study v{self.old:2d} -> v{self.new:2d} ({len(self.methods)} steps)"
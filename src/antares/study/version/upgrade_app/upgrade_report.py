@@ -0,0 +1,139 @@
+"""
+Dry-run report of a study upgrade.
+
+The report lists the steps of the upgrade and the files they read, write or create,
+the size of the backup made before the upgrade, and an estimate of the upgrade duration.
+It is used to check that an upgrade can be done (enough free space for the backup)
+and to schedule the upgrades of large studies, without changing anything.
+"""
+
+import dataclasses
+import typing as t
+from pathlib import Path
+
+from .study_tree import StudyTree
+
+DEFAULT_THROUGHPUT = 100 * 1024 * 1024
+"""Default disk throughput (in bytes per second) used to estimate the duration of an upgrade."""
+
+
+def _format_size(size: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def iter_tree_files(tree: StudyTree, relpaths: t.Iterable[str]) -> t.Iterator[str]:
+    """
+    Iterate over the existing files of a list of files and folders (missing paths are ignored).
+
+    Args:
+        tree: The index of the study file tree.
+        relpaths: The files and folders, relative to the study directory.
+
+    Yields:
+        The relative paths of the existing files.
+    """
+    for relpath in relpaths:
+        entry = tree.get(relpath)
+        if entry is None:
+            continue
+        elif entry.is_dir:
+            yield from tree.iter_files(relpath)
+        else:
+            yield relpath
+
+
+def get_files_size(tree: StudyTree, relpaths: t.Iterable[str]) -> int:
+    """Get the total size (in bytes) of the given files (see `iter_tree_files`)."""
+    return sum(entry.size for entry in map(tree.get, relpaths) if entry is not None)
+
+
+@dataclasses.dataclass(frozen=True)
+class StepReport:
+    """
+    Files concerned by a step of the upgrade.
+
+    Attributes:
+        name: The name of the step.
+        reads: The existing files read (but not written) by the step.
+        writes: The existing files which may be rewritten, replaced or removed by the step.
+        creates: The declared files and folders which don't exist yet (they may be created by the step).
+        read_size: The total size of the files read, in bytes.
+        write_size: The total size of the files written, in bytes.
+    """
+
+    name: str
+    reads: tuple[str, ...] = ()
+    writes: tuple[str, ...] = ()
+    creates: tuple[str, ...] = ()
+    read_size: int = 0
+    write_size: int = 0
+
+    @classmethod
+    def from_tree(cls, name: str, tree: StudyTree, files: t.Iterable[str], reads: t.Iterable[str]) -> "StepReport":
+        """
+        Create the report of a step from the files and folders it declares.
+
+        Args:
+            name: The name of the step.
+            tree: The index of the study file tree.
+            files: The files and folders written by the step.
+            reads: The files and folders read (but not written) by the step.
+
+        Returns:
+            The report of the step.
+        """
+        files = list(files)
+        read_files = tuple(iter_tree_files(tree, reads))
+        write_files = tuple(iter_tree_files(tree, files))
+        return cls(
+            name=name,
+            reads=read_files,
+            writes=write_files,
+            creates=tuple(relpath for relpath in files if not tree.exists(relpath)),
+            read_size=get_files_size(tree, read_files),
+            write_size=get_files_size(tree, write_files),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class UpgradeReport:
+    """
+    Dry-run report of a study upgrade.
+
+    Attributes:
+        study_dir: The study directory.
+        title: A short description of the upgrade (source and target versions).
+        steps: The reports of the upgrade steps, in their execution order.
+        backup_files: The files and folders copied in the backup directory before the upgrade.
+        backup_size: The total size of the backup, in bytes.
+        free_space: The free space (in bytes) of the file system where the backup is made.
+        estimated_duration: The estimated duration of the upgrade, in seconds.
+    """
+
+    study_dir: Path
+    title: str
+    steps: tuple[StepReport, ...] = ()
+    backup_files: tuple[str, ...] = ()
+    backup_size: int = 0
+    free_space: int = 0
+    estimated_duration: float = 0.0
+
+    @property
+    def has_enough_space(self) -> bool:
+        """Whether there is enough free space to make the backup."""
+        return self.backup_size <= self.free_space
+
+    def __str__(self) -> str:
+        lines = [f"{self.title}: {self.study_dir}"]
+        for index, step in enumerate(self.steps, 1):
+            lines.append(f"  {index}. {step.name}")
+            for label, relpaths in [("read", step.reads), ("write", step.writes), ("create", step.creates)]:
+                lines.extend(f"       {label:<6} {relpath}" for relpath in relpaths)
+        lines.append(f"Backup: {len(self.backup_files)} item(s), {_format_size(self.backup_size)}")
+        lines.append(f"Free space: {_format_size(self.free_space)}")
+        lines.append(f"Estimated duration: {self.estimated_duration:.1f} s")
+        return "\n".join(lines)
@@ -1,8 +1,7 @@
-from pathlib import Path
-
-from antares.study.version.model.general_data import GENERAL_DATA_PATH, GeneralData
+from antares.study.version.model.general_data import GENERAL_DATA_PATH
 from antares.study.version.model.study_version import StudyVersion
 
+from .ini_operations import RenameOption, SetOption
 from .upgrade_method import UpgradeMethod
 
 
@@ -14,18 +13,9 @@ class UpgradeTo0701(UpgradeMethod):
     old = StudyVersion(6, 0)
     new = StudyVersion(7, 1)
     files = [GENERAL_DATA_PATH]
-
-    @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
-        """
-        Upgrades the study to version 7.1.
-
-        Args:
-            study_dir: The study directory.
-        """
-        data = GeneralData.from_ini_file(study_dir)
-        data["general"]["geographic-trimming"] = data["general"].pop("filtering")
-        data["general"]["thematic-trimming"] = False
-        data["optimization"]["link-type"] = "local"
-        data["other preferences"]["hydro-pricing-mode"] = "fast"
-        data.to_ini_file(study_dir)
+    general_data_ops = (
+        RenameOption("general", "filtering", "geographic-trimming"),
+        SetOption("general", "thematic-trimming", False),
+        SetOption("optimization", "link-type", "local"),
+        SetOption("other preferences", "hydro-pricing-mode", "fast"),
+    )
@@ -1,11 +1,10 @@
-from pathlib import Path
-
-from antares.study.version.model.general_data import GENERAL_DATA_PATH, GeneralData
+from antares.study.version.model.general_data import GENERAL_DATA_PATH
 from antares.study.version.model.study_version import StudyVersion
 
+from .cluster_table import ClusterTable
+from .ini_operations import SetOption
+from .study_session import StudySession
 from .upgrade_method import UpgradeMethod
-from antares.study.version.ini_writer import IniWriter
-from antares.study.version.ini_reader import IniReader
 
 
 class UpgradeTo0801(UpgradeMethod):
@@ -15,28 +14,25 @@ class UpgradeTo0801(UpgradeMethod):
 
     old = StudyVersion(8, 0)
     new = StudyVersion(8, 1)
-    files = [GENERAL_DATA_PATH, "input"]
+    files = [GENERAL_DATA_PATH, "input/renewables", "input/thermal/clusters"]
+    general_data_ops = (SetOption("other preferences", "renewable-generation-modelling", "aggregated"),)
 
     @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
+    def upgrade_files(cls, session: StudySession) -> None:
         """
-        Upgrades the study to version 8.1.
+        Upgrades the study files to version 8.1.
 
         Args:
-            study_dir: The study directory.
+            session: The session used to read and write the study files.
         """
-        data = GeneralData.from_ini_file(study_dir)
-        data["other preferences"]["renewable-generation-modelling"] = "aggregated"
-        data.to_ini_file(study_dir)
-        study_dir.joinpath("input", "renewables", "clusters").mkdir(parents=True, exist_ok=True)
-        study_dir.joinpath("input", "renewables", "series").mkdir(parents=True, exist_ok=True)
+        session.tree.mkdir("input/renewables/clusters")
+        session.tree.mkdir("input/renewables/series")
 
         # Migrate thermal group from Other to Other 1
-        thermal_cluster_dir = study_dir / "input" / "thermal" / "clusters"
-        for area in thermal_cluster_dir.iterdir():
-            ini_path = thermal_cluster_dir / area / "list.ini"
-            sections = IniReader().read(ini_path)
-            for section in sections.values():
-                if section["group"].lower() == "Other".lower():
-                    section["group"] = "other 1"
-            IniWriter().write(sections, ini_path)
+        table = ClusterTable.load(session, "thermal")
+        if "group" in table.frame:
+            groups = table.frame["group"]
+            # The groups may be missing (NaN) or not strings: `groups.str` can't be used
+            is_other = groups.map(lambda group: isinstance(group, str) and group.lower() == "other").astype(bool)
+            table.frame.loc[is_other, "group"] = "other 1"
+        table.save(session)
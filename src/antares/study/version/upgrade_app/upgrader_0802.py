@@ -1,5 +1,6 @@
+import functools
 import typing as t
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 import numpy as np
 import numpy.typing as npt
@@ -7,10 +8,42 @@ import pandas
 
 from antares.study.version.model.study_version import StudyVersion
 
-from .exceptions import UnexpectedMatrixLinksError
+from .study_session import StudySession
 from .upgrade_method import UpgradeMethod
 
 
+def _split_link(src_path: Path, outputs: t.Mapping[str, Path]) -> None:
+    """Split the matrix of a link into parameters and capacities matrices."""
+    df = pandas.read_csv(src_path, sep="\t", header=None)
+    for role, values in [
+        ("parameters", df.iloc[:, 2:8].values),
+        ("direct", df.iloc[:, 0].values),
+        ("indirect", df.iloc[:, 1].values),
+    ]:
+        np.savetxt(outputs[role], t.cast(npt.NDArray[np.float64], values), delimiter="\t", fmt="%.6f")
+
+
+def _upgrade_link(session: StudySession, link_dir: str) -> None:
+    """
+    Split the matrices of a link folder into parameters and capacities matrices.
+
+    Args:
+        session: The session used to read and write the study files.
+        link_dir: The folder of the links of an area, relative to the study directory.
+    """
+    tree = session.tree
+    for txt in session.glob_matrices(f"{link_dir}/*.txt"):
+        name = PurePosixPath(txt).stem
+        tree.mkdir(f"{link_dir}/capacities")
+        outputs = {
+            "parameters": f"{link_dir}/{name}_parameters.txt",
+            "direct": f"{link_dir}/capacities/{name}_direct.txt",
+            "indirect": f"{link_dir}/capacities/{name}_indirect.txt",
+        }
+        session.transform_file("UpgradeTo0802.split_link", txt, outputs, _split_link)
+        session.remove_matrix(txt)
+
+
 class UpgradeTo0802(UpgradeMethod):
     """
     This class upgrades the study from version 8.1 to version 8.2.
@@ -20,46 +53,15 @@ class UpgradeTo0802(UpgradeMethod):
     new = StudyVersion(8, 2)
     files = ["input/links"]
     should_denormalize = True
+    matrix_links = ["input/links/*/*.txt.link"]
 
     @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
+    def upgrade_files(cls, session: StudySession) -> None:
         """
-        Upgrades the study to version 8.2.
+        Upgrades the study files to version 8.2.
 
         Args:
-            study_dir: The study directory.
+            session: The session used to read and write the study files.
         """
-        links = (p for p in study_dir.glob("input/links/*") if p.is_dir())
-        for folder_path in links:
-            # Check if there are unresolved matrix links in the directory
-            unresolved_link = next(iter(folder_path.glob("*.txt.link")), False)
-            if isinstance(unresolved_link, Path):
-                raise UnexpectedMatrixLinksError(unresolved_link.relative_to(study_dir).as_posix())
-
-            all_txt = folder_path.glob("*.txt")
-            for txt in all_txt:
-                df = pandas.read_csv(txt, sep="\t", header=None)
-                df_parameters = df.iloc[:, 2:8]
-                df_direct = df.iloc[:, 0]
-                df_indirect = df.iloc[:, 1]
-                name = Path(txt).stem
-                np.savetxt(
-                    folder_path / f"{name}_parameters.txt",
-                    t.cast(npt.NDArray[np.float64], df_parameters.values),
-                    delimiter="\t",
-                    fmt="%.6f",
-                )
-                (folder_path / "capacities").mkdir(exist_ok=True)
-                np.savetxt(
-                    folder_path / "capacities" / f"{name}_direct.txt",
-                    t.cast(npt.NDArray[np.float64], df_direct.values),
-                    delimiter="\t",
-                    fmt="%.6f",
-                )
-                np.savetxt(
-                    folder_path / "capacities" / f"{name}_indirect.txt",
-                    t.cast(npt.NDArray[np.float64], df_indirect.values),
-                    delimiter="\t",
-                    fmt="%.6f",
-                )
-                (folder_path / f"{name}.txt").unlink()
+        links = (f"input/links/{area_id}" for area_id in session.entities.get_link_areas())
+        session.map(functools.partial(_upgrade_link, session), links, cpu_bound=True, label="UpgradeTo0802.links")
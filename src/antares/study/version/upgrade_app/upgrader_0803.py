@@ -1,9 +1,8 @@
-from pathlib import Path
-
-from antares.study.version.ini_writer import IniWriter
-from antares.study.version.model.general_data import GENERAL_DATA_PATH, GeneralData
+from antares.study.version.model.general_data import GENERAL_DATA_PATH
 from antares.study.version.model.study_version import StudyVersion
 
+from .ini_operations import ReplaceSection, SetOption
+from .study_session import StudySession
 from .upgrade_method import UpgradeMethod
 
 
@@ -15,27 +14,28 @@ class UpgradeTo0803(UpgradeMethod):
     old = StudyVersion(8, 2)
     new = StudyVersion(8, 3)
     files = [GENERAL_DATA_PATH, "input/areas"]
+    general_data_ops = (
+        ReplaceSection(
+            "adequacy patch",
+            (
+                ("include-adq-patch", False),
+                ("set-to-null-ntc-between-physical-out-for-first-step", True),
+                ("set-to-null-ntc-from-physical-out-to-physical-in-for-first-step", True),
+            ),
+        ),
+        SetOption("optimization", "include-split-exported-mps", False),
+    )
 
     @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
+    def upgrade_files(cls, session: StudySession) -> None:
         """
-        Upgrades the study to version 8.3.
+        Upgrades the study files to version 8.3.
 
         Args:
-            study_dir: The study directory.
+            session: The session used to read and write the study files.
         """
-        data = GeneralData.from_ini_file(study_dir)
-        data["adequacy patch"] = {
-            "include-adq-patch": False,
-            "set-to-null-ntc-between-physical-out-for-first-step": True,
-            "set-to-null-ntc-from-physical-out-to-physical-in-for-first-step": True,
-        }
-        data["optimization"]["include-split-exported-mps"] = False
-        data.to_ini_file(study_dir)
-        areas = (p for p in study_dir.glob("input/areas/*") if p.is_dir())
-        for folder_path in areas:
-            writer = IniWriter()
-            writer.write(
+        for area_id in session.entities.get_area_dirs():
+            session.write_ini(
+                f"input/areas/{area_id}/adequacy_patch.ini",
                 {"adequacy-patch": {"adequacy-patch-mode": "outside"}},
-                folder_path / "adequacy_patch.ini",
             )
@@ -1,8 +1,7 @@
-from pathlib import Path
-
 from antares.study.version.model.general_data import GENERAL_DATA_PATH, GeneralData
 from antares.study.version.model.study_version import StudyVersion
 
+from .ini_operations import PopOption, Transform
 from .upgrade_method import UpgradeMethod
 
 _TRANSMISSION_CAPACITIES = {
@@ -12,6 +11,14 @@ _TRANSMISSION_CAPACITIES = {
 }
 
 
+def _upgrade_transmission_capacities(data: GeneralData) -> None:
+    actual_capacities = data["optimization"]["transmission-capacities"]
+    try:
+        data["optimization"]["transmission-capacities"] = _TRANSMISSION_CAPACITIES[actual_capacities]
+    except (KeyError, TypeError):
+        raise ValueError(f"unexpected 'transmission-capacities' value: {actual_capacities!r}") from None
+
+
 class UpgradeTo0804(UpgradeMethod):
     """
     This class upgrades the study from version 8.3 to version 8.4.
@@ -20,17 +27,7 @@ class UpgradeTo0804(UpgradeMethod):
     old = StudyVersion(8, 3)
     new = StudyVersion(8, 4)
     files = [GENERAL_DATA_PATH]
-
-    @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
-        """
-        Upgrades the study to version 8.4.
-
-        Args:
-            study_dir: The study directory.
-        """
-        data = GeneralData.from_ini_file(study_dir)
-        actual_capacities = data["optimization"]["transmission-capacities"]
-        data["optimization"]["transmission-capacities"] = _TRANSMISSION_CAPACITIES[actual_capacities]
-        data["optimization"].pop("include-split-exported-mps", None)
-        data.to_ini_file(study_dir)
+    general_data_ops = (
+        Transform(_upgrade_transmission_capacities, options=(("optimization", "transmission-capacities"),)),
+        PopOption("optimization", "include-split-exported-mps"),
+    )
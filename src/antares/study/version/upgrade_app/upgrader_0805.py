@@ -1,8 +1,7 @@
-from pathlib import Path
-
-from antares.study.version.model.general_data import GENERAL_DATA_PATH, GeneralData
+from antares.study.version.model.general_data import GENERAL_DATA_PATH
 from antares.study.version.model.study_version import StudyVersion
 
+from .ini_operations import SetOption
 from .upgrade_method import UpgradeMethod
 
 
@@ -14,21 +13,11 @@ class UpgradeTo0805(UpgradeMethod):
     old = StudyVersion(8, 4)
     new = StudyVersion(8, 5)
     files = [GENERAL_DATA_PATH]
-
-    @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
-        """
-        Upgrades the study to version 8.5.
-
-        Args:
-            study_dir: The study directory.
-        """
-        data = GeneralData.from_ini_file(study_dir)
-        adequacy_patch = data["adequacy patch"]
-        adequacy_patch["price-taking-order"] = "DENS"
-        adequacy_patch["include-hurdle-cost-csr"] = False
-        adequacy_patch["check-csr-cost-function"] = False
-        adequacy_patch["threshold-initiate-curtailment-sharing-rule"] = 1.0
-        adequacy_patch["threshold-display-local-matching-rule-violations"] = 0.0
-        adequacy_patch["threshold-csr-variable-bounds-relaxation"] = 7
-        data.to_ini_file(study_dir)
+    general_data_ops = (
+        SetOption("adequacy patch", "price-taking-order", "DENS"),
+        SetOption("adequacy patch", "include-hurdle-cost-csr", False),
+        SetOption("adequacy patch", "check-csr-cost-function", False),
+        SetOption("adequacy patch", "threshold-initiate-curtailment-sharing-rule", 1.0),
+        SetOption("adequacy patch", "threshold-display-local-matching-rule-violations", 0.0),
+        SetOption("adequacy patch", "threshold-csr-variable-bounds-relaxation", 7),
+    )
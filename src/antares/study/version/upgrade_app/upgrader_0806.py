@@ -1,9 +1,8 @@
-from pathlib import Path
-
-from antares.study.version.model.general_data import GENERAL_DATA_PATH, GeneralData
+from antares.study.version.model.general_data import GENERAL_DATA_PATH
 from antares.study.version.model.study_version import StudyVersion
 
-from .helpers import transform_name_to_id
+from .ini_operations import SetOption
+from .study_session import StudySession
 from .upgrade_method import UpgradeMethod
 
 
@@ -14,31 +13,28 @@ class UpgradeTo0806(UpgradeMethod):
 
     old = StudyVersion(8, 5)
     new = StudyVersion(8, 6)
-    files = [GENERAL_DATA_PATH, "input"]
+    files = [GENERAL_DATA_PATH, "input/st-storage", "input/hydro/series"]
+    reads = ["input/areas/list.txt"]
+    general_data_ops = (SetOption("adequacy patch", "enable-first-step", False),)
 
     # noinspection SpellCheckingInspection
     @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
+    def upgrade_files(cls, session: StudySession) -> None:
         """
-        Upgrades the study to version 8.6.
+        Upgrades the study files to version 8.6.
 
         Args:
-            study_dir: The study directory.
+            session: The session used to read and write the study files.
         """
-        data = GeneralData.from_ini_file(study_dir)
-        data["adequacy patch"]["enable-first-step"] = False
-        data.to_ini_file(study_dir)
-
-        study_dir.joinpath("input", "st-storage", "clusters").mkdir(parents=True, exist_ok=True)
-        study_dir.joinpath("input", "st-storage", "series").mkdir(parents=True, exist_ok=True)
-        areas_path = study_dir.joinpath("input", "areas", "list.txt")
-        area_names = areas_path.read_text(encoding="utf-8").splitlines(keepends=False)
-        area_ids = (transform_name_to_id(area_name) for area_name in area_names)
-        for area_id in area_ids:
-            st_storage_path = study_dir.joinpath("input", "st-storage", "clusters", area_id)
-            st_storage_path.mkdir(parents=True, exist_ok=True)
-            (st_storage_path / "list.ini").touch()
-
-            hydro_series_path = study_dir.joinpath("input", "hydro", "series", area_id)
-            hydro_series_path.mkdir(parents=True, exist_ok=True)
-            (hydro_series_path / "mingen.txt").touch()
+        tree = session.tree
+        tree.mkdir("input/st-storage/clusters")
+        tree.mkdir("input/st-storage/series")
+
+        def create_area_files(area_id: str) -> None:
+            tree.mkdir(f"input/st-storage/clusters/{area_id}")
+            tree.touch(f"input/st-storage/clusters/{area_id}/list.ini")
+
+            tree.mkdir(f"input/hydro/series/{area_id}")
+            tree.touch(f"input/hydro/series/{area_id}/mingen.txt")
+
+        session.map(create_area_files, session.entities.areas)
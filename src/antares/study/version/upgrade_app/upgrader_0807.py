@@ -1,18 +1,29 @@
 import typing as t
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 import numpy as np
 import numpy.typing as npt
 import pandas as pd
 
-from antares.study.version.ini_reader import IniReader
-from antares.study.version.ini_writer import IniWriter
 from antares.study.version.model.study_version import StudyVersion
 
-from .exceptions import UnexpectedMatrixLinksError
+from .cluster_table import ClusterTable
+from .study_session import StudySession
 from .upgrade_method import UpgradeMethod
 
 
+def _split_terms(src_path: Path, outputs: t.Mapping[str, Path]) -> None:
+    """Split the matrix of a binding constraint into the matrices of its "lt", "gt" and "eq" terms."""
+    if src_path.stat().st_size == 0:
+        lt, gt, eq = pd.Series(), pd.Series(), pd.Series()  # type: ignore
+    else:
+        df = pd.read_csv(src_path, sep="\t", header=None)
+        lt, gt, eq = df.iloc[:, 0], df.iloc[:, 1], df.iloc[:, 2]
+    for term, suffix in zip([lt, gt, eq], ["lt", "gt", "eq"]):
+        # noinspection PyTypeChecker
+        np.savetxt(outputs[suffix], t.cast(npt.NDArray[np.float64], term.values), delimiter="\t", fmt="%.6f")
+
+
 class UpgradeTo0807(UpgradeMethod):
     """
     This class upgrades the study from version 8.6 to version 8.7.
@@ -22,62 +33,45 @@ class UpgradeTo0807(UpgradeMethod):
     new = StudyVersion(8, 7)
     files = ["input/bindingconstraints", "input/thermal"]
     should_denormalize = True
+    matrix_links = ["input/bindingconstraints/*.txt.link"]
 
     @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
+    def upgrade_files(cls, session: StudySession) -> None:
         """
-        Upgrades the study to version 8.7.
+        Upgrades the study files to version 8.7.
 
         Args:
-            study_dir: The study directory.
+            session: The session used to read and write the study files.
         """
-        binding_constraints_dit = study_dir / "input" / "bindingconstraints"
-
-        # Check if there are unresolved matrix links in the directory
-        unresolved_link = next(iter(binding_constraints_dit.glob("*.txt.link")), False)
-        if isinstance(unresolved_link, Path):
-            raise UnexpectedMatrixLinksError(unresolved_link.relative_to(study_dir).as_posix())
+        tree = session.tree
 
         # Split existing binding constraints in 3 different files
-        binding_constraints_files = binding_constraints_dit.glob("*.txt")
-        for file in binding_constraints_files:
-            name = file.stem
-            if file.stat().st_size == 0:
-                lt, gt, eq = pd.Series(), pd.Series(), pd.Series()  # type: ignore
-            else:
-                df = pd.read_csv(file, sep="\t", header=None)
-                lt, gt, eq = df.iloc[:, 0], df.iloc[:, 1], df.iloc[:, 2]
-            for term, suffix in zip([lt, gt, eq], ["lt", "gt", "eq"]):
-                # noinspection PyTypeChecker
-                np.savetxt(
-                    binding_constraints_dit / f"{name}_{suffix}.txt",
-                    t.cast(npt.NDArray[np.float64], term.values),
-                    delimiter="\t",
-                    fmt="%.6f",
-                )
-            file.unlink()
+        def split_binding_constraint(relpath: str) -> None:
+            name = PurePosixPath(relpath).stem
+            outputs = {suffix: f"input/bindingconstraints/{name}_{suffix}.txt" for suffix in ["lt", "gt", "eq"]}
+            session.transform_file("UpgradeTo0807.split_binding_constraint", relpath, outputs, _split_terms)
+            session.remove_matrix(relpath)
 
-        ini_reader = IniReader()
-        ini_writer = IniWriter()
+        matrices = session.glob_matrices("input/bindingconstraints/*.txt")
+        session.map(split_binding_constraint, matrices, cpu_bound=True, label="UpgradeTo0807.binding_constraints")
 
         # Add property group for every section in .ini file
-        ini_file_path = binding_constraints_dit / "bindingconstraints.ini"
-        data = ini_reader.read(ini_file_path)
+        ini_file_path = "input/bindingconstraints/bindingconstraints.ini"
+        data = session.read_ini(ini_file_path)
         for section in data:
             data[section]["group"] = "default"
-        ini_writer.write(data, ini_file_path)
+        session.write_ini(ini_file_path, data)
 
         # Add properties for thermal clusters in .ini file
-        ini_files = study_dir.glob("input/thermal/clusters/*/list.ini")
-        thermal_path = study_dir / Path("input/thermal/series")
-        for ini_file_path in ini_files:
-            data = ini_reader.read(ini_file_path)
-            area_id = ini_file_path.parent.name
-            for cluster in data:
-                new_thermal_path = thermal_path / area_id / cluster.lower()
-                (new_thermal_path / "CO2Cost.txt").touch()
-                (new_thermal_path / "fuelCost.txt").touch()
-                data[cluster]["costgeneration"] = "SetManually"
-                data[cluster]["efficiency"] = 100
-                data[cluster]["variableomcost"] = 0
-            ini_writer.write(data, ini_file_path)
+        table = ClusterTable.load(session, "thermal")
+        table.assign("costgeneration", "SetManually")
+        table.assign("efficiency", 100)
+        table.assign("variableomcost", 0)
+        table.save(session)
+
+        new_matrices = [
+            f"input/thermal/series/{area_id}/{cluster.lower()}/{matrix}"
+            for area_id, cluster in table.frame.index
+            for matrix in ["CO2Cost.txt", "fuelCost.txt"]
+        ]
+        session.map(tree.touch, new_matrices)
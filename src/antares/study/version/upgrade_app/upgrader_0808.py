@@ -1,9 +1,7 @@
-from pathlib import Path
-
-from antares.study.version.ini_reader import IniReader
-from antares.study.version.ini_writer import IniWriter
 from antares.study.version.model.study_version import StudyVersion
 
+from .cluster_table import ClusterTable
+from .study_session import StudySession
 from .upgrade_method import UpgradeMethod
 
 
@@ -17,24 +15,18 @@ class UpgradeTo0808(UpgradeMethod):
     files = ["input/st-storage/clusters"]
 
     @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
+    def upgrade_files(cls, session: StudySession) -> None:
         """
-        Upgrades the study to version 8.8.
+        Upgrades the study files to version 8.8.
 
         Args:
-            study_dir: The study directory.
+            session: The session used to read and write the study files.
         """
-        st_storage_dir = study_dir / "input" / "st-storage" / "clusters"
-        if not st_storage_dir.exists():
+        if not session.tree.exists("input/st-storage/clusters"):
             # The folder only exists for studies in v8.6+ that have some short term storage clusters.
             # For every other case, this upgrader has nothing to do.
             return
 
-        reader = IniReader()
-        writer = IniWriter()
-        cluster_files = st_storage_dir.glob("*/list.ini")
-        for file_path in cluster_files:
-            sections = reader.read(file_path)
-            for section in sections.values():
-                section["enabled"] = True
-            writer.write(sections, file_path)
+        table = ClusterTable.load(session, "st-storage")
+        table.assign("enabled", True)
+        table.save(session)
@@ -1,11 +1,11 @@
 from itertools import product
-from pathlib import Path
 
-from antares.study.version.ini_reader import IniReader
-from antares.study.version.ini_writer import IniWriter
 from antares.study.version.model.study_version import StudyVersion
 
-from .upgrade_method import UpgradeMethod
+from .cluster_table import ClusterTable
+from .ini_operations import PopOption, ReplaceSection, SetOption, Transform
+from .study_session import StudySession
+from .upgrade_method import UpgradeMethod, upgrade_step
 from ..model.general_data import GENERAL_DATA_PATH, GeneralData
 
 
@@ -34,6 +34,11 @@ def _upgrade_thematic_trimming(data: GeneralData) -> None:
         variables_selection[select_var_key] = filtered_vars
 
 
+def _upgrade_variables_selection(data: GeneralData) -> None:
+    if "variables selection" in data:
+        _upgrade_thematic_trimming(data)
+
+
 class UpgradeTo0902(UpgradeMethod):
     """
     This class upgrades the study from version 9.0 to version 9.2.
@@ -41,38 +46,29 @@ class UpgradeTo0902(UpgradeMethod):
 
     old = StudyVersion(9, 0)
     new = StudyVersion(9, 2)
-    files = ["input/st-storage", GENERAL_DATA_PATH, "input/hydro/hydro.ini", "input/areas"]
+    files = ["input/st-storage", GENERAL_DATA_PATH, "input/hydro/hydro.ini"]
+    reads = ["input/areas"]
+    general_data_ops = (
+        PopOption("adequacy patch", "enable-first-step"),
+        PopOption("adequacy patch", "set-to-null-ntc-between-physical-out-for-first-step"),
+        PopOption("other preferences", "initial-reservoir-levels"),
+        SetOption("other preferences", "shedding-policy", "accurate shave peaks"),
+        ReplaceSection("compatibility", (("hydro-pmax", "daily"),)),
+        Transform(_upgrade_variables_selection, sections=("variables selection",)),
+    )
 
     @staticmethod
-    def _upgrade_general_data(study_dir: Path) -> None:
-        data = GeneralData.from_ini_file(study_dir)
-        adq_patch = data["adequacy patch"]
-        adq_patch.pop("enable-first-step", None)
-        adq_patch.pop("set-to-null-ntc-between-physical-out-for-first-step", None)
-        other_preferences = data["other preferences"]
-        other_preferences.pop("initial-reservoir-levels", None)
-        other_preferences["shedding-policy"] = "accurate shave peaks"
-        data["compatibility"] = {"hydro-pmax": "daily"}
-
-        if "variables selection" in data:
-            _upgrade_thematic_trimming(data)
-
-        data.to_ini_file(study_dir)
+    @upgrade_step(files=["input/st-storage/clusters"])
+    def _upgrade_storage_clusters(session: StudySession) -> None:
+        table = ClusterTable.load(session, "st-storage")
+        table.assign("efficiencywithdrawal", 1)
+        table.assign("penalize-variation-injection", False)
+        table.assign("penalize-variation-withdrawal", False)
+        table.save(session)
 
     @staticmethod
-    def _upgrade_storages(study_dir: Path) -> None:
-        st_storage_dir = study_dir / "input" / "st-storage"
-        reader = IniReader()
-        writer = IniWriter()
-        cluster_files = (st_storage_dir / "clusters").glob("*/list.ini")
-        for file_path in cluster_files:
-            sections = reader.read(file_path)
-            for section in sections.values():
-                section["efficiencywithdrawal"] = 1
-                section["penalize-variation-injection"] = False
-                section["penalize-variation-withdrawal"] = False
-            writer.write(sections, file_path)
-
+    @upgrade_step(files=["input/st-storage/series"])
+    def _upgrade_storage_series(session: StudySession) -> None:
         matrices_to_create = [
             "cost-injection.txt",
             "cost-withdrawal.txt",
@@ -80,44 +76,24 @@ class UpgradeTo0902(UpgradeMethod):
             "cost-variation-injection.txt",
             "cost-variation-withdrawal.txt",
         ]
-        series_path = st_storage_dir / "series"
-        if not Path(series_path).is_dir():
-            return
-        for area in series_path.iterdir():
-            area_dir = st_storage_dir / "series" / area
-            for storage in area_dir.iterdir():
-                final_dir = area_dir / storage
+        for area in session.tree.listdir("input/st-storage/series"):
+            area_dir = f"input/st-storage/series/{area.name}"
+            for storage in session.tree.listdir(area_dir):
+                final_dir = f"{area_dir}/{storage.name}"
                 for matrix in matrices_to_create:
-                    (final_dir / matrix).touch()
+                    session.tree.touch(f"{final_dir}/{matrix}")
 
     @staticmethod
-    def _upgrade_hydro(study_dir: Path) -> None:
+    @upgrade_step(files=["input/hydro/hydro.ini"], reads=["input/areas"])
+    def _upgrade_hydro(session: StudySession) -> None:
         # Retrieves the list of existing areas
-        all_areas_ids = set()
-        for element in (study_dir / "input" / "areas").iterdir():
-            if element.is_dir():
-                all_areas_ids.add(element.name)
+        all_areas_ids = session.entities.get_area_dirs()
 
         # Builds the new section to add to the file
         new_section = {area_id: 1 for area_id in all_areas_ids}
 
         # Adds the section to the file
-        ini_path = study_dir / "input" / "hydro" / "hydro.ini"
-        reader = IniReader()
-        sections = reader.read(ini_path)
+        ini_path = "input/hydro/hydro.ini"
+        sections = session.read_ini(ini_path)
         sections["overflow spilled cost difference"] = new_section
-        writer = IniWriter()
-        writer.write(sections, ini_path)
-
-    @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
-        """
-        Upgrades the study to version 9.2.
-
-        Args:
-            study_dir: The study directory.
-        """
-
-        cls._upgrade_general_data(study_dir)
-        cls._upgrade_storages(study_dir)
-        cls._upgrade_hydro(study_dir)
+        session.write_ini(ini_path, sections)
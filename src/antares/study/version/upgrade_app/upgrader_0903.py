@@ -1,9 +1,8 @@
-from pathlib import Path
-
 from antares.study.version.model.study_version import StudyVersion
 
+from .ini_operations import PopOption, SetOption, Transform
 from .upgrade_method import UpgradeMethod
-from ..model.general_data import GeneralData
+from ..model.general_data import GENERAL_DATA_PATH, GeneralData
 
 
 def upgrade_thematic_trimming(data: GeneralData) -> None:
@@ -68,6 +67,11 @@ def upgrade_thematic_trimming(data: GeneralData) -> None:
     variables_selection[select_var_plus] = d[select_var_plus]
 
 
+def _upgrade_variables_selection(data: GeneralData) -> None:
+    if "variables selection" in data:
+        upgrade_thematic_trimming(data)
+
+
 class UpgradeTo0903(UpgradeMethod):
     """
     This class upgrades the study from version 9.2 to version 9.3.
@@ -75,33 +79,15 @@ class UpgradeTo0903(UpgradeMethod):
 
     old = StudyVersion(9, 2)
     new = StudyVersion(9, 3)
-
-    @staticmethod
-    def _upgrade_general_data(study_dir: Path) -> None:
-        data = GeneralData.from_ini_file(study_dir)
-        general = data["general"]
-        general.pop("refreshtimeseries", None)
-        general.pop("refreshintervalload", None)
-        general.pop("refreshintervalhydro", None)
-        general.pop("refreshintervalwind", None)
-        general.pop("refreshintervalthermal", None)
-        general.pop("refreshintervalsolar", None)
-
-        data["other preferences"]["accurate-shave-peaks-include-short-term-storage"] = False
-        data["adequacy patch"]["redispatch"] = False
-
-        if "variables selection" in data:
-            upgrade_thematic_trimming(data)
-
-        data.to_ini_file(study_dir)
-
-    @classmethod
-    def upgrade(cls, study_dir: Path) -> None:
-        """
-        Upgrades the study to version 9.3.
-
-        Args:
-            study_dir: The study directory.
-        """
-
-        cls._upgrade_general_data(study_dir)
+    files = [GENERAL_DATA_PATH]
+    general_data_ops = (
+        PopOption("general", "refreshtimeseries"),
+        PopOption("general", "refreshintervalload"),
+        PopOption("general", "refreshintervalhydro"),
+        PopOption("general", "refreshintervalwind"),
+        PopOption("general", "refreshintervalthermal"),
+        PopOption("general", "refreshintervalsolar"),
+        SetOption("other preferences", "accurate-shave-peaks-include-short-term-storage", False),
+        SetOption("adequacy patch", "redispatch", False),
+        Transform(_upgrade_variables_selection, sections=("variables selection",)),
+    )
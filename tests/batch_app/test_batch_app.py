@@ -0,0 +1,138 @@
+import csv
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from antares.study.version import StudyVersion
+from antares.study.version.batch_app import (
+    STATUS_FAILED,
+    STATUS_LOCKED,
+    STATUS_UP_TO_DATE,
+    STATUS_UPGRADED,
+    BatchUpgradeApp,
+    StudyResult,
+    estimate_study,
+    find_studies,
+    read_study_list,
+    write_results,
+)
+from antares.study.version.create_app import CreateApp
+from antares.study.version.model.study_antares import StudyAntares
+from antares.study.version.upgrade_app import UpgradeApp
+from antares.study.version.upgrade_app.study_lock import StudyLock
+
+
+def _create_study(study_dir: Path, version: str) -> Path:
+    app = CreateApp(study_dir=study_dir, caption="My Study", version=StudyVersion.parse(version), author="John Doe")
+    app()
+    return study_dir
+
+
+def test_find_studies(tmp_path: Path) -> None:
+    for relpath in ["a/study-1", "a/b/study-2", "study-3", "study-3/input/nested", "~study.upgrade.tmp/study-4"]:
+        tmp_path.joinpath(relpath).mkdir(parents=True)
+        tmp_path.joinpath(relpath, "study.antares").touch()
+    tmp_path.joinpath("a/b/other").mkdir()
+
+    actual = find_studies(tmp_path)
+    assert actual == [tmp_path / "a/b/study-2", tmp_path / "a/study-1", tmp_path / "study-3"]
+
+
+def test_read_study_list(tmp_path: Path) -> None:
+    other_study = tmp_path.parent.joinpath("study-2")
+    list_path = tmp_path.joinpath("studies.txt")
+    list_path.write_text(f"# campaign 1\nstudy-1\n\n  {other_study}  \n")
+    assert read_study_list(list_path) == [tmp_path / "study-1", other_study]
+
+
+def test_write_results(tmp_path: Path) -> None:
+    results = [
+        StudyResult(tmp_path / "study-1", STATUS_UPGRADED, "8.6", "9.3", duration=1.23456, size=1024),
+        StudyResult(tmp_path / "study-2", STATUS_FAILED, "8.6", error="boom"),
+    ]
+    csv_path = tmp_path.joinpath("results.csv")
+    write_results(results, csv_path)
+    with open(csv_path, encoding="utf-8", newline="") as fd:
+        rows = list(csv.DictReader(fd))
+    assert rows[0]["study_dir"] == str(tmp_path / "study-1")
+    assert rows[0]["duration"] == "1.235"
+    assert rows[0]["size"] == "1024"
+    assert rows[1]["status"] == STATUS_FAILED
+    assert rows[1]["error"] == "boom"
+
+
+def test_estimate_study(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # the estimate doesn't run the preflight of the upgrade
+    monkeypatch.setattr(UpgradeApp, "plan", mock.Mock(side_effect=AssertionError("unexpected preflight")))
+    small_study = _create_study(tmp_path / "small-study", "8.6")
+    big_study = _create_study(tmp_path / "big-study", "8.6")
+    # the binding constraints are upgraded to v8.7
+    big_study.joinpath("input/bindingconstraints/bc_1.txt").write_text("1\t2\t3\n" * 8760)
+    version = StudyVersion.parse("9.3")
+
+    small_task = estimate_study(small_study, version)
+    big_task = estimate_study(big_study, version)
+    assert 0 < small_task.size < big_task.size
+    assert 0 < small_task.cost < big_task.cost
+    assert big_task.device == big_study.stat().st_dev
+    # the more versions to upgrade, the higher the cost
+    assert estimate_study(big_study, StudyVersion.parse("8.7")).cost < big_task.cost
+
+    up_to_date = estimate_study(_create_study(tmp_path / "up-to-date", "9.3"), version)
+    assert (up_to_date.size, up_to_date.cost) == (0, 0.0)
+    missing = estimate_study(tmp_path / "missing", version)
+    assert (missing.cost, missing.device) == (0.0, -1)
+
+
+class TestBatchUpgradeApp:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_nominal_case(self, tmp_path: Path, workers: int) -> None:
+        study_1 = _create_study(tmp_path / "study-1", "8.6")
+        study_2 = _create_study(tmp_path / "study-2", "9.3")
+        study_3 = _create_study(tmp_path / "study-3", "8.6")
+        study_3.joinpath("study.antares").write_text("[antares]\nversion = foo\n")
+
+        reported: list[StudyResult] = []
+        app = BatchUpgradeApp([study_1, study_2, study_3], "9.3", workers=workers, on_result=reported.append)
+        results = app()
+
+        assert [r.study_dir for r in results] == [study_1, study_2, study_3]
+        assert sorted(reported, key=lambda r: r.study_dir) == results
+        assert [r.status for r in results] == [STATUS_UPGRADED, STATUS_UP_TO_DATE, STATUS_FAILED]
+        assert (results[0].old_version, results[0].new_version) == ("8.6", "9.3")
+        assert results[0].size > 0
+        assert results[2].error
+        assert StudyAntares.from_ini_file(study_1).version == StudyVersion(9, 3)
+
+    def test_limits(self, tmp_path: Path) -> None:
+        study_dirs = [_create_study(tmp_path / f"study-{i}", "8.6") for i in range(3)]
+        app = BatchUpgradeApp(study_dirs, "9.3", workers=2, max_per_device=1, max_bytes_per_second=10**12)
+        results = app()
+        assert [r.status for r in results] == [STATUS_UPGRADED] * 3
+
+    def test_locked_study(self, tmp_path: Path) -> None:
+        study_1 = _create_study(tmp_path / "study-1", "8.6")
+        study_2 = _create_study(tmp_path / "study-2", "8.6")
+        reported: list[StudyResult] = []
+        app = BatchUpgradeApp(
+            [study_1, study_2], "9.3", workers=1, lock_retries=2, lock_retry_delay=0.01, on_result=reported.append
+        )
+        with StudyLock(study_1):
+            results = app()
+
+        assert [r.status for r in results] == [STATUS_LOCKED, STATUS_UPGRADED]
+        assert "locked" in results[0].error
+        # the locked study is reported once, after its retries
+        assert [r.study_dir for r in reported] == [study_2, study_1]
+        assert StudyAntares.from_ini_file(study_1).version == StudyVersion(8, 6)
+
+    def test_invalid_workers(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="workers"):
+            BatchUpgradeApp([tmp_path], "9.3", workers=0)
+
+    def test_invalid_limits(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="per device"):
+            BatchUpgradeApp([tmp_path], "9.3", max_per_device=0)
+        with pytest.raises(ValueError, match="rate"):
+            BatchUpgradeApp([tmp_path], "9.3", max_bytes_per_second=0)
@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+
+from antares.study.version.batch_app.scheduler import BatchScheduler, RateLimiter, StudyTask
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _start_all(scheduler: BatchScheduler) -> list[str]:
+    started: list[str] = []
+    while True:
+        task, _ = scheduler.next_task()
+        if task is None:
+            return started
+        scheduler.start(task)
+        started.append(task.study_dir.name)
+
+
+class TestRateLimiter:
+    def test_delay(self) -> None:
+        clock = FakeClock()
+        limiter = RateLimiter(100, clock=clock)
+        assert limiter.get_delay() == 0
+        limiter.consume(200)
+        assert limiter.get_delay() == pytest.approx(2.0)
+        clock.now = 1.5
+        limiter.consume(100)
+        assert limiter.get_delay() == pytest.approx(1.5)
+        # the idle time is not credited to the next upgrades
+        clock.now = 10.0
+        assert limiter.get_delay() == 0
+        limiter.consume(50)
+        assert limiter.get_delay() == pytest.approx(0.5)
+
+    def test_invalid_rate(self) -> None:
+        with pytest.raises(ValueError, match="rate"):
+            RateLimiter(0)
+
+
+class TestBatchScheduler:
+    def test_longest_first(self) -> None:
+        tasks = [StudyTask(Path(name), cost=cost) for name, cost in [("a", 1.0), ("b", 5.0), ("c", 0.0), ("d", 5.0)]]
+        scheduler = BatchScheduler(tasks, max_running=2)
+        assert _start_all(scheduler) == ["b", "d"]
+        scheduler.finish(tasks[1])
+        assert _start_all(scheduler) == ["a"]
+        scheduler.finish(tasks[0])
+        scheduler.finish(tasks[3])
+        assert _start_all(scheduler) == ["c"]
+        scheduler.finish(tasks[2])
+        assert scheduler.done
+
+    def test_max_per_device(self) -> None:
+        tasks = [
+            StudyTask(Path("nas-1"), cost=9.0, device=1),
+            StudyTask(Path("nas-2"), cost=8.0, device=1),
+            StudyTask(Path("local-1"), cost=2.0, device=2),
+            StudyTask(Path("local-2"), cost=1.0, device=2),
+        ]
+        scheduler = BatchScheduler(tasks, max_running=3, max_per_device=1)
+        assert _start_all(scheduler) == ["nas-1", "local-1"]
+        assert scheduler.next_task() == (None, None)
+        scheduler.finish(tasks[0])
+        assert _start_all(scheduler) == ["nas-2"]
+
+    def test_rate_limiter(self) -> None:
+        clock = FakeClock()
+        tasks = [StudyTask(Path("a"), size=300, cost=3.0), StudyTask(Path("b"), size=100, cost=1.0)]
+        scheduler = BatchScheduler(tasks, max_running=2, rate_limiter=RateLimiter(100, clock=clock))
+        assert _start_all(scheduler) == ["a"]
+        assert scheduler.next_task() == (None, pytest.approx(3.0))
+        clock.now = 3.0
+        assert _start_all(scheduler) == ["b"]
+
+    def test_retry(self) -> None:
+        clock = FakeClock()
+        tasks = [StudyTask(Path("a"), cost=2.0), StudyTask(Path("b"), cost=1.0)]
+        scheduler = BatchScheduler(tasks, max_running=1, clock=clock)
+        assert _start_all(scheduler) == ["a"]
+        # the retried upgrade is run after the other ones, once the delay has elapsed
+        scheduler.retry(tasks[0], delay=5.0)
+        assert _start_all(scheduler) == ["b"]
+        scheduler.finish(tasks[1])
+        assert scheduler.next_task() == (None, pytest.approx(5.0))
+        clock.now = 5.0
+        assert _start_all(scheduler) == ["a"]
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import threading
+import typing as t
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from antares.study.version import aio
+from antares.study.version.model.study_antares import StudyAntares
+from antares.study.version.upgrade_app import UpgradeApp
+from antares.study.version.upgrade_app.cluster_table import ClusterTable
+from antares.study.version.upgrade_app.events import (
+    STEP_FINISHED,
+    STEP_STARTED,
+    UPGRADE_FAILED,
+    UPGRADE_FINISHED,
+    UPGRADE_STARTED,
+    UpgradeEvent,
+)
+
+
+def _create_study(tmp_path: Path, version: str) -> Path:
+    study_dir = tmp_path.joinpath("my-study")
+    asyncio.run(aio.create(study_dir, "My Study", version, "John Doe"))
+    return study_dir
+
+
+class TestAio:
+    def test_create_and_show(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        text = asyncio.run(aio.show(study_dir))
+        assert "Caption: My Study" in text
+        assert "Version: v8.5" in text
+
+    def test_upgrade(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+
+        async def upgrade() -> list[UpgradeEvent]:
+            return [event async for event in aio.upgrade(study_dir, "8.7", jobs=1)]
+
+        events = asyncio.run(upgrade())
+
+        assert StudyAntares.from_ini_file(study_dir).version == (8, 7)
+        assert events[0].kind == UPGRADE_STARTED
+        assert events[-1].kind == UPGRADE_FINISHED
+        total = events[0].total
+        step_events = [e.kind for e in events if e.kind in {STEP_STARTED, STEP_FINISHED}]
+        assert step_events == [STEP_STARTED, STEP_FINISHED] * total
+        assert events[-1].done == total
+
+    def test_upgrade__cancelled(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        gate = threading.Event()
+        original_load = ClusterTable.load
+
+        def load(*args: t.Any, **kwargs: t.Any) -> ClusterTable:
+            gate.wait(timeout=10)
+            return original_load(*args, **kwargs)
+
+        async def upgrade() -> None:
+            started = asyncio.Event()
+
+            async def consume() -> None:
+                async for event in aio.upgrade(study_dir, "8.7", jobs=1):
+                    if event.kind == STEP_STARTED and event.name.startswith("UpgradeTo0807"):
+                        started.set()
+
+            task = asyncio.create_task(consume())
+            await started.wait()
+            task.cancel()
+            # the step is released once the cancellation is requested
+            asyncio.get_running_loop().call_soon(gate.set)
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with mock.patch.object(ClusterTable, "load", load):
+            asyncio.run(upgrade())
+
+        # the upgrade is rolled back
+        assert StudyAntares.from_ini_file(study_dir).version == (8, 5)
+        assert not study_dir.joinpath("input/st-storage").exists()
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+    def test_upgrade__cancelled_after_last_step(self, tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        gate = threading.Event()
+        original_update = UpgradeApp._update_study_antares
+
+        def update_study_antares(self: UpgradeApp, *args: t.Any) -> None:
+            gate.wait(timeout=10)
+            original_update(self, *args)
+
+        async def upgrade() -> None:
+            last_step = asyncio.Event()
+
+            async def consume() -> None:
+                async for event in aio.upgrade(study_dir, "8.7", jobs=1):
+                    if event.kind == STEP_FINISHED and event.done == event.total:
+                        last_step.set()
+
+            task = asyncio.create_task(consume())
+            await last_step.wait()
+            task.cancel()
+            # the commit is released once the cancellation is requested
+            asyncio.get_running_loop().call_soon(gate.set)
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with (
+            caplog.at_level(logging.INFO),
+            mock.patch.object(UpgradeApp, "_update_study_antares", update_study_antares),
+        ):
+            asyncio.run(upgrade())
+
+        # the upgrade is committed, and no cancellation error is reported
+        assert StudyAntares.from_ini_file(study_dir).version == (8, 7)
+        messages = [record.getMessage() for record in caplog.records]
+        assert any(UPGRADE_FINISHED in message for message in messages)
+        assert not any(UPGRADE_FAILED in message for message in messages)
+        assert list(tmp_path.iterdir()) == [study_dir]
@@ -1,6 +1,8 @@
 import configparser
 import datetime
+import json
 import typing as t
+import zipfile
 from pathlib import Path
 from unittest import mock
 from unittest.mock import ANY
@@ -14,6 +16,7 @@ from antares.study.version.__about__ import __date__, __version__
 from antares.study.version.cli import cli
 from antares.study.version.create_app import TEMPLATES_BY_VERSIONS
 from antares.study.version.ini_reader import IniReader
+from antares.study.version.upgrade_app.study_lock import StudyLock
 from tests.conftest import StudyAssets
 from tests.helpers import are_same_dir
 
@@ -81,6 +84,170 @@ class TestCli:
         show_str = result.output.strip()
         assert "Available versions: 7.0, 7.1, 7.2, 8.0" in show_str
 
+    @pytest.mark.parametrize("jobs", ["1", "8"])
+    def test_upgrade__jobs(self, tmp_path: Path, jobs: str) -> None:
+        runner = CliRunner()
+        study_dir = tmp_path / "my-study"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.1"])
+        assert result.exit_code == 0
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["upgrade", str(study_dir), "--version=9.3", "-j", jobs])
+        assert result.exit_code == 0
+        actual_antares = IniReader().read(study_dir / "study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 9.3
+
+    def test_upgrade__invalid_jobs(self, tmp_path: Path) -> None:
+        runner = CliRunner()
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["upgrade", str(tmp_path), "--jobs=0"])
+        assert result.exit_code != 0
+        assert "Invalid value for '-j' / '--jobs'" in result.output
+
+    def test_upgrade__locked(self, tmp_path: Path) -> None:
+        runner = CliRunner(mix_stderr=False)
+        study_dir = tmp_path / "my-study"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.6"])
+        assert result.exit_code == 0
+        args = ["upgrade", str(study_dir), "--version=9.3", "--lock-timeout=0"]
+        with StudyLock(study_dir):
+            result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code != 0
+        assert "locked by another upgrade" in result.stderr
+        actual_antares = IniReader().read(study_dir / "study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 860
+
+    def test_upgrade__insufficient_space(self, tmp_path: Path) -> None:
+        runner = CliRunner(mix_stderr=False)
+        study_dir = tmp_path / "my-study"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.6"])
+        assert result.exit_code == 0
+        with mock.patch("shutil.disk_usage", return_value=mock.Mock(free=0)):
+            result = runner.invoke(t.cast(click.BaseCommand, cli), ["upgrade", str(study_dir), "--version=9.3"])
+        assert result.exit_code != 0
+        # the error is reported without a traceback
+        assert isinstance(result.exception, SystemExit)
+        assert "Error: Not enough free space" in result.stderr
+        actual_antares = IniReader().read(study_dir / "study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 860
+
+    def test_upgrade__plan(self, tmp_path: Path) -> None:
+        runner = CliRunner()
+        study_dir = tmp_path / "my-study"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.6"])
+        assert result.exit_code == 0
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["upgrade", str(study_dir), "--version=9.3", "--plan"])
+        assert result.exit_code == 0
+        assert "UpgradeTo0902._upgrade_hydro" in result.output
+        assert "write  input/hydro/hydro.ini" in result.output
+        assert "Free space:" in result.output
+        # nothing is changed
+        actual_antares = IniReader().read(study_dir / "study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 860
+
+        with mock.patch("shutil.disk_usage", return_value=mock.Mock(free=0)):
+            result = runner.invoke(
+                t.cast(click.BaseCommand, cli), ["upgrade", str(study_dir), "--version=9.3", "--plan"]
+            )
+        assert result.exit_code != 0
+        assert "not enough free space" in result.output
+
+    def test_upgrade__output_dir(self, tmp_path: Path) -> None:
+        runner = CliRunner()
+        study_dir = tmp_path / "my-study"
+        output_dir = tmp_path / "output"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.6"])
+        assert result.exit_code == 0
+
+        args = ["upgrade", str(study_dir), "-v", "8.8", "-v", "9.3"]
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code != 0
+        assert "--output-dir option is required" in result.output
+
+        result = runner.invoke(t.cast(click.BaseCommand, cli), [*args, "--output-dir", str(output_dir)])
+        assert result.exit_code == 0, result.output
+        for version, expected in [("8.8", 880), ("9.3", 9.3)]:
+            actual_antares = IniReader().read(output_dir / f"my-study-v{version}/study.antares", section="antares")
+            assert actual_antares["antares"]["version"] == expected
+        actual_antares = IniReader().read(study_dir / "study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 860
+
+    @pytest.mark.parametrize("progress", ["bar", "json"])
+    def test_upgrade__progress(self, tmp_path: Path, progress: str) -> None:
+        runner = CliRunner(mix_stderr=False)
+        study_dir = tmp_path / "my-study"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.6"])
+        assert result.exit_code == 0
+
+        args = ["upgrade", str(study_dir), "--version=9.3", f"--progress={progress}"]
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code == 0, result.stderr
+        if progress == "json":
+            events = [json.loads(line) for line in result.stdout.splitlines()]
+            assert events[0]["kind"] == "upgrade_started"
+            assert events[-1]["kind"] == "upgrade_finished"
+            assert {e["study_dir"] for e in events} == {str(study_dir)}
+        else:
+            assert result.stdout == ""
+            assert "Upgrade Study v8.6 -> v9.3" in result.stderr
+
+    def test_upgrade__output(self, tmp_path: Path) -> None:
+        runner = CliRunner()
+        study_dir = tmp_path / "my-study"
+        output_dir = tmp_path / "upgraded"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.6"])
+        assert result.exit_code == 0
+
+        args = ["upgrade", str(study_dir), "--version=9.3", "--output", str(output_dir)]
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code == 0, result.output
+        actual_antares = IniReader().read(output_dir / "study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 9.3
+        actual_antares = IniReader().read(study_dir / "study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 860
+
+        # the output directory must not exist
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code != 0
+        assert "already exists" in result.output
+
+    def test_upgrade__zip_archive(self, tmp_path: Path) -> None:
+        runner = CliRunner()
+        study_dir = tmp_path / "my-study"
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["create", str(study_dir), "--version=8.6"])
+        assert result.exit_code == 0
+        zip_path = tmp_path / "my-study.zip"
+        with zipfile.ZipFile(zip_path, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path in sorted(study_dir.rglob("*")):
+                archive.write(path, path.relative_to(study_dir).as_posix())
+
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["upgrade", str(zip_path), "--version=9.3"])
+        assert result.exit_code == 0, result.output
+        with zipfile.ZipFile(zip_path) as archive:
+            archive.extract("study.antares", tmp_path / "actual")
+        actual_antares = IniReader().read(tmp_path / "actual/study.antares", section="antares")
+        assert actual_antares["antares"]["version"] == 9.3
+
+        # the upgraded archive can be written to another file, which must not exist
+        output_path = tmp_path / "upgraded.zip"
+        args = ["upgrade", str(zip_path), "--version=9.3", f"--output={output_path}"]
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code != 0
+        assert "already in version" in result.output
+        output_path.write_bytes(b"")
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code != 0
+        assert "Error: Study archive already exists" in result.output
+
+        # the archive is locked like a study directory
+        with StudyLock(zip_path):
+            args = ["upgrade", str(zip_path), "--version=9.3", "--lock-timeout=0"]
+            result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code != 0
+        assert "Error:" in result.output and "locked" in result.output
+
+        args = ["upgrade", str(zip_path), "--version=8.8", "--version=9.3"]
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code != 0
+        assert "Error: the upgrade of an archive to several versions is not supported" in result.output
+
     def test_upgrade__nominal_case(self, study_assets: StudyAssets) -> None:
         runner = CliRunner()
         target_version = "8.8"
@@ -105,3 +272,27 @@ class TestCli:
             "author": "Robert Smith",
             "editor": "Robert Smith",
         }
+
+    def test_upgrade_many(self, tmp_path: Path) -> None:
+        runner = CliRunner(mix_stderr=False)
+        root_dir = tmp_path / "studies"
+        for name in ["study-1", "study-2"]:
+            args = ["create", str(root_dir / name), "--version=8.6"]
+            result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+            assert result.exit_code == 0
+
+        results_path = tmp_path / "results.csv"
+        args = ["upgrade-many", str(root_dir), "--version=9.3", "--workers=1", "--results", str(results_path)]
+        args += ["--max-per-device=1", "--max-bytes-per-second=1000000000"]
+        result = runner.invoke(t.cast(click.BaseCommand, cli), args)
+        assert result.exit_code == 0, result.stderr
+        assert result.stdout.splitlines()[-1] == "2 upgraded"
+        assert len(results_path.read_text().splitlines()) == 3
+
+        # a broken study makes the command fail
+        root_dir.joinpath("study-2/study.antares").write_text("[antares]\nversion = foo\n")
+        list_path = tmp_path / "studies.txt"
+        list_path.write_text("studies/study-1\nstudies/study-2\n")
+        result = runner.invoke(t.cast(click.BaseCommand, cli), ["upgrade-many", str(list_path), "--workers=1"])
+        assert result.exit_code != 0
+        assert "1 failed, 1 up-to-date" in result.stdout
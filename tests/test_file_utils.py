@@ -0,0 +1,110 @@
+import copy
+import os
+import sys
+import zipfile
+import zlib
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from antares.study.version.file_utils import atomic_write, copy_zip_member, copy_zip_members, snapshot_tree
+
+
+class TestAtomicWrite:
+    def test_atomic_write__hardlinks_are_not_changed(self, tmp_path: Path) -> None:
+        path = tmp_path / "file.ini"
+        path.write_text("old")
+        link_path = tmp_path / "link.ini"
+        os.link(path, link_path)
+
+        with atomic_write(path) as fp:
+            fp.write("new")
+
+        assert path.read_text() == "new"
+        assert link_path.read_text() == "old"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["file.ini", "link.ini"]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+    def test_atomic_write__permissions_are_kept(self, tmp_path: Path) -> None:
+        path = tmp_path / "file.ini"
+        path.write_text("old")
+        path.chmod(0o640)
+
+        with atomic_write(path) as fp:
+            fp.write("new")
+
+        assert path.stat().st_mode & 0o777 == 0o640
+
+    def test_atomic_write__error(self, tmp_path: Path) -> None:
+        path = tmp_path / "file.ini"
+        path.write_text("old")
+
+        with pytest.raises(RuntimeError):
+            with atomic_write(path) as fp:
+                fp.write("new")
+                raise RuntimeError("boom")
+
+        assert path.read_text() == "old"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["file.ini"]
+
+
+def test_snapshot_tree(tmp_path: Path) -> None:
+    src_dir = tmp_path / "src"
+    src_dir.joinpath("input/empty").mkdir(parents=True)
+    src_dir.joinpath("input/data.txt").write_text("data")
+    src_dir.joinpath("study.antares").write_text("[antares]")
+
+    dst_dir = tmp_path / "dst"
+    snapshot_tree(src_dir, dst_dir)
+
+    assert dst_dir.joinpath("input/empty").is_dir()
+    assert dst_dir.joinpath("input/data.txt").read_text() == "data"
+    assert dst_dir.joinpath("study.antares").read_text() == "[antares]"
+    with pytest.raises(FileExistsError):
+        snapshot_tree(src_dir, dst_dir)
+
+
+def test_copy_zip_members(tmp_path: Path) -> None:
+    src_path = tmp_path / "src.zip"
+    with zipfile.ZipFile(src_path, mode="w") as src:
+        src.writestr("input/", "")
+        src.writestr("input/data.txt", "1\t2\t3\n" * 100, compress_type=zipfile.ZIP_DEFLATED)
+        src.writestr("input/étude.ini", "[étude]", compress_type=zipfile.ZIP_DEFLATED)
+        src.writestr("study.antares", "[antares]", compress_type=zipfile.ZIP_STORED)
+        src.writestr("encrypted.txt", "secret", compress_type=zipfile.ZIP_DEFLATED)
+
+    dst_path = tmp_path / "dst.zip"
+    get_compressor = mock.Mock(wraps=zipfile._get_compressor)  # type: ignore[attr-defined]
+    with zipfile.ZipFile(src_path) as src:
+        infos = src.infolist()
+        # the encrypted members can't be copied as raw bytes
+        encrypted = copy.copy(infos[-1])
+        encrypted.flag_bits |= 0x01
+        with (
+            mock.patch.object(zlib, "compressobj", wraps=zlib.compressobj) as compressobj,
+            mock.patch.object(zipfile, "_get_compressor", get_compressor),
+        ):
+            skipped = copy_zip_members(src, [*infos[:-1], encrypted], dst_path)
+        compressobj.assert_not_called()
+        get_compressor.assert_not_called()
+        assert skipped == [encrypted]
+
+        # the archive can be completed with `zipfile`, and the skipped members can be recompressed
+        with zipfile.ZipFile(dst_path, mode="a") as dst:
+            copy_zip_member(src, infos[-1], dst)
+            dst.writestr("new.txt", "new")
+
+    with zipfile.ZipFile(src_path) as src, zipfile.ZipFile(dst_path) as dst:
+        assert dst.testzip() is None
+        assert dst.namelist() == [*src.namelist(), "new.txt"]
+        for info in src.infolist():
+            copied = dst.getinfo(info.filename)
+            assert (copied.compress_type, copied.compress_size, copied.CRC, copied.date_time, copied.external_attr) == (
+                info.compress_type,
+                info.compress_size,
+                info.CRC,
+                info.date_time,
+                info.external_attr,
+            )
+            assert dst.read(info) == src.read(info)
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+from antares.study.version.ini_reader import IniReader
+from antares.study.version.upgrade_app.cluster_table import ClusterTable
+from antares.study.version.upgrade_app.study_session import StudySession
+
+
+def _make_files(root: Path, files: dict[str, str]) -> None:
+    for relpath, content in files.items():
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+class TestClusterTable:
+    def test_load_and_save(self, tmp_path: Path) -> None:
+        _make_files(
+            tmp_path,
+            {
+                "input/thermal/clusters/fr/list.ini": (
+                    "[Nuclear]\nname = Nuclear\ngroup = Nuclear\nenabled = false\n\n"
+                    "[Gas]\nname = Gas\ngroup = Other\nunitcount = 2\n"
+                ),
+                "input/thermal/clusters/de/list.ini": "",
+                "input/thermal/clusters/it/list.ini": "[Coal]\nefficiency = 42.5\nname = Coal\ngroup = OTHER\n",
+            },
+        )
+        session = StudySession(tmp_path)
+        table = ClusterTable.load(session, "thermal")
+        assert table.areas == ["de", "fr", "it"]
+        assert list(table.frame.index) == [("fr", "Nuclear"), ("fr", "Gas"), ("it", "Coal")]
+
+        # vectorized operations
+        table.frame.loc[table.frame["group"].str.lower() == "other", "group"] = "other 1"
+        table.assign("efficiency", 100)
+        table.assign("costgeneration", "SetManually")
+        table.save(session)
+        session.flush()
+
+        actual = {
+            area_id: IniReader().read(tmp_path / f"input/thermal/clusters/{area_id}/list.ini")
+            for area_id in ["de", "fr", "it"]
+        }
+        assert actual == {
+            "de": {},
+            "fr": {
+                "Nuclear": {
+                    "name": "Nuclear",
+                    "group": "Nuclear",
+                    "enabled": False,
+                    "efficiency": 100,
+                    "costgeneration": "SetManually",
+                },
+                "Gas": {
+                    "name": "Gas",
+                    "group": "other 1",
+                    "unitcount": 2,
+                    "efficiency": 100,
+                    "costgeneration": "SetManually",
+                },
+            },
+            "it": {"Coal": {"efficiency": 100, "name": "Coal", "group": "other 1", "costgeneration": "SetManually"}},
+        }
+        # the properties keep their order, and the values their type
+        assert list(actual["it"]["Coal"]) == ["efficiency", "name", "group", "costgeneration"]
+        lines = tmp_path.joinpath("input/thermal/clusters/fr/list.ini").read_text().splitlines()
+        assert lines[:6] == [
+            "[Nuclear]",
+            "name = Nuclear",
+            "group = Nuclear",
+            "enabled = False",
+            "efficiency = 100",
+            "costgeneration = SetManually",
+        ]
+
+    def test_load__no_clusters(self, tmp_path: Path) -> None:
+        session = StudySession(tmp_path)
+        table = ClusterTable.load(session, "st-storage")
+        table.assign("enabled", True)
+        table.save(session)
+        assert table.frame.empty
+        assert session.dirty_files == []
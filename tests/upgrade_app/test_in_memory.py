@@ -0,0 +1,76 @@
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from antares.study.version import StudyVersion
+from antares.study.version.create_app import CreateApp
+from antares.study.version.exceptions import ApplicationError
+from antares.study.version.ini_reader import IniReader
+from antares.study.version.model.general_data import DUPLICATE_KEYS, GENERAL_DATA_PATH
+from antares.study.version.upgrade_app import UpgradeApp, upgrade_documents
+
+
+def _read_documents(study_dir: Path) -> dict[str, t.Any]:
+    documents: dict[str, t.Any] = {"input/areas/list.txt": study_dir.joinpath("input/areas/list.txt").read_text()}
+    for path in sorted(study_dir.rglob("*.ini")):
+        relpath = path.relative_to(study_dir).as_posix()
+        special_keys = DUPLICATE_KEYS if relpath == GENERAL_DATA_PATH else ()
+        documents[relpath] = IniReader(special_keys=special_keys).read(path)
+    return documents
+
+
+class TestUpgradeDocuments:
+    @pytest.mark.parametrize("src_version", ["7.0", "8.0", "8.5", "8.6", "9.2"])
+    def test_same_as_upgrade_app(self, tmp_path: Path, src_version: str) -> None:
+        study_dir = tmp_path / "my-study"
+        CreateApp(study_dir, caption="My Study", version=StudyVersion.parse(src_version), author="John Doe")()
+        study_dir.joinpath("input/areas/list.txt").write_text("FR\nDE\n")
+        for area_id in ["fr", "de"]:
+            study_dir.joinpath("input/areas", area_id).mkdir(parents=True, exist_ok=True)
+        documents = _read_documents(study_dir)
+        documents.pop("study.antares", None)
+
+        upgraded = upgrade_documents(documents, src_version, "9.3")
+
+        UpgradeApp(study_dir, version=StudyVersion(9, 3))()
+        expected = _read_documents(study_dir)
+        expected.pop("study.antares", None)
+        assert upgraded == expected
+
+    def test_documents_are_not_modified(self) -> None:
+        documents = {GENERAL_DATA_PATH: {"other preferences": {"hydro-pricing-mode": "fast"}}}
+        upgraded = upgrade_documents(documents, "8.0", "8.1")
+        assert upgraded[GENERAL_DATA_PATH]["other preferences"] == {
+            "hydro-pricing-mode": "fast",
+            "renewable-generation-modelling": "aggregated",
+        }
+        assert documents == {GENERAL_DATA_PATH: {"other preferences": {"hydro-pricing-mode": "fast"}}}
+
+    @pytest.mark.parametrize("src_version", ["7.0", "8.2", "8.5", "9.0"])
+    def test_general_data_only(self, tmp_path: Path, src_version: str) -> None:
+        study_dir = tmp_path / "my-study"
+        CreateApp(study_dir, caption="My Study", version=StudyVersion.parse(src_version), author="John Doe")()
+        documents = {GENERAL_DATA_PATH: _read_documents(study_dir)[GENERAL_DATA_PATH]}
+
+        # the list of areas is optional, and no document is made up for the skipped steps
+        upgraded = upgrade_documents(documents, src_version, "9.3")
+        assert list(upgraded) == [GENERAL_DATA_PATH]
+
+    def test_documents_created_from_areas(self) -> None:
+        documents = {"input/areas/list.txt": "FR\nDE\n", "input/thermal/clusters/fr/list.ini": {}}
+        upgraded = upgrade_documents(documents, "8.5", "9.3")
+        assert sorted(upgraded) == [
+            "input/areas/list.txt",
+            "input/st-storage/clusters/de/list.ini",
+            "input/st-storage/clusters/fr/list.ini",
+            "input/thermal/clusters/fr/list.ini",
+        ]
+
+    def test_invalid_documents(self) -> None:
+        with pytest.raises(ValueError, match="matrix"):
+            upgrade_documents({"input/links/fr/de.txt": {}}, "8.1", "8.2")
+        with pytest.raises(ValueError, match="text"):
+            upgrade_documents({"input/hydro/hydro.ini": "[a]\n"}, "8.1", "8.2")
+        with pytest.raises(ApplicationError, match="Cannot downgrade"):
+            upgrade_documents({}, "8.2", "8.1")
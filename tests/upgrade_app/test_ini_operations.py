@@ -0,0 +1,87 @@
+import copy
+import io
+import zipfile
+
+import pytest
+
+from antares.study.version import StudyVersion
+from antares.study.version.create_app import _RESOURCES_PATH, TEMPLATES_BY_VERSIONS
+from antares.study.version.ini_reader import IniReader
+from antares.study.version.model.general_data import DUPLICATE_KEYS, GENERAL_DATA_PATH
+from antares.study.version.upgrade_app import scenarios
+from antares.study.version.upgrade_app.ini_operations import (
+    PopOption,
+    RenameOption,
+    ReplaceSection,
+    SetOption,
+    Transform,
+    simplify_operations,
+)
+
+
+def _noop(data: dict[str, dict[str, object]]) -> None:
+    pass
+
+
+class TestSimplifyOperations:
+    def test_set_twice(self) -> None:
+        ops = [SetOption("a", "x", 1), SetOption("a", "y", 2), SetOption("a", "x", 3)]
+        assert simplify_operations(ops) == (SetOption("a", "x", 3), SetOption("a", "y", 2))
+
+    def test_set_then_pop(self) -> None:
+        ops = [SetOption("a", "x", 1), SetOption("b", "x", 2), PopOption("a", "x")]
+        assert simplify_operations(ops) == (SetOption("b", "x", 2), PopOption("a", "x"))
+
+    def test_pop_then_set(self) -> None:
+        # the option is moved at the end of the section: both operations are kept
+        ops = [PopOption("a", "x"), SetOption("a", "x", 1)]
+        assert simplify_operations(ops) == tuple(ops)
+
+    def test_replace_section(self) -> None:
+        ops = [
+            SetOption("a", "x", 1),
+            ReplaceSection("a", (("y", 2),)),
+            SetOption("a", "z", 3),
+            PopOption("a", "y"),
+            ReplaceSection("b", ()),
+            ReplaceSection("a", (("w", 4),)),
+        ]
+        assert simplify_operations(ops) == (ReplaceSection("a", (("w", 4),)), ReplaceSection("b", ()))
+
+    def test_barriers(self) -> None:
+        ops = [
+            SetOption("a", "x", 1),
+            Transform(_noop, options=(("a", "x"),)),
+            SetOption("a", "x", 2),
+            RenameOption("a", "x", "y"),
+            PopOption("a", "x"),
+        ]
+        assert simplify_operations(ops) == tuple(ops)
+
+    def test_upgrade_plan(self) -> None:
+        plan = scenarios.get_plan(StudyVersion(8, 2), StudyVersion(9, 3))
+        all_ops = [op for meth in plan.methods for op in meth.general_data_ops]
+        assert len(plan.general_data_ops) < len(all_ops)
+        assert SetOption("optimization", "include-split-exported-mps", False) not in plan.general_data_ops
+        assert SetOption("adequacy patch", "enable-first-step", False) not in plan.general_data_ops
+
+
+@pytest.mark.parametrize("version", [v for v in TEMPLATES_BY_VERSIONS if v < StudyVersion(9, 3)])
+def test_simplified_operations__same_result(version: StudyVersion) -> None:
+    with zipfile.ZipFile(_RESOURCES_PATH / TEMPLATES_BY_VERSIONS[version]) as zf:
+        text = zf.read(GENERAL_DATA_PATH).decode("utf-8")
+    data = IniReader(special_keys=DUPLICATE_KEYS).read(io.StringIO(text))
+
+    plan = scenarios.get_plan(version, StudyVersion(9, 3))
+    expected = copy.deepcopy(data)
+    for meth in plan.methods:
+        for op in meth.general_data_ops:
+            op.apply(expected)
+    actual = copy.deepcopy(data)
+    for op in plan.general_data_ops:
+        op.apply(actual)
+
+    # compare the content and the order of the sections and options
+    assert list(actual) == list(expected)
+    for section, options in expected.items():
+        assert list(actual[section].items()) == list(options.items())
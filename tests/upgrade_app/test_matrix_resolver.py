@@ -0,0 +1,49 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from antares.study.version.upgrade_app.matrix_resolver import DirectoryMatrixStore
+
+
+class TestDirectoryMatrixStore:
+    def test_read_matrix(self, tmp_path: Path) -> None:
+        tmp_path.joinpath("abc123.tsv").write_bytes(b"1\t2\n")
+        store = DirectoryMatrixStore(tmp_path)
+        assert store.exists("matrix://abc123")
+        assert store.exists(" abc123\n")
+        assert store.read_matrix("matrix://abc123") == b"1\t2\n"
+
+    def test_read_matrix__missing(self, tmp_path: Path) -> None:
+        store = DirectoryMatrixStore(tmp_path)
+        assert not store.exists("matrix://abc123")
+        with pytest.raises(KeyError, match="abc123"):
+            store.read_matrix("matrix://abc123")
+
+    @pytest.mark.parametrize("link", ["", "matrix://", "matrix://../secret", "matrix://..", "foo\\bar"])
+    def test_read_matrix__invalid_link(self, tmp_path: Path, link: str) -> None:
+        store = DirectoryMatrixStore(tmp_path)
+        assert not store.exists(link)
+        with pytest.raises(KeyError, match="Invalid"):
+            store.read_matrix(link)
+
+    def test_write_matrix(self, tmp_path: Path) -> None:
+        store = DirectoryMatrixStore(tmp_path)
+        link = store.write_matrix(b"1\t2\n")
+        assert link == "matrix://" + hashlib.sha256(b"1\t2\n").hexdigest()
+        assert store.read_matrix(link) == b"1\t2\n"
+        # the matrices are content-addressed
+        assert store.write_matrix(b"1\t2\n") == link
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_transforms(self, tmp_path: Path) -> None:
+        store = DirectoryMatrixStore(tmp_path)
+        link = store.write_matrix(b"1\t2\n")
+        outputs = {"first": store.write_matrix(b"1\n"), "second": store.write_matrix(b"2\n")}
+        assert store.get_transform("split", link) is None
+        store.set_transform("split", link, outputs)
+        assert store.get_transform("split", link) == outputs
+        assert store.get_transform("other", link) is None
+        # the transformation is forgotten if an output matrix is removed from the store
+        store.get_matrix_path(outputs["first"]).unlink()
+        assert store.get_transform("split", link) is None
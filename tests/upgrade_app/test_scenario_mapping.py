@@ -0,0 +1,56 @@
+import pickle
+
+import pytest
+
+from antares.study.version import StudyVersion
+from antares.study.version.upgrade_app import scenarios
+from antares.study.version.upgrade_app.upgrade_plan import UpgradePlan
+from antares.study.version.upgrade_app.upgrader_0802 import UpgradeTo0802
+from antares.study.version.upgrade_app.upgrader_0807 import UpgradeTo0807
+
+
+class TestScenarioMapping:
+    def test_get_plan(self) -> None:
+        plan = scenarios.get_plan(StudyVersion(8, 6), StudyVersion(9, 3))
+        assert isinstance(plan, UpgradePlan)
+        assert plan.old == StudyVersion(8, 6)
+        assert plan.new == StudyVersion(9, 3)
+        assert [f"{meth.new:2d}" for meth in plan.methods] == ["8.7", "8.8", "9.0", "9.2", "9.3"]
+        assert plan.should_denormalize is True
+        assert "study.antares" in plan.files
+        assert "settings/generaldata.ini" in plan.files
+
+        # plans are precomputed and shared
+        assert scenarios.get_plan(StudyVersion(8, 6), StudyVersion(9, 3)) is plan
+        assert scenarios[StudyVersion(8, 6) : StudyVersion(9, 3)] == plan.methods  # type: ignore
+
+    def test_get_plan__latest_version(self) -> None:
+        plan = scenarios.get_plan(StudyVersion(9, 0))
+        assert plan.new == scenarios[-1].new  # type: ignore
+        assert plan.should_denormalize is False
+
+    def test_get_plan__intermediate_version(self) -> None:
+        # version 6.5 is upgraded using the 6.0 -> 7.1 upgrade method
+        plan = scenarios.get_plan(StudyVersion(6, 5), StudyVersion(7, 2))
+        assert plan is scenarios.get_plan(StudyVersion(6, 0), StudyVersion(7, 2))
+
+    @pytest.mark.parametrize(
+        "start, end, match",
+        [
+            ("8.8", "8.8", "already in version"),
+            ("9.0", "8.8", "Cannot downgrade"),
+            ("5.0", "9.0", "unknown version"),
+            ("8.8", "9.1", "version unreachable"),
+        ],
+    )
+    def test_get_plan__invalid(self, start: str, end: str, match: str) -> None:
+        with pytest.raises(KeyError, match=match):
+            scenarios.get_plan(StudyVersion.parse(start), StudyVersion.parse(end))
+
+    def test_upgrade_plan__pickle(self) -> None:
+        plan = scenarios.get_plan(StudyVersion(8, 1), StudyVersion(9, 3))
+        other = pickle.loads(pickle.dumps(plan))
+        assert other == plan
+        assert hash(other) == hash(plan)
+        assert UpgradeTo0802() in other.methods
+        assert UpgradeTo0807() in other.methods
@@ -0,0 +1,135 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from antares.study.version import StudyVersion
+from antares.study.version.upgrade_app import scenarios
+from antares.study.version.upgrade_app.scheduler import UpgradeStep, build_dependencies, conflicts, run_steps
+from antares.study.version.upgrade_app.study_session import StudySession
+from antares.study.version.upgrade_app.upgrader_0808 import UpgradeTo0808
+from antares.study.version.upgrade_app.upgrader_0902 import UpgradeTo0902
+from antares.study.version.upgrade_app.upgrader_0903 import UpgradeTo0903
+
+
+def _noop(session: StudySession) -> None:
+    pass
+
+
+class TestConflicts:
+    @pytest.mark.parametrize(
+        "files1, reads1, files2, reads2, expected",
+        [
+            (("input/links",), (), ("input/bindingconstraints",), (), False),
+            (("input/links",), (), ("input/links/fr",), (), True),
+            (("input/st-storage",), (), ("input/st-storage/clusters",), (), True),
+            (("input/hydro/series",), ("input/areas/list.txt",), (), ("input/areas",), False),
+            (("input/areas",), (), (), ("input/areas/list.txt",), True),
+            ((), ("input/areas",), ("input/areas/fr",), (), True),
+        ],
+    )
+    def test_conflicts(
+        self,
+        files1: tuple[str, ...],
+        reads1: tuple[str, ...],
+        files2: tuple[str, ...],
+        reads2: tuple[str, ...],
+        expected: bool,
+    ) -> None:
+        step1 = UpgradeStep("step1", _noop, files=files1, reads=reads1)
+        step2 = UpgradeStep("step2", _noop, files=files2, reads=reads2)
+        assert conflicts(step1, step2) is expected
+        assert conflicts(step2, step1) is expected
+
+    def test_upgrade_plan__dependencies(self) -> None:
+        plan = scenarios.get_plan(StudyVersion(8, 1), StudyVersion(9, 3))
+        names = [step.name for step in plan.steps]
+        deps = {names[index]: {names[i] for i in prev} for index, prev in enumerate(plan.dependencies)}
+        # the links upgrade (8.2) doesn't prevent the binding constraints upgrade (8.7)
+        assert "UpgradeTo0802" not in deps["UpgradeTo0807"]
+        # the short-term storages are created in 8.6 and upgraded in 8.8
+        assert "UpgradeTo0806" in deps["UpgradeTo0808"]
+        assert plan.dependencies == build_dependencies(plan.steps)
+
+
+class TestRunSteps:
+    def test_independent_steps__run_concurrently(self, tmp_path: Path) -> None:
+        started = threading.Event()
+
+        def first(session: StudySession) -> None:
+            # this step can only finish if the second one is running at the same time
+            assert started.wait(timeout=5)
+
+        def second(session: StudySession) -> None:
+            started.set()
+
+        steps = [
+            UpgradeStep("first", first, files=("input/links",)),
+            UpgradeStep("second", second, files=("input/bindingconstraints",)),
+        ]
+        run_steps(steps, StudySession(tmp_path), max_workers=2)
+
+    def test_conflicting_steps__run_in_order(self, tmp_path: Path) -> None:
+        calls: list[str] = []
+        steps = [
+            UpgradeStep(name, lambda session, name=name: calls.append(name), files=("input/thermal",))  # type: ignore
+            for name in "abcdef"
+        ]
+        run_steps(steps, StudySession(tmp_path), max_workers=4)
+        assert calls == list("abcdef")
+
+    def test_failing_step(self, tmp_path: Path) -> None:
+        calls: list[str] = []
+
+        def fail(session: StudySession) -> None:
+            raise ValueError("boom")
+
+        steps = [
+            UpgradeStep("fail", fail, files=("input/links",)),
+            UpgradeStep("after", lambda session: calls.append("after"), files=("input/links/fr",)),  # type: ignore
+        ]
+        with pytest.raises(ValueError, match="boom"):
+            run_steps(steps, StudySession(tmp_path), max_workers=2)
+        assert calls == []
+
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def test_on_step__interrupts_the_steps(self, tmp_path: Path, max_workers: int) -> None:
+        calls: list[str] = []
+        notifications: list[tuple[str, bool]] = []
+
+        def on_step(step: UpgradeStep, completed: bool) -> None:
+            notifications.append((step.name, completed))
+            if completed:
+                raise RuntimeError("cancelled")
+
+        steps = [
+            UpgradeStep(name, lambda session, name=name: calls.append(name), files=("input/thermal",))  # type: ignore
+            for name in "abc"
+        ]
+        with pytest.raises(RuntimeError, match="cancelled"):
+            run_steps(steps, StudySession(tmp_path), max_workers=max_workers, on_step=on_step)
+        assert calls == ["a"]
+        assert notifications == [("a", False), ("a", True)]
+
+
+class TestUpgradeSubSteps:
+    def test_get_steps__registered_sub_steps(self) -> None:
+        steps = UpgradeTo0902.get_steps()
+        assert [step.name for step in steps] == [
+            "UpgradeTo0902._upgrade_storage_clusters",
+            "UpgradeTo0902._upgrade_storage_series",
+            "UpgradeTo0902._upgrade_hydro",
+        ]
+        # the sub-steps are independent, and declared in the upgrade method manifest
+        assert build_dependencies(steps) == (frozenset(), frozenset(), frozenset())
+        for step in steps:
+            assert all(any(f == d or f.startswith(f"{d}/") for d in UpgradeTo0902.files) for f in step.files)
+
+    def test_get_steps__default_step(self) -> None:
+        steps = UpgradeTo0808.get_steps()
+        assert [step.name for step in steps] == ["UpgradeTo0808"]
+        assert steps[0].files == ("input/st-storage/clusters",)
+
+    def test_get_steps__no_step(self) -> None:
+        # only the `generaldata.ini` file is upgraded
+        assert UpgradeTo0903.get_steps() == ()
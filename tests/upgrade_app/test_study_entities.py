@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from antares.study.version.upgrade_app.study_entities import Area, Cluster
+from antares.study.version.upgrade_app.study_session import StudySession
+
+
+def _make_files(root: Path, files: dict[str, str]) -> None:
+    for relpath, content in files.items():
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+class TestStudyEntities:
+    def test_areas__loaded_once(self, tmp_path: Path) -> None:
+        _make_files(tmp_path, {"input/areas/list.txt": "FR\nDE (Berlin)\nIT*\n"})
+        entities = StudySession(tmp_path).entities
+        assert list(entities.areas.values()) == [
+            Area("fr", "FR"),
+            Area("de (berlin)", "DE (Berlin)"),
+            Area("it", "IT*"),
+        ]
+
+        tmp_path.joinpath("input/areas/list.txt").write_text("ES\n")
+        assert list(entities.areas) == ["fr", "de (berlin)", "it"]
+
+    def test_area_dirs(self, tmp_path: Path) -> None:
+        # the area folders may differ from the list of areas
+        _make_files(
+            tmp_path, {"input/areas/list.txt": "FR\nDE\n", "input/areas/fr/ui.ini": "", "input/areas/it/ui.ini": ""}
+        )
+        entities = StudySession(tmp_path).entities
+        assert entities.get_area_dirs() == ["fr", "it"]
+
+    def test_links_and_clusters(self, tmp_path: Path) -> None:
+        _make_files(
+            tmp_path,
+            {
+                "input/links/de/properties.ini": "",
+                "input/links/fr/properties.ini": "",
+                "input/links/fr/de.txt": "",
+                "input/thermal/clusters/fr/list.ini": "[Nuclear 1]\ngroup = nuclear\n[gas*]\ngroup = gas\n",
+                "input/thermal/clusters/de/list.ini": "",
+                "input/thermal/clusters/it/readme.txt": "",
+            },
+        )
+        session = StudySession(tmp_path)
+        entities = session.entities
+        assert entities.get_link_areas() == ["de", "fr"]
+        assert entities.get_cluster_areas("thermal") == ["de", "fr"]
+        assert entities.get_cluster_areas("st-storage") == []
+        assert entities.get_clusters("thermal", "fr") == {
+            "nuclear 1": Cluster("fr", "nuclear 1", "Nuclear 1"),
+            "gas": Cluster("fr", "gas", "gas*"),
+        }
+
+        # the clusters created by a previous step are taken into account
+        session.tree.mkdir("input/st-storage/clusters/fr")
+        session.tree.touch(entities.get_clusters_ini("st-storage", "fr"))
+        assert entities.get_cluster_areas("st-storage") == ["fr"]
@@ -0,0 +1,62 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from antares.study.version.upgrade_app.exceptions import StudyLockedError
+from antares.study.version.upgrade_app.study_lock import StudyLock, get_lock_path
+
+
+def test_get_lock_path(tmp_path: Path) -> None:
+    study_dir = tmp_path.joinpath("my-study")
+    assert get_lock_path(study_dir) == tmp_path.joinpath("~my-study.upgrade.lock")
+
+
+class TestStudyLock:
+    def test_acquire_and_release(self, tmp_path: Path) -> None:
+        study_dir = tmp_path.joinpath("my-study")
+        study_dir.mkdir()
+        with StudyLock(study_dir) as lock:
+            assert lock.locked
+            assert lock.lock_path.is_file()
+        assert not lock.locked
+        # the lock file is removed
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+    def test_try_lock(self, tmp_path: Path) -> None:
+        study_dir = tmp_path.joinpath("my-study")
+        study_dir.mkdir()
+        with StudyLock(study_dir):
+            with pytest.raises(StudyLockedError, match="locked by another upgrade"):
+                StudyLock(study_dir, timeout=0).acquire()
+        # the lock can be acquired once released
+        with StudyLock(study_dir, timeout=0):
+            pass
+
+    def test_timeout(self, tmp_path: Path) -> None:
+        study_dir = tmp_path.joinpath("my-study")
+        study_dir.mkdir()
+        with StudyLock(study_dir):
+            start = time.monotonic()
+            with pytest.raises(StudyLockedError):
+                StudyLock(study_dir, timeout=0.2, poll_interval=0.05).acquire()
+            assert time.monotonic() - start >= 0.2
+
+    def test_wait(self, tmp_path: Path) -> None:
+        study_dir = tmp_path.joinpath("my-study")
+        study_dir.mkdir()
+        lock = StudyLock(study_dir)
+        lock.acquire()
+        timer = threading.Timer(0.1, lock.release)
+        timer.start()
+        try:
+            with StudyLock(study_dir, timeout=10, poll_interval=0.02) as other:
+                assert other.locked
+                assert not lock.locked
+        finally:
+            timer.join()
+
+    def test_invalid_timeout(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="timeout"):
+            StudyLock(tmp_path, timeout=-1)
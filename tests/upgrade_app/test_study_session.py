@@ -0,0 +1,77 @@
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from antares.study.version.ini_reader import IniReader
+from antares.study.version.upgrade_app.study_session import StudySession
+
+
+class TestStudySession:
+    def test_read_ini__cached(self, tmp_path: Path) -> None:
+        ini_path = tmp_path / "input" / "hydro" / "hydro.ini"
+        ini_path.parent.mkdir(parents=True)
+        ini_path.write_text("[inter-daily-breakdown]\nfr = 1\n")
+
+        session = StudySession(tmp_path)
+        data = session.read_ini("input/hydro/hydro.ini")
+        assert data == {"inter-daily-breakdown": {"fr": 1}}
+
+        # the file is not read again: the cached document is returned
+        ini_path.write_text("[inter-daily-breakdown]\nfr = 2\n")
+        assert session.read_ini("input/hydro/hydro.ini") is data
+
+    def test_flush__only_dirty_documents(self, tmp_path: Path) -> None:
+        (tmp_path / "a.ini").write_text("[a]\nkey = 1\n")
+        (tmp_path / "b.ini").write_text("[b]\nkey = 1\n")
+
+        session = StudySession(tmp_path)
+        session.read_ini("a.ini")["a"]["key"] = 2
+        data = session.read_ini("b.ini")
+        data["b"]["key"] = 2
+        session.write_ini("b.ini", data)
+        session.write_ini("sub/c.ini", {"c": {"key": 3}})
+        assert session.dirty_files == ["b.ini", "sub/c.ini"]
+
+        session.flush()
+        assert session.dirty_files == []
+        assert IniReader().read(tmp_path / "a.ini") == {"a": {"key": 1}}
+        assert IniReader().read(tmp_path / "b.ini") == {"b": {"key": 2}}
+        assert IniReader().read(tmp_path / "sub/c.ini") == {"c": {"key": 3}}
+
+    def test_general_data(self, tmp_path: Path) -> None:
+        ini_path = tmp_path / "settings" / "generaldata.ini"
+        ini_path.parent.mkdir(parents=True)
+        ini_path.write_text("[variables selection]\nselect_var + = a\nselect_var + = b\n")
+
+        session = StudySession(tmp_path)
+        data = session.general_data
+        assert session.general_data is data
+        assert data["variables selection"]["select_var +"] == ["a", "b"]
+
+        data["variables selection"]["select_var +"].append("c")
+        session.mark_dirty("settings/generaldata.ini")
+        session.flush()
+        assert ini_path.read_text().splitlines()[:4] == [
+            "[variables selection]",
+            "select_var + = a",
+            "select_var + = b",
+            "select_var + = c",
+        ]
+
+    @pytest.mark.parametrize("jobs", [None, 1, 4])
+    def test_map(self, tmp_path: Path, jobs: t.Optional[int]) -> None:
+        session = StudySession(tmp_path, jobs=jobs)
+        assert session.map(lambda x: x * 2, range(10)) == [x * 2 for x in range(10)]
+        if jobs is not None:
+            assert session.get_max_workers() == session.get_max_workers(cpu_bound=True) == jobs
+
+    def test_map__first_error_is_raised(self, tmp_path: Path) -> None:
+        def check(value: int) -> int:
+            if value % 3 == 2:
+                raise ValueError(f"invalid value: {value}")
+            return value
+
+        session = StudySession(tmp_path, jobs=4)
+        with pytest.raises(ValueError, match="invalid value: 2"):
+            session.map(check, range(10))
@@ -0,0 +1,77 @@
+import collections
+import os
+import typing as t
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from antares.study.version.upgrade_app.study_tree import StudyTree
+
+
+def _make_files(root: Path, *relpaths: str) -> None:
+    for relpath in relpaths:
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relpath)
+
+
+class TestStudyTree:
+    def test_scan__each_directory_listed_once(self, tmp_path: Path) -> None:
+        _make_files(tmp_path, "input/links/fr/de.txt", "input/links/fr/it.txt", "input/links/de/properties.ini")
+        calls: collections.Counter[str] = collections.Counter()
+        original_scandir = os.scandir
+
+        def scandir(path: Path) -> t.Any:
+            calls[Path(path).relative_to(tmp_path).as_posix()] += 1
+            return original_scandir(path)
+
+        tree = StudyTree(tmp_path)
+        with mock.patch("os.scandir", scandir):
+            tree.scan("input/links", "input/links/fr", "input/missing")
+            assert tree.glob("input/links/*") == ["input/links/de", "input/links/fr"]
+            assert tree.glob("input/links/*/*.txt") == ["input/links/fr/de.txt", "input/links/fr/it.txt"]
+            assert tree.exists("input/links/de/properties.ini")
+            assert tree.is_dir("input/links/fr")
+            assert not tree.exists("input/links/fr/de.txt.link")
+            assert not tree.exists("input/missing/foo.txt")
+
+        assert set(calls) == {".", "input", "input/links", "input/links/fr", "input/links/de"}
+        assert max(calls.values()) == 1
+
+    def test_get__size_and_mtime(self, tmp_path: Path) -> None:
+        _make_files(tmp_path, "input/bindingconstraints/bc_1.txt")
+        tmp_path.joinpath("input/bindingconstraints/bc_2.txt").touch()
+        tree = StudyTree(tmp_path)
+        entry = tree.get("input/bindingconstraints/bc_1.txt")
+        assert entry is not None
+        assert entry.name == "bc_1.txt"
+        assert entry.size == len("input/bindingconstraints/bc_1.txt")
+        assert entry.mtime == tmp_path.joinpath("input/bindingconstraints/bc_1.txt").stat().st_mtime
+        assert tree.get("input/bindingconstraints/bc_2.txt").size == 0  # type: ignore
+        assert tree.get("input/bindingconstraints/bc_3.txt") is None
+
+    def test_mutations__recorded(self, tmp_path: Path) -> None:
+        _make_files(tmp_path, "input/bindingconstraints/bc_1.txt")
+        tree = StudyTree(tmp_path)
+        tree.scan("input")
+
+        tree.mkdir("input/st-storage/clusters/fr")
+        tree.touch("input/st-storage/clusters/fr/list.ini")
+        tmp_path.joinpath("input/bindingconstraints/bc_1_lt.txt").write_text("1")
+        tree.record("input/bindingconstraints/bc_1_lt.txt")
+        tree.unlink("input/bindingconstraints/bc_1.txt")
+
+        with mock.patch("os.scandir", side_effect=AssertionError("unexpected scan")):
+            assert tree.glob("input/st-storage/clusters/*/list.ini") == ["input/st-storage/clusters/fr/list.ini"]
+            assert tree.glob("input/bindingconstraints/*.txt") == ["input/bindingconstraints/bc_1_lt.txt"]
+            assert tree.listdir("input/st-storage/clusters/fr")[0].name == "list.ini"
+
+        # the index is consistent with the file system
+        other = StudyTree(tmp_path)
+        for pattern in ["input/*", "input/*/*", "input/*/*/*", "input/*/*/*/*"]:
+            assert tree.glob(pattern) == other.glob(pattern)
+
+    def test_glob__recursive_pattern(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="Recursive patterns"):
+            StudyTree(tmp_path).glob("input/**/*.txt")
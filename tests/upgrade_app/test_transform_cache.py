@@ -0,0 +1,65 @@
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from antares.study.version import StudyVersion
+from antares.study.version.upgrade_app import UpgradeApp, upgrader_0807
+from antares.study.version.upgrade_app.transform_cache import TransformCache
+from tests.helpers import DEFAULT_IGNORES, are_same_dir
+
+HERE = Path(__file__).resolve().parent
+LITTLE_STUDY_0806 = HERE / "upgrade_0807" / "nominal_case" / "little_study_0806.zip"
+
+
+class TestTransformCache:
+    def test_get_key(self, tmp_path: Path) -> None:
+        src_path1 = tmp_path / "src1.txt"
+        src_path1.write_text("1\t2\t3\n")
+        src_path2 = tmp_path / "src2.txt"
+        src_path2.write_text("1\t2\t3\n")
+        # the key depends on the content and on the transformation name, not on the path
+        key = TransformCache.get_key("split", src_path1)
+        assert TransformCache.get_key("split", src_path2) == key
+        assert TransformCache.get_key("other", src_path1) != key
+        src_path2.write_text("4\t5\t6\n")
+        assert TransformCache.get_key("split", src_path2) != key
+
+    def test_store_and_restore(self, tmp_path: Path) -> None:
+        cache = TransformCache(tmp_path / "cache")
+        src_dir = tmp_path.joinpath("src")
+        src_dir.mkdir()
+        outputs = {"lt": src_dir / "lt.txt", "gt": src_dir / "gt.txt"}
+        outputs["lt"].write_text("lt")
+        outputs["gt"].write_text("gt")
+
+        dst_dir = tmp_path.joinpath("dst")
+        dst_dir.mkdir()
+        restored = {"lt": dst_dir / "lt.txt", "gt": dst_dir / "gt.txt"}
+        assert not cache.restore("abcdef", restored)
+        cache.store("abcdef", outputs)
+        cache.store("abcdef", outputs)  # already stored
+        assert cache.restore("abcdef", restored)
+        assert restored["lt"].read_text() == "lt"
+        assert restored["gt"].read_text() == "gt"
+        # no temporary directory is left, and the cached files are not shared with the study
+        assert [p.name for p in tmp_path.joinpath("cache/ab").iterdir()] == ["abcdef"]
+        assert not restored["lt"].samefile(outputs["lt"])
+
+    def test_upgrade__cache_is_shared_by_studies(self, tmp_path: Path) -> None:
+        cache_dir = tmp_path / "cache"
+        study_dirs = []
+        for name in ["variant_1", "variant_2"]:
+            study_dir = tmp_path / name
+            with zipfile.ZipFile(LITTLE_STUDY_0806) as zf:
+                zf.extractall(study_dir)
+            study_dirs.append(study_dir)
+
+        with mock.patch.object(upgrader_0807, "_split_terms", wraps=upgrader_0807._split_terms) as split_terms:
+            UpgradeApp(study_dirs[0], version=StudyVersion(8, 7), cache_dir=cache_dir)()
+            assert split_terms.call_count == 1
+            UpgradeApp(study_dirs[1], version=StudyVersion(8, 7), cache_dir=cache_dir)()
+            assert split_terms.call_count == 1  # cache hit
+
+        assert are_same_dir(study_dirs[0], study_dirs[1], ignore=DEFAULT_IGNORES | {"study.antares"})
+        assert study_dirs[1].joinpath("input/bindingconstraints/binding_1_lt.txt").is_file()
+        assert not study_dirs[1].joinpath("input/bindingconstraints/binding_1.txt").exists()
@@ -1,4 +1,9 @@
+from pathlib import Path
+
+import pytest
+
 from antares.study.version.ini_reader import IniReader
+from antares.study.version.upgrade_app.study_session import StudySession
 from antares.study.version.upgrade_app.upgrader_0801 import UpgradeTo0801
 from tests.conftest import StudyAssets
 from tests.helpers import are_same_dir
@@ -26,3 +31,28 @@ def test_nominal_case(study_assets: StudyAssets):
         study_assets.study_dir.joinpath("input"),
         study_assets.expected_dir.joinpath("input"),
     )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param("[Gas]\nname = Gas\n\n[Coal]\nname = Coal\ngroup = Other\n", id="missing-groups"),
+        pytest.param("[Gas]\nname = Gas\ngroup = 1\n\n[Coal]\nname = Coal\n", id="non-string-groups"),
+        pytest.param("[Gas]\nname = Gas\ngroup = nan\n\n[Coal]\nname = Coal\ngroup = nan\n", id="all-nan-groups"),
+    ],
+)
+def test_thermal_groups__not_strings(tmp_path: Path, content: str) -> None:
+    """
+    Check that the thermal groups which are missing or are not strings are left unchanged.
+    """
+    list_ini = tmp_path / "input/thermal/clusters/fr/list.ini"
+    list_ini.parent.mkdir(parents=True)
+    list_ini.write_text(content)
+
+    session = StudySession(tmp_path)
+    UpgradeTo0801.upgrade_files(session)
+    session.flush()
+
+    # the values are compared as text, since NaN != NaN
+    expected = content.replace("group = Other", "group = other 1")
+    assert list_ini.read_text().split() == expected.split()
@@ -1,8 +1,13 @@
+import zipfile
+from pathlib import Path
+
 from antares.study.version.ini_reader import IniReader
 from antares.study.version.upgrade_app.upgrader_0803 import UpgradeTo0803
 from tests.conftest import StudyAssets
 from tests.helpers import are_same_dir
 
+STUDY_ZIP = Path(__file__).parent / "upgrade_0803/nominal_case/little_study_0802.zip"
+
 
 def test_nominal_case(study_assets: StudyAssets):
     """
@@ -23,3 +28,19 @@ def test_nominal_case(study_assets: StudyAssets):
     actual_area_path = study_assets.study_dir.joinpath("input/areas")
     expected_area_path = study_assets.expected_dir.joinpath("input/areas")
     assert are_same_dir(actual_area_path, expected_area_path)
+
+
+def test_areas_from_folders(tmp_path: Path) -> None:
+    """
+    Check that the adequacy patch is created for the area folders, not for the areas of `list.txt`.
+    """
+    study_dir = tmp_path / "little_study_0802"
+    with zipfile.ZipFile(STUDY_ZIP) as zf:
+        zf.extractall(study_dir)
+    study_dir.joinpath("input/areas/list.txt").write_text("at\nbe\nfr\nghost\n")
+    study_dir.joinpath("input/areas/extra").mkdir()
+
+    UpgradeTo0803.upgrade(study_dir)
+
+    assert study_dir.joinpath("input/areas/extra/adequacy_patch.ini").is_file()
+    assert not study_dir.joinpath("input/areas/ghost").exists()
@@ -1,9 +1,14 @@
+import zipfile
+from pathlib import Path
+
 from antares.study.version.ini_reader import IniReader
 from antares.study.version.model.general_data import GeneralData
 from antares.study.version.upgrade_app.upgrader_0902 import UpgradeTo0902
 from tests.conftest import StudyAssets
 from tests.helpers import are_same_dir
 
+STUDY_ZIP = Path(__file__).parent / "upgrade_0902/nominal_case/little_study_0900.zip"
+
 
 def test_nominal_case(study_assets: StudyAssets):
     """
@@ -29,3 +34,18 @@ def test_nominal_case(study_assets: StudyAssets):
     actual_input_path = study_assets.study_dir / "input" / "st-storage"
     expected_input_path = study_assets.expected_dir / "input" / "st-storage"
     assert are_same_dir(actual_input_path, expected_input_path)
+
+
+def test_hydro__areas_from_folders(tmp_path: Path) -> None:
+    """
+    Check that the hydro sections are written for the area folders, not for the areas of `list.txt`.
+    """
+    study_dir = tmp_path / "little_study_0900"
+    with zipfile.ZipFile(STUDY_ZIP) as zf:
+        zf.extractall(study_dir)
+    study_dir.joinpath("input/areas/list.txt").write_text("area_1\narea_2\nghost\n")
+
+    UpgradeTo0902.upgrade(study_dir)
+
+    hydro_ini = IniReader().read(study_dir / "input" / "hydro" / "hydro.ini")
+    assert set(hydro_ini["overflow spilled cost difference"]) == {"area_1", "area_2", "area_3"}
@@ -0,0 +1,549 @@
+import collections
+import zipfile
+from pathlib import Path, PurePath
+from unittest import mock
+
+import pytest
+
+from antares.study.version import StudyVersion
+from antares.study.version.create_app import CreateApp
+from antares.study.version.exceptions import ApplicationError
+from antares.study.version.ini_reader import IniReader
+from antares.study.version.ini_writer import IniWriter
+from antares.study.version.model.study_antares import StudyAntares
+from antares.study.version.file_utils import is_under
+from antares.study.version.upgrade_app import (
+    MultiVersionUpgradeApp,
+    UpgradeApp,
+    ZipUpgradeApp,
+    filter_out_child_files,
+    upgrader_0807,
+)
+from antares.study.version.upgrade_app.cluster_table import ClusterTable
+from antares.study.version.upgrade_app.events import (
+    BACKUP_FINISHED,
+    BACKUP_STARTED,
+    COMMITTED,
+    ENTITY_PROGRESS,
+    PLAN_COMPUTED,
+    ROLLED_BACK,
+    STEP_FINISHED,
+    STEP_STARTED,
+    UPGRADE_FAILED,
+    UPGRADE_FINISHED,
+    UPGRADE_STARTED,
+    UpgradeEvent,
+)
+from antares.study.version.upgrade_app.exceptions import (
+    InsufficientSpaceError,
+    MatrixNotFoundError,
+    StudyLockedError,
+    UnexpectedMatrixLinksError,
+    UpgradePreconditionError,
+)
+from antares.study.version.upgrade_app.matrix_resolver import DirectoryMatrixStore
+from antares.study.version.upgrade_app.scenario_mapping import scenarios
+from antares.study.version.upgrade_app.study_lock import StudyLock
+
+from tests.helpers import DEFAULT_IGNORES, are_same_dir
+
+HERE = Path(__file__).resolve().parent
+LITTLE_STUDY_0806 = HERE / "upgrade_0807" / "nominal_case" / "little_study_0806.zip"
+
+
+def _extract_study(zip_path: Path, tmp_path: Path) -> Path:
+    study_dir = tmp_path.joinpath(zip_path.stem)
+    with zipfile.ZipFile(zip_path) as zf:
+        zf.extractall(study_dir)
+    return study_dir
+
+
+def _create_study(tmp_path: Path, version: str) -> Path:
+    study_dir = tmp_path.joinpath("my-study")
+    app = CreateApp(study_dir=study_dir, caption="My Study", version=StudyVersion.parse(version), author="John Doe")
+    app()
+    return study_dir
+
+
+class TestUpgradeApp:
+    def test_ini_files__read_and_written_once(self, tmp_path: Path) -> None:
+        study_dir = _extract_study(LITTLE_STUDY_0806, tmp_path)
+        reads: collections.Counter[str] = collections.Counter()
+        writes: collections.Counter[str] = collections.Counter()
+
+        def read(self: IniReader, path: Path, **kwargs: object) -> dict[str, object]:
+            reads[Path(path).relative_to(study_dir).as_posix()] += 1
+            return original_read(self, path, **kwargs)
+
+        def write(self: IniWriter, data: dict[str, object], path: Path) -> None:
+            writes[Path(path).relative_to(study_dir).as_posix()] += 1
+            original_write(self, data, path)
+
+        original_read, original_write = IniReader.read, IniWriter.write
+        with mock.patch.object(IniReader, "read", read), mock.patch.object(IniWriter, "write", write):
+            app = UpgradeApp(study_dir, version=StudyVersion(9, 3))
+            app()
+
+        # generaldata.ini is upgraded by 0902 and 0903
+        assert reads["settings/generaldata.ini"] == 1
+        assert writes["settings/generaldata.ini"] == 1
+        # st-storage clusters are upgraded by 0808 and 0902
+        for area_id in ["area_1", "area_2", "area_3"]:
+            assert reads[f"input/st-storage/clusters/{area_id}/list.ini"] == 1
+            assert writes[f"input/st-storage/clusters/{area_id}/list.ini"] == 1
+
+        sections = IniReader().read(study_dir / "input/st-storage/clusters/area_1/list.ini")
+        assert sections == {}
+        data = IniReader().read(study_dir / "settings/generaldata.ini")
+        assert data["adequacy patch"]["redispatch"] is False
+        assert "enable-first-step" not in data["adequacy patch"]
+
+    def test_rollback__created_files_are_removed(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        general_data = study_dir.joinpath("settings/generaldata.ini").read_text()
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7))
+        # the thermal clusters are upgraded by 0807, after the creation of the 8.6 folders
+        with mock.patch.object(ClusterTable, "load", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError, match="boom"):
+                app()
+
+        # the 8.6 upgrade may have been run concurrently: the created folders must be removed
+        assert not study_dir.joinpath("input/st-storage").exists()
+        assert study_dir.joinpath("settings/generaldata.ini").read_text() == general_data
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+    def test_preflight__matrix_links(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        study_dir.joinpath("input/bindingconstraints/bc_1.txt.link").write_text("matrix-id")
+        general_data = study_dir.joinpath("settings/generaldata.ini").read_text()
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7))
+        with mock.patch.object(UpgradeApp, "_copies_only_necessary_files") as copies:
+            with pytest.raises(UnexpectedMatrixLinksError):
+                app()
+
+        # the study is checked before any backup copy is made
+        copies.assert_not_called()
+        assert not study_dir.joinpath("input/st-storage").exists()
+        assert study_dir.joinpath("settings/generaldata.ini").read_text() == general_data
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+    def test_matrix_links__resolved(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        store_dir = tmp_path.joinpath("matrix-store")
+        store_dir.mkdir()
+        store_dir.joinpath("bc-matrix.tsv").write_text("1\t2\t3\n4\t5\t6\n")
+        study_dir.joinpath("input/bindingconstraints/bc_1.txt.link").write_text("matrix://bc-matrix\n")
+        # the links of the matrices which are not changed by the upgrade are left unchanged
+        load_link = study_dir.joinpath("input/load/series/load_fr.txt.link")
+        load_link.write_text("matrix://load-matrix")
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7), matrix_resolver=DirectoryMatrixStore(store_dir))
+        app()
+
+        bc_dir = study_dir.joinpath("input/bindingconstraints")
+        assert not bc_dir.joinpath("bc_1.txt.link").exists()
+        assert not bc_dir.joinpath("bc_1.txt").exists()
+        assert bc_dir.joinpath("bc_1_lt.txt").read_text() == "1.000000\n4.000000\n"
+        assert bc_dir.joinpath("bc_1_eq.txt").read_text() == "3.000000\n6.000000\n"
+        assert load_link.read_text() == "matrix://load-matrix"
+
+    def test_matrix_links__kept(self, tmp_path: Path) -> None:
+        store = DirectoryMatrixStore(tmp_path.joinpath("matrix-store"))
+        bc_link = store.write_matrix(b"1\t2\t3\n4\t5\t6\n")
+        study_dirs = [_create_study(tmp_path.joinpath(name), "8.5") for name in ["study-a", "study-b"]]
+        for study_dir in study_dirs:
+            study_dir.joinpath("input/bindingconstraints/bc_1.txt.link").write_text(bc_link)
+
+        with mock.patch.object(upgrader_0807, "_split_terms", wraps=upgrader_0807._split_terms) as split_terms:
+            for study_dir in study_dirs:
+                app = UpgradeApp(study_dir, version=StudyVersion(8, 7), matrix_resolver=store, keep_matrix_links=True)
+                app()
+
+        # the matrices shared by the studies are transformed once, in the matrix store
+        assert split_terms.call_count == 1
+        for study_dir in study_dirs:
+            bc_dir = study_dir.joinpath("input/bindingconstraints")
+            assert not bc_dir.joinpath("bc_1.txt.link").exists()
+            assert not bc_dir.joinpath("bc_1_lt.txt").exists()
+            lt_link = bc_dir.joinpath("bc_1_lt.txt.link").read_text()
+            assert store.read_matrix(lt_link) == b"1.000000\n4.000000\n"
+            assert store.read_matrix(bc_dir.joinpath("bc_1_eq.txt.link").read_text()) == b"3.000000\n6.000000\n"
+
+    def test_matrix_links__kept_without_store(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        with pytest.raises(ValueError, match="matrix store"):
+            UpgradeApp(study_dir, version=StudyVersion(8, 7), keep_matrix_links=True)
+
+    def test_preflight__matrix_not_found(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        store_dir = tmp_path.joinpath("matrix-store")
+        store_dir.mkdir()
+        study_dir.joinpath("input/bindingconstraints/bc_1.txt.link").write_text("matrix://missing")
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7), matrix_resolver=DirectoryMatrixStore(store_dir))
+        with mock.patch.object(UpgradeApp, "_copies_only_necessary_files") as copies:
+            with pytest.raises(MatrixNotFoundError, match="missing"):
+                app()
+
+        copies.assert_not_called()
+        assert study_dir.joinpath("input/bindingconstraints/bc_1.txt.link").exists()
+        assert sorted(tmp_path.iterdir()) == [store_dir, study_dir]
+
+    def test_locked_study(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7), lock_timeout=0)
+        with StudyLock(study_dir):
+            with pytest.raises(StudyLockedError):
+                app()
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion(8, 5)
+
+        # the study is read again once locked: it may have been upgraded meanwhile
+        assert app.study_antares.version == StudyVersion(8, 5)
+        UpgradeApp(study_dir, version=StudyVersion(8, 6))()
+        with app.lock():
+            assert app.study_antares.version == StudyVersion(8, 6)
+            app()
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion(8, 7)
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+    def test_events(self, tmp_path: Path) -> None:
+        study_dir = _extract_study(LITTLE_STUDY_0806, tmp_path)
+        events: list[UpgradeEvent] = []
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7), on_event=events.append)
+        app()
+
+        kinds = [e.kind for e in events if e.kind not in {STEP_STARTED, STEP_FINISHED, ENTITY_PROGRESS}]
+        assert kinds == [
+            UPGRADE_STARTED,
+            PLAN_COMPUTED,
+            BACKUP_STARTED,
+            BACKUP_FINISHED,
+            COMMITTED,
+            UPGRADE_FINISHED,
+        ]
+        assert events[1].size > 0
+        assert events[2].size == events[1].size
+        progress = [e for e in events if e.kind == ENTITY_PROGRESS]
+        assert progress and progress[-1].name == "UpgradeTo0807.binding_constraints"
+        assert progress[-1].done == progress[-1].total
+        assert events[-1].to_dict()["study_dir"] == str(study_dir)
+
+    def test_events__rollback(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+        events: list[UpgradeEvent] = []
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7), on_event=events.append)
+        with mock.patch.object(ClusterTable, "load", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError, match="boom"):
+                app()
+
+        assert [e.kind for e in events[-2:]] == [ROLLED_BACK, UPGRADE_FAILED]
+        assert events[-1].name == "boom"
+
+    @pytest.mark.parametrize("kind", [ENTITY_PROGRESS, COMMITTED, UPGRADE_FINISHED])
+    def test_events__callback_error_ignored(self, tmp_path: Path, kind: str) -> None:
+        study_dir = _extract_study(LITTLE_STUDY_0806, tmp_path)
+
+        def on_event(event: UpgradeEvent) -> None:
+            if event.kind == kind:
+                raise RuntimeError("buggy progress printer")
+
+        UpgradeApp(study_dir, version=StudyVersion(8, 7), on_event=on_event)()
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion(8, 7)
+
+    def test_events__callback_error_interrupts(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.5")
+
+        def on_event(event: UpgradeEvent) -> None:
+            if event.kind == STEP_FINISHED:
+                raise RuntimeError("stop")
+
+        with pytest.raises(RuntimeError, match="stop"):
+            UpgradeApp(study_dir, version=StudyVersion(8, 7), on_event=on_event)()
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion(8, 5)
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+    def test_preflight__invalid_general_data(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.3")
+        ini_path = study_dir.joinpath("settings/generaldata.ini")
+        data = IniReader().read(ini_path)
+        data["optimization"]["transmission-capacities"] = "foo"
+        IniWriter().write(data, ini_path)
+        general_data = ini_path.read_text()
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 4))
+        with mock.patch.object(UpgradeApp, "_copies_only_necessary_files") as copies:
+            with pytest.raises(UpgradePreconditionError, match="transmission-capacities"):
+                app()
+
+        copies.assert_not_called()
+        assert ini_path.read_text() == general_data
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+    def test_preflight__insufficient_space(self, tmp_path: Path) -> None:
+        study_dir = _extract_study(LITTLE_STUDY_0806, tmp_path)
+
+        app = UpgradeApp(study_dir, version=StudyVersion(9, 3))
+        with mock.patch("shutil.disk_usage", return_value=mock.Mock(free=1024)):
+            with mock.patch.object(UpgradeApp, "_copies_only_necessary_files") as copies:
+                with pytest.raises(InsufficientSpaceError):
+                    app()
+
+        copies.assert_not_called()
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion(8, 6)
+
+    def test_plan(self, tmp_path: Path) -> None:
+        study_dir = _extract_study(LITTLE_STUDY_0806, tmp_path)
+        before = {p: p.stat().st_mtime_ns for p in study_dir.rglob("*")}
+
+        app = UpgradeApp(study_dir, version=StudyVersion(9, 3))
+        report = app.plan()
+
+        # nothing is changed
+        assert {p: p.stat().st_mtime_ns for p in study_dir.rglob("*")} == before
+        assert list(tmp_path.iterdir()) == [study_dir]
+
+        step_names = [step.name for step in report.steps]
+        assert step_names[0] == "settings/generaldata.ini"
+        assert step_names[-1] == "study.antares"
+        assert [step.name for step in app.upgrade_plan.steps] == step_names[1:-1]
+        steps = {step.name: step for step in report.steps}
+        hydro = steps["UpgradeTo0902._upgrade_hydro"]
+        assert "input/areas/list.txt" in hydro.reads
+        assert hydro.writes == ("input/hydro/hydro.ini",)
+        assert "input/bindingconstraints/bindingconstraints.ini" in steps["UpgradeTo0807"].writes
+
+        backup_size = sum(
+            p.stat().st_size
+            for relpath in report.backup_files
+            for p in [study_dir / relpath, *study_dir.joinpath(relpath).rglob("*")]
+            if p.is_file()
+        )
+        assert report.backup_size == backup_size > 0
+        assert report.has_enough_space
+        assert report.estimated_duration > 0
+        assert str(report).startswith("Upgrade Study v8.6 -> v9.3")
+
+    def test_plan__version_bump_only(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.8")
+        report = UpgradeApp(study_dir, version=StudyVersion(9, 0)).plan()
+        assert [step.name for step in report.steps] == ["study.antares"]
+        assert report.backup_files == ()
+        assert report.backup_size == 0
+
+    @pytest.mark.parametrize("src_version, dst_version", [("7.1", "7.2"), ("8.8", "9.0")])
+    def test_version_bump_only(self, tmp_path: Path, src_version: str, dst_version: str) -> None:
+        study_dir = _create_study(tmp_path, src_version)
+        app = UpgradeApp(study_dir, version=StudyVersion.parse(dst_version))
+        assert app.upgrade_plan.is_version_bump_only
+
+        with mock.patch("tempfile.TemporaryDirectory") as temporary_directory:
+            app()
+        temporary_directory.assert_not_called()
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion.parse(dst_version)
+        # no temporary file is left
+        assert sorted(p.name for p in tmp_path.iterdir()) == [study_dir.name]
+        assert not list(study_dir.glob("~*"))
+
+    def test_output_dir(self, tmp_path: Path) -> None:
+        study_dir = _extract_study(LITTLE_STUDY_0806, tmp_path / "src")
+        original_dir = _extract_study(LITTLE_STUDY_0806, tmp_path / "original")
+        output_dir = tmp_path / "output" / "upgraded"
+
+        app = UpgradeApp(study_dir, version=StudyVersion(9, 3), output_dir=output_dir)
+        with mock.patch.object(UpgradeApp, "_copies_only_necessary_files") as copies:
+            app()
+
+        # no backup is made, and the study is left unchanged
+        copies.assert_not_called()
+        assert are_same_dir(study_dir, original_dir)
+        assert sorted(output_dir.parent.iterdir()) == [output_dir]
+
+        # the upgraded study is the same as the one upgraded in place
+        UpgradeApp(original_dir, version=StudyVersion(9, 3))()
+        assert are_same_dir(output_dir, original_dir, ignore=DEFAULT_IGNORES | {"study.antares"})
+        assert StudyAntares.from_ini_file(output_dir).version == StudyVersion(9, 3)
+
+        # the files which are not concerned by the upgrade are shared, the other ones are copied
+        assert study_dir.joinpath("input/areas/list.txt").samefile(output_dir.joinpath("input/areas/list.txt"))
+        relpath = "input/st-storage/clusters/area_1/list.ini"
+        assert not study_dir.joinpath(relpath).samefile(output_dir.joinpath(relpath))
+
+        with pytest.raises(FileExistsError):
+            UpgradeApp(study_dir, version=StudyVersion(9, 3), output_dir=output_dir)()
+
+    def test_output_dir__error(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path / "src", "8.5")
+        output_dir = tmp_path / "output" / "upgraded"
+
+        app = UpgradeApp(study_dir, version=StudyVersion(8, 7), output_dir=output_dir)
+        with mock.patch.object(ClusterTable, "load", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError, match="boom"):
+                app()
+
+        # the temporary directory is removed, and the output directory is not created
+        assert list(output_dir.parent.iterdir()) == []
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion(8, 5)
+        assert not study_dir.joinpath("input/st-storage").exists()
+
+    def test_version_bump_only__not_in_chain(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.7")
+        assert not UpgradeApp(study_dir, version=StudyVersion(9, 0)).upgrade_plan.is_version_bump_only
+
+
+class TestMultiVersionUpgradeApp:
+    def test_nominal_case(self, tmp_path: Path) -> None:
+        study_dir = _extract_study(LITTLE_STUDY_0806, tmp_path / "src")
+        original_dir = _extract_study(LITTLE_STUDY_0806, tmp_path / "original")
+        output_dir = tmp_path / "output"
+
+        app = MultiVersionUpgradeApp(study_dir, versions=["9.3", "8.8"], output_dir=output_dir)
+        snapshot_dirs = app()
+
+        assert snapshot_dirs == [output_dir / "little_study_0806-v8.8", output_dir / "little_study_0806-v9.3"]
+        assert sorted(output_dir.iterdir()) == snapshot_dirs
+        # the study is left unchanged
+        assert are_same_dir(study_dir, original_dir)
+        assert StudyAntares.from_ini_file(study_dir).version == StudyVersion(8, 6)
+
+        # the snapshots are the same as the ones of a simple upgrade
+        ignore = DEFAULT_IGNORES | {"study.antares"}
+        for snapshot_dir in snapshot_dirs:
+            version = StudyAntares.from_ini_file(snapshot_dir).version
+            expected_dir = _extract_study(LITTLE_STUDY_0806, tmp_path / f"expected-{version:ddd}")
+            UpgradeApp(expected_dir, version=version)()
+            assert are_same_dir(snapshot_dir, expected_dir, ignore=ignore)
+
+        # the files which are not changed are shared
+        relpath = "input/areas/list.txt"
+        assert study_dir.joinpath(relpath).samefile(snapshot_dirs[0].joinpath(relpath))
+        assert study_dir.joinpath(relpath).samefile(snapshot_dirs[1].joinpath(relpath))
+
+    def test_invalid_version(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.8")
+        output_dir = tmp_path / "output"
+        app = MultiVersionUpgradeApp(study_dir, versions=["8.6", "9.3"], output_dir=output_dir)
+        with pytest.raises(ApplicationError, match="downgrade"):
+            app()
+        assert not output_dir.exists()
+
+    def test_locked_study(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.6")
+        output_dir = tmp_path / "output"
+        lock_errors: list[StudyLockedError] = []
+
+        def on_event(event: UpgradeEvent) -> None:
+            # the study stays locked during all the upgrades, not only the first one
+            if event.kind == UPGRADE_STARTED:
+                with pytest.raises(StudyLockedError) as ctx:
+                    StudyLock(study_dir, timeout=0).acquire()
+                lock_errors.append(ctx.value)
+
+        with StudyLock(study_dir):
+            app = MultiVersionUpgradeApp(study_dir, versions=["8.8", "9.3"], output_dir=output_dir, lock_timeout=0)
+            with pytest.raises(StudyLockedError):
+                app()
+        assert not output_dir.exists()
+
+        app = MultiVersionUpgradeApp(study_dir, versions=["8.8", "9.3"], output_dir=output_dir, on_event=on_event)
+        snapshot_dirs = app()
+        assert len(lock_errors) == 2
+        # no lock file is left behind, and the snapshots are not locked
+        assert sorted(p.name for p in tmp_path.iterdir()) == [study_dir.name, "output"]
+        assert sorted(p.name for p in output_dir.iterdir()) == [p.name for p in snapshot_dirs]
+
+    def test_invalid_lock_timeout(self, tmp_path: Path) -> None:
+        study_dir = _create_study(tmp_path, "8.6")
+        output_dir = tmp_path / "output"
+        with pytest.raises(ValueError, match="lock timeout"):
+            MultiVersionUpgradeApp(study_dir, versions=["8.8", "9.3"], output_dir=output_dir, lock_timeout=-1)
+        assert not output_dir.exists()
+
+
+class TestZipUpgradeApp:
+    @pytest.mark.parametrize("root", ["", "little_study/"])
+    def test_nominal_case(self, tmp_path: Path, root: str) -> None:
+        zip_path = tmp_path / "little_study.zip"
+        with zipfile.ZipFile(LITTLE_STUDY_0806) as src, zipfile.ZipFile(zip_path, mode="w") as dst:
+            for info in src.infolist():
+                dst.writestr(f"{root}{info.filename}", src.read(info), compress_type=zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(zip_path) as archive:
+            original_infos = {info.filename: info for info in archive.infolist()}
+
+        app = ZipUpgradeApp(zip_path, version=StudyVersion(9, 3))
+        get_compressor = mock.Mock(wraps=zipfile._get_compressor)  # type: ignore[attr-defined]
+        with (
+            mock.patch.object(zipfile.ZipFile, "extractall") as extractall,
+            mock.patch.object(zipfile, "_get_compressor", get_compressor),
+        ):
+            app()
+        extractall.assert_not_called()
+        assert sorted(tmp_path.iterdir()) == [zip_path]
+
+        # the upgraded study is the same as the one upgraded on disk
+        actual_dir = tmp_path / "actual"
+        with zipfile.ZipFile(zip_path) as archive:
+            assert archive.testzip() is None
+            archive.extractall(actual_dir)
+            upgraded_infos = {info.filename: info for info in archive.infolist()}
+        expected_dir = _extract_study(LITTLE_STUDY_0806, tmp_path / "expected")
+        UpgradeApp(expected_dir, version=StudyVersion(9, 3))()
+        assert are_same_dir(actual_dir / root, expected_dir, ignore=DEFAULT_IGNORES | {"study.antares"})
+        assert StudyAntares.from_ini_file(actual_dir / root).version == StudyVersion(9, 3)
+
+        # only the upgraded files are compressed: the other members are copied without recompressing them
+        upgraded_dirs = filter_out_child_files(scenarios.get_plan(StudyVersion(8, 6), StudyVersion(9, 3)).files)
+        upgraded_files = [
+            name
+            for name, info in upgraded_infos.items()
+            if not info.is_dir() and is_under(name[len(root) :], [PurePath(p).as_posix() for p in upgraded_dirs])
+        ]
+        assert 0 < get_compressor.call_count == len(upgraded_files) < len(upgraded_infos)
+
+        # the members which are not concerned by the upgrade are copied as-is
+        original, upgraded = (
+            original_infos[f"{root}input/areas/list.txt"],
+            upgraded_infos[f"{root}input/areas/list.txt"],
+        )
+        assert (upgraded.CRC, upgraded.compress_size, upgraded.date_time) == (
+            original.CRC,
+            original.compress_size,
+            original.date_time,
+        )
+
+    def test_locked_archive(self, tmp_path: Path) -> None:
+        zip_path = tmp_path / "little_study.zip"
+        zip_path.write_bytes(LITTLE_STUDY_0806.read_bytes())
+        app = ZipUpgradeApp(zip_path, version=StudyVersion(8, 8), lock_timeout=0)
+        with StudyLock(zip_path):
+            with pytest.raises(StudyLockedError):
+                app()
+        assert zip_path.read_bytes() == LITTLE_STUDY_0806.read_bytes()
+
+        app()
+        with zipfile.ZipFile(zip_path) as archive:
+            archive.extract("study.antares", tmp_path / "actual")
+        assert StudyAntares.from_ini_file(tmp_path / "actual").version == StudyVersion(8, 8)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["actual", zip_path.name]
+
+    def test_output_path(self, tmp_path: Path) -> None:
+        output_path = tmp_path / "upgraded.zip"
+        app = ZipUpgradeApp(LITTLE_STUDY_0806, version=StudyVersion(8, 8), output_path=output_path)
+        app()
+        with zipfile.ZipFile(output_path) as archive:
+            archive.extract("study.antares", tmp_path / "actual")
+        assert StudyAntares.from_ini_file(tmp_path / "actual").version == StudyVersion(8, 8)
+
+        with pytest.raises(FileExistsError):
+            ZipUpgradeApp(LITTLE_STUDY_0806, version=StudyVersion(8, 8), output_path=output_path)()
+
+    def test_not_a_study(self, tmp_path: Path) -> None:
+        zip_path = tmp_path / "other.zip"
+        with zipfile.ZipFile(zip_path, mode="w") as archive:
+            archive.writestr("readme.txt", "not a study")
+        with pytest.raises(ApplicationError, match="study.antares"):
+            ZipUpgradeApp(zip_path, version=StudyVersion(9, 3))()
+        assert sorted(tmp_path.iterdir()) == [zip_path]